@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -9,8 +10,136 @@ class Settings(BaseSettings):
     # HuggingFace local model settings
     # Embedding model (used by embedding_service.py)
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"        # torch | int8 | onnx (see embedding_backends.py)
+    EMBEDDING_ONNX_CACHE_DIR: str = ".cache/onnx"
+    # Reversibility classifier over the capture embedding (see reversibility_model.py)
+    REVERSIBILITY_MODEL_ENABLED: bool = True
+    REVERSIBILITY_MODEL_DIR: str = "artifacts/reversibility"
+    REVERSIBILITY_MIN_CONFIDENCE: float = 0.8   # below this the LLM is consulted
     # LLM model (used locally by llm_service.py)
     LLM_MODEL: str = "google/flan-t5-base"
+    LLM_BACKEND: str = "torch"              # torch | int8 | onnx (see llm_backends.py)
+    LLM_ONNX_CACHE_DIR: str = ".cache/onnx"
+
+    # Remote generation (LLM_BACKEND=remote): TGI- or OpenAI-style HTTP endpoint
+    LLM_REMOTE_URL: str = ""
+    LLM_REMOTE_STYLE: str = "tgi"           # tgi | openai
+    LLM_REMOTE_MODEL: str = ""              # model name sent to the endpoint; default LLM_MODEL
+    LLM_REMOTE_API_KEY: str = ""
+    LLM_REMOTE_MAX_CONCURRENCY: int = 16    # in-flight requests (and pooled connections)
+    LLM_REMOTE_TIMEOUT_SECONDS: float = 30.0
+    LLM_REMOTE_RETRIES: int = 2
+    LLM_REMOTE_BACKOFF_MS: float = 200.0    # base of the jittered exponential backoff
+    LLM_REMOTE_HEDGE_AFTER_MS: float = 0.0  # duplicate slow requests after this long (0 = off)
+    LLM_REMOTE_HTTP2: bool = False          # needs httpx[http2]
+
+    # Embedding cache (SQLite on local disk, shared by all workers on the host)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = ".cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+
+    # Decision capture: enrich in the request (sync) or write first and let the
+    # background worker classify and embed (async); ?enrichment= overrides
+    DECISION_ENRICHMENT_MODE: str = "sync"  # sync | async
+    ENRICHMENT_BATCH_SIZE: int = 16
+    ENRICHMENT_POLL_SECONDS: float = 5.0
+    ENRICHMENT_MAX_ATTEMPTS: int = 3
+    ENRICHMENT_LEASE_SECONDS: float = 120.0 # a claimed row is retried after this long
+    ENRICHMENT_INLINE_LIMIT: int = 50       # pending rows per user scored at retrieval
+
+    # ANN index on decisions.embedding and per-query search knobs (see vector_index.py)
+    VECTOR_INDEX_TYPE: str = "hnsw"         # hnsw | ivfflat | none
+    VECTOR_INDEX_METRIC: str = "ip"         # ip (normalized embeddings) | cosine
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 64
+    VECTOR_IVFFLAT_LISTS: int = 100         # used when VECTOR_IVFFLAT_AUTO_LISTS is off
+    VECTOR_EF_SEARCH: int = 40              # hnsw.ef_search default
+    VECTOR_PROBES: int = 0                  # ivfflat.probes; 0 = sized by maintenance (else 10)
+    VECTOR_SCAN_MODE: str = "iterative"     # iterative (pgvector >= 0.8) | overfetch | exact
+    VECTOR_OVERFETCH_FACTOR: int = 4
+    VECTOR_MAX_SCAN_TUPLES: int = 20000     # iterative scan bound
+    # Index lifecycle job (daily, plus once at startup)
+    VECTOR_MAINTENANCE_ENABLED: bool = True
+    VECTOR_MAINTENANCE_HOUR: int = 3        # hour of the daily run (scheduler time zone)
+    VECTOR_REBUILD_GROWTH: float = 2.0      # ivfflat: rebuild when rows grew this much
+    VECTOR_IVFFLAT_AUTO_LISTS: bool = True  # size lists from the row count
+    VECTOR_IVFFLAT_MIN_ROWS: int = 1000     # below this no ivfflat index is built
+    VECTOR_TUNING_REFRESH_SECONDS: float = 600.0
+
+    # Retrieval backend behind find_similar_decisions (see retrieval_backend.py)
+    RETRIEVAL_BACKEND: str = "pgvector"     # pgvector | memory (per-user in-process index) | snapshot
+    RETRIEVAL_MEMORY_MAX_USERS: int = 256   # least-recently-used users evicted beyond this
+    RETRIEVAL_MEMORY_TTL_SECONDS: float = 300.0  # reload, picks up other workers' captures
+    # Memory-mapped embedding snapshot shared by the workers on a host (snapshot backend)
+    EMBEDDING_SNAPSHOT_DIR: str = ".cache/snapshots"
+    EMBEDDING_SNAPSHOT_SHARD_ROWS: int = 65536
+    EMBEDDING_SNAPSHOT_HOUR: int = 4        # hour of the daily export (scheduler time zone)
+
+    # Similarity search: PREPARE the retrieval statement once per connection.
+    # Disable behind a transaction-mode pooler (e.g. Supabase port 6543).
+    PGVECTOR_PREPARED_STATEMENTS: bool = True
+
+    # Micro-batching of concurrent single-text embedding requests
+    EMBEDDING_BATCHING_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Per-user semantic cache for /daily/guidance and /replay/similar
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92     # min cosine similarity to reuse a response
+    SEMANTIC_CACHE_TTL_SECONDS: int = 900
+    SEMANTIC_CACHE_PER_USER: int = 64
+    SEMANTIC_CACHE_MAX_USERS: int = 1000
+
+    # Local LLM inference executor
+    LLM_SLOTS: int = 1                      # concurrent generations per worker
+    LLM_MAX_QUEUE: int = 8                  # callers allowed to wait for a slot
+    LLM_TIMEOUT_SECONDS: float = 30.0       # per call, including queue wait
+    LLM_QUEUE_FULL_POLICY: str = "fallback" # fallback (rule-based) | reject (503)
+
+    # Greedy decoding (reproducible output) and memoization of LLM results
+    LLM_DETERMINISTIC: bool = True
+    LLM_MEMO_MAX_ENTRIES: int = 1024
+
+    # Per-kind latency budget; past it the rule-based answer is returned (0 = wait)
+    LLM_LATENCY_BUDGETS_MS: Dict[str, float] = {
+        "daily_guidance": 3000.0,
+        "weekly_insight": 2000.0,
+        "reflection": 5000.0,
+        "replay_summary": 5000.0,
+        "alternative_strategy": 5000.0,
+    }
+    LLM_CACHE_LATE_RESULTS: bool = True     # memoize generations that finish after the budget
+
+    # Assisted (speculative) generation: a draft model proposes, LLM_MODEL verifies
+    LLM_ASSISTED_KINDS: List[str] = []      # e.g. ["daily_guidance", "replay_summary"]
+    LLM_DRAFT_MODEL: str = "google/flan-t5-small"
+    LLM_DRAFT_BACKEND: str = "torch"
+
+    # Load-adaptive model tiers: LLM_MODEL first, then these (cheapest last)
+    LLM_FALLBACK_TIERS: List[str] = ["google/flan-t5-small", "rules"]
+    LLM_TIER_QUEUE_STEP: int = 4            # waiting callers per step down
+    LLM_TIER_P95_MS: float = 8000.0         # p95 latency per step down
+    LLM_TIER_CPU_LOAD: float = 0.9          # load average per core that counts as saturated
+    LLM_TIER_WINDOW_SECONDS: float = 60.0
+
+    # Per-kind quality circuit breaker (skip the model while most output is rejected)
+    LLM_BREAKER_ENABLED: bool = True
+    LLM_BREAKER_WINDOW: int = 20            # recent outcomes considered
+    LLM_BREAKER_MIN_SAMPLES: int = 10
+    LLM_BREAKER_THRESHOLD: float = 0.8      # rejected/failed share that opens the breaker
+    LLM_BREAKER_COOLDOWN_SECONDS: float = 300.0
+
+    # Adaptive max_new_tokens per prompt kind (from observed output lengths)
+    LLM_ADAPTIVE_BUDGETS: bool = True
+    LLM_BUDGET_WINDOW: int = 200
+    LLM_BUDGET_MIN_SAMPLES: int = 20
+
+    # Dynamic batching of concurrent generations
+    LLM_BATCHING_ENABLED: bool = True
+    LLM_BATCH_WINDOW_MS: float = 20.0
+    LLM_BATCH_MAX_SIZE: int = 8
+    LLM_BATCH_LENGTH_BUCKET: int = 64       # prompts within this many tokens share a batch
 
     # App
     APP_ENV: str = "development"
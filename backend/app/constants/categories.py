@@ -9,6 +9,33 @@ CATEGORIES: Dict[str, str] = {
     "Strategy": "strategy vision long-term planning goals direction innovation transformation",
 }
 
+# Additional prototype phrasings per category. The classifier keeps every
+# phrasing as its own vector and scores a category by its best-matching one,
+# so short captures that only hit one facet of a category still land on it.
+CATEGORY_PROTOTYPES: Dict[str, List[str]] = {
+    category: [description] for category, description in CATEGORIES.items()
+}
+CATEGORY_PROTOTYPES["Revenue Growth"] += [
+    "close a deal with a new client, raise prices, launch a paid offer",
+    "grow sales pipeline, increase conversions and recurring revenue",
+]
+CATEGORY_PROTOTYPES["Maintenance"] += [
+    "fix a broken workflow, handle client support requests, routine operations",
+    "update software, clean up the codebase, keep existing systems running",
+]
+CATEGORY_PROTOTYPES["Brand"] += [
+    "publish a blog post, record a video, post on LinkedIn or Instagram",
+    "redesign the logo and website, improve public positioning and audience",
+]
+CATEGORY_PROTOTYPES["Admin"] += [
+    "schedule meetings, do bookkeeping, taxes, invoices and paperwork",
+    "hire or onboard staff, sign contracts, handle legal and HR tasks",
+]
+CATEGORY_PROTOTYPES["Strategy"] += [
+    "decide the direction of the business for the next year, set quarterly goals",
+    "pivot the product, choose which market to focus on, long-term roadmap",
+]
+
 CATEGORY_COLORS: Dict[str, str] = {
     "Revenue Growth": "#3B82F6",  # Blue
     "Maintenance": "#9CA3AF",     # Gray
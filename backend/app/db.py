@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
 
+logger = logging.getLogger("jarvis.db")
+
 # Supabase requires SSL. connect_args ensures psycopg2 uses SSL even if
 # the URL doesn't contain ?sslmode=require (handles Windows DNS quirks too).
 _connect_args = {}
@@ -16,6 +20,23 @@ engine = create_engine(
     connect_args=_connect_args,
 )
 
+
+@event.listens_for(engine, "connect")
+def _register_vector(dbapi_connection, connection_record):
+    """
+    Bind float32 NumPy arrays as pgvector parameters and read vector columns
+    back as arrays, on every new DBAPI connection.
+    """
+    try:
+        from pgvector.psycopg2 import register_vector
+        register_vector(dbapi_connection)
+    except Exception as e:
+        # e.g. the extension is not created yet; schema setup creates it
+        logger.warning(f"pgvector type registration skipped: {e}")
+    finally:
+        dbapi_connection.rollback()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -33,5 +54,5 @@ def get_db():
 def create_all_tables():
     """Create all SQLAlchemy-mapped tables."""
     # Import all models to register them with Base.metadata
-    from app.models import decision, reflection, weekly_summary, insight  # noqa
+    from app.models import decision, reflection, weekly_summary, insight, llm_result, vector_index_build  # noqa
     Base.metadata.create_all(bind=engine)
@@ -1,9 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import settings
 from app.db import create_all_tables
 from app.middleware.auth import AuthMiddleware
 from app.routes import decisions, reflections, replay, insights, daily
+from app.services.inference_executor import ClientDisconnected, InferenceQueueFull
 from app.tasks.scheduler import start_scheduler, stop_scheduler
 
 app = FastAPI(
@@ -32,6 +34,21 @@ app.add_middleware(
 # Auth middleware
 app.add_middleware(AuthMiddleware)
 
+# Inference backpressure
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full(request: Request, exc: InferenceQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Model is busy, please retry shortly"},
+        headers={"Retry-After": "2"},
+    )
+
+
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected(request: Request, exc: ClientDisconnected):
+    # Nobody is listening; 499 only shows up in access logs
+    return JSONResponse(status_code=499, content={"detail": "Client closed request"})
+
 # Startup / shutdown lifecycle
 @app.on_event("startup")
 async def startup():
@@ -55,6 +72,15 @@ async def startup():
     # ── Auto-migrations (safe: IF NOT EXISTS) ───────────────────────────
     MIGRATIONS = [
         "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS decision_type TEXT DEFAULT 'reversible'",
+        "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS enrichment_status TEXT NOT NULL DEFAULT 'done'",
+        "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS enrichment_attempts INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE decisions ADD COLUMN IF NOT EXISTS enrichment_claimed_at TIMESTAMPTZ",
+        "CREATE INDEX IF NOT EXISTS decisions_enrichment_pending_idx "
+        "ON decisions (created_at) WHERE enrichment_status = 'pending'",
+        "CREATE INDEX IF NOT EXISTS decisions_user_created_idx "
+        "ON decisions (user_id, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS reflections_decision_created_idx "
+        "ON reflections (decision_id, created_at DESC)",
     ]
     try:
         with engine.connect() as conn:
@@ -65,17 +91,46 @@ async def startup():
     except Exception as e:
         logger.warning(f"⚠️  Auto-migration failed: {e}")
 
+    # ── Vector index (create / rebuild concurrently in the background) ────
+    if settings.VECTOR_MAINTENANCE_ENABLED:
+        import asyncio
+        from app.tasks.scheduler import run_vector_index_maintenance
+        asyncio.get_running_loop().create_task(run_vector_index_maintenance())
+
+    # ── Embedding snapshot (first export when none is published yet) ─────
+    if settings.RETRIEVAL_BACKEND == "snapshot":
+        import asyncio
+        from app.services.embedding_snapshot import get_embedding_snapshot
+        from app.tasks.scheduler import run_embedding_snapshot_export
+        snapshot = get_embedding_snapshot()
+        snapshot.refresh()
+        if not snapshot.available:
+            asyncio.get_running_loop().create_task(run_embedding_snapshot_export())
+
     # ── Scheduler ────────────────────────────────────────────────────────
     try:
         start_scheduler()
     except Exception as e:
         logger.warning(f"⚠️  Scheduler failed to start: {e}")
 
+    # ── Enrichment worker (async capture, or rows left pending earlier) ──
+    from app.services.enrichment_worker import get_enrichment_worker, has_pending_rows
+    if settings.DECISION_ENRICHMENT_MODE == "async" or has_pending_rows():
+        get_enrichment_worker().notify()
+
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    from app.services.embedding_dispatcher import shutdown_dispatcher
+    from app.services.enrichment_worker import shutdown_enrichment_worker
+    from app.services.inference_executor import shutdown_inference_executor
+    from app.services.remote_llm import shutdown_remote_llm
     stop_scheduler()
+    await shutdown_enrichment_worker()
+    await shutdown_dispatcher()
+    shutdown_inference_executor()
+    await shutdown_remote_llm()
 
 
 # Routers
@@ -105,3 +160,10 @@ def root():
 @app.get("/health", tags=["health"])
 def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", tags=["health"])
+def get_metrics():
+    """Per-worker runtime counters (caches, queues, model usage)."""
+    from app.utils import metrics
+    return metrics.collect()
@@ -22,5 +22,8 @@ class Decision(Base):
     category_tag = Column(String, default="Strategy")
     decision_type = Column(String, default="reversible")  # reversible | irreversible
     embedding = Column(Vector(384))
+    enrichment_status = Column(String, nullable=False, default="done")  # pending | done | failed
+    enrichment_attempts = Column(Integer, nullable=False, default=0)
+    enrichment_claimed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     review_date = Column(DateTime, nullable=True)
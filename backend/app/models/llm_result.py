@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, String, Text, DateTime
+from app.db import Base
+
+
+class LLMResult(Base):
+    """
+    Persisted memoized LLM output. `id` is the memo key (template id +
+    canonicalized inputs + model id), so a change to any input produces a new
+    key and the old row is replaced for that subject.
+    """
+    __tablename__ = "llm_results"
+
+    id = Column(String, primary_key=True)
+    template_id = Column(String, nullable=False)
+    model_id = Column(String, nullable=False)
+    # Row the output belongs to (e.g. decisions.id); FK declared in schema.sql
+    subject_id = Column(String, index=True)
+    output = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
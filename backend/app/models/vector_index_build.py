@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db import Base
+
+
+class VectorIndexBuild(Base):
+    """
+    One (re)build of the ANN index on decisions.embedding, written by the
+    maintenance job in vector_index.py. The latest successful row also
+    carries the probes setting retrieval should use for that index.
+    """
+    __tablename__ = "vector_index_builds"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    index_name = Column(String, nullable=False)
+    index_type = Column(String, nullable=False)    # hnsw | ivfflat
+    metric = Column(String, nullable=False)        # ip | cosine
+    method = Column(String, nullable=False)        # create | reindex | swap
+    reason = Column(Text)
+    params = Column(JSONB)                         # e.g. {"lists": 300, "probes": 17}
+    rows_at_build = Column(BigInteger)
+    status = Column(String, nullable=False, default="running")  # running | done | failed
+    error = Column(Text)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
@@ -1,43 +1,119 @@
-from fastapi import APIRouter, Depends
+import time
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app.schemas.insight_schema import DailyGuidanceRequest, DailyGuidanceResponse
-from app.services.rag_service import find_similar_decisions, get_latest_weekly_summary
-from app.services.llm_service import generate_daily_guidance
+from app.services.rag_service import (
+    find_similar_decisions,
+    get_latest_weekly_summary,
+    get_user_data_version,
+)
+from app.services.embedding_service import generate_embedding_async
+from app.services.semantic_cache import get_semantic_cache
+from app.services.llm_service import (
+    generate_daily_guidance,
+    generation_metadata,
+    stream_daily_guidance,
+)
+from app.utils.sse import SSE_HEADERS, sse_stream
+from app.services.inference_executor import cancel_on_disconnect
 
 router = APIRouter(prefix="/daily", tags=["daily"])
 
 
 @router.post("/guidance", response_model=DailyGuidanceResponse)
-async def get_daily_guidance(payload: DailyGuidanceRequest, db: Session = Depends(get_db)):
+async def get_daily_guidance(
+    payload: DailyGuidanceRequest, request: Request, db: Session = Depends(get_db)
+):
     """
     Daily Guidance (Cognitive Layer) – Full RAG Pipeline:
     1. Embed user's daily focus query
     2. Retrieve top-5 similar past decisions via pgvector
     3. Fetch latest weekly activity summary
     4. Build context and generate 3-part strategic guidance via LLM
+    Near-identical queries from the same user are served from the semantic cache.
     """
-    # Step 1+2: RAG retrieval
-    similar_decisions = find_similar_decisions(
-        db, payload.query, payload.user_id or "default_user", top_k=5
+    user_id = payload.user_id or "default_user"
+    decision_type = getattr(payload, "decision_type", "reversible") or "reversible"
+    started = time.perf_counter()
+
+    # Step 1: Embed the query (also the semantic cache key)
+    query_embedding = await generate_embedding_async(payload.query)
+
+    cache = get_semantic_cache()
+    namespace = f"daily_guidance:{decision_type}"
+    version = get_user_data_version(db, user_id) if cache else ""
+    if cache:
+        cached = cache.lookup(user_id, namespace, query_embedding, version)
+        if cached is not None:
+            return DailyGuidanceResponse(
+                query=payload.query,
+                guidance=cached["guidance"],
+                context={**cached["context"], "semantic_cache_hit": True},
+            )
+
+    # Step 2: RAG retrieval
+    similar_decisions = await find_similar_decisions(
+        db, payload.query, user_id, top_k=5, query_embedding=query_embedding
     )
 
     # Step 3: Weekly context
-    weekly_summary = get_latest_weekly_summary(db, payload.user_id or "default_user")
+    weekly_summary = get_latest_weekly_summary(db, user_id)
 
-    # Step 4: LLM generation (with decision_type framing)
-    decision_type = getattr(payload, "decision_type", "reversible") or "reversible"
-    guidance = await generate_daily_guidance(
-        payload.query, similar_decisions, weekly_summary, decision_type
-    )
+    # Step 4: LLM generation (with decision_type framing), within its latency budget
+    with generation_metadata() as meta:
+        guidance = await cancel_on_disconnect(request, generate_daily_guidance(
+            payload.query, similar_decisions, weekly_summary, decision_type
+        ))
+
+    context = {
+        "similar_decisions_used": len(similar_decisions),
+        "weekly_summary_available": weekly_summary is not None,
+        "top_categories": list({d.get("category_tag") for d in similar_decisions if d.get("category_tag")}),
+        "engine": meta.get("engine"),
+        "tier": meta.get("tier"),
+    }
+    # A budget-miss fallback is not cached, so the next request can pick up
+    # the late model output from the memo
+    if cache and not meta.get("budget_missed"):
+        cache.store(
+            user_id, namespace, query_embedding,
+            {"guidance": guidance, "context": context},
+            (time.perf_counter() - started) * 1000, version,
+        )
 
     return DailyGuidanceResponse(
         query=payload.query,
         guidance=guidance,
-        context={
-            "similar_decisions_used": len(similar_decisions),
-            "weekly_summary_available": weekly_summary is not None,
-            "top_categories": list({d.get("category_tag") for d in similar_decisions if d.get("category_tag")}),
-        },
+        context={**context, "semantic_cache_hit": False},
     )
+
+
+@router.post("/guidance/stream")
+async def stream_daily_guidance_events(payload: DailyGuidanceRequest, db: Session = Depends(get_db)):
+    """
+    Streaming variant of POST /daily/guidance (server-sent events):
+    `context` (retrieved decisions + weekly summary) → `token`* → `final`.
+    A `fallback` event precedes `final` when the model output is rejected
+    and the rule-based guidance is used instead.
+    """
+    user_id = payload.user_id or "default_user"
+    decision_type = getattr(payload, "decision_type", "reversible") or "reversible"
+
+    similar_decisions = await find_similar_decisions(db, payload.query, user_id, top_k=5)
+    weekly_summary = get_latest_weekly_summary(db, user_id)
+
+    async def events():
+        yield "context", {
+            "query": payload.query,
+            "similar_decisions": similar_decisions,
+            "weekly_summary": weekly_summary,
+        }
+        async for item in stream_daily_guidance(
+            payload.query, similar_decisions, weekly_summary, decision_type
+        ):
+            yield item
+
+    return StreamingResponse(sse_stream(events()), media_type="text/event-stream", headers=SSE_HEADERS)
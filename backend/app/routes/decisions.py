@@ -1,39 +1,58 @@
 import uuid
 from datetime import datetime
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.db import get_db
 from app.models.decision import Decision
 from app.schemas.decision_schema import DecisionCreate, DecisionResponse
-from app.services.embedding_service import generate_embedding, classify_decision
-from app.services.decision_service import classify_decision_type
+from app.services.enrichment import enrich_decision
+from app.services.enrichment_worker import DONE, FAILED, PENDING, get_enrichment_worker
+from app.services.retrieval_backend import get_retrieval_backend
+from app.services.semantic_cache import invalidate_user
 
 router = APIRouter(prefix="/decisions", tags=["decisions"])
 
 
+def _to_response(d: Decision) -> DecisionResponse:
+    status = d.enrichment_status or DONE
+    return DecisionResponse(
+        id=str(d.id), title=d.title, reasoning=d.reasoning,
+        assumptions=d.assumptions, expected_outcome=d.expected_outcome,
+        confidence_score=d.confidence_score, category_tag=d.category_tag,
+        # Never classified while pending, or when enrichment gave up
+        decision_type=d.decision_type or (None if status in (PENDING, FAILED) else "reversible"),
+        created_at=d.created_at.isoformat() if d.created_at else None,
+        user_id=str(d.user_id),
+        enrichment_status=status,
+    )
+
+
 @router.post("/", response_model=DecisionResponse, status_code=201)
-async def create_decision(payload: DecisionCreate, db: Session = Depends(get_db)):
+async def create_decision(
+    payload: DecisionCreate,
+    response: Response,
+    enrichment: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """
     Memory Layer – Capture a new decision:
-    1. Auto-classify into category (Revenue Growth, Strategy, etc.)
-    2. Auto-classify reversibility (reversible | irreversible)
-    3. Generate embedding via sentence-transformers
+    1. Generate one embedding of the decision via sentence-transformers
+    2. Auto-classify into category (Revenue Growth, Strategy, etc.) from that embedding
+    3. Auto-classify reversibility (reversible | irreversible)
     4. Store in decisions table with vector
-    """
-    category_tag = classify_decision(payload.title, payload.reasoning or "")
+    Stage timings are returned in the Server-Timing header.
 
-    # ── Auto-classify reversibility (ignores any user-supplied value) ──
-    decision_type = classify_decision_type(
-        title=payload.title,
-        reasoning=payload.reasoning or "",
-        assumptions=payload.assumptions or "",
-        expected_outcome=payload.expected_outcome or "",
-    )
-
-    embed_text = f"{payload.title} {payload.reasoning or ''} {payload.expected_outcome or ''}"
-    embedding = generate_embedding(embed_text)
+    With `?enrichment=async` (default: DECISION_ENRICHMENT_MODE) the row is
+    stored immediately with enrichment_status "pending" and 202 is returned;
+    the background enrichment worker fills in steps 1–3. Poll
+    GET /decisions/{id} for the status.
+    """
+    mode = enrichment or settings.DECISION_ENRICHMENT_MODE
+    if mode not in ("sync", "async"):
+        raise HTTPException(422, "enrichment must be 'sync' or 'async'")
 
     decision = Decision(
         id=str(uuid.uuid4()),
@@ -43,27 +62,37 @@ async def create_decision(payload: DecisionCreate, db: Session = Depends(get_db)
         assumptions=payload.assumptions,
         expected_outcome=payload.expected_outcome,
         confidence_score=payload.confidence_score,
-        category_tag=category_tag,
-        decision_type=decision_type,
-        embedding=embedding,
         created_at=datetime.utcnow(),
     )
+
+    if mode == "async":
+        decision.category_tag = None
+        decision.decision_type = None
+        decision.enrichment_status = PENDING
+        response.status_code = 202
+    else:
+        # Reversibility is always auto-classified (ignores any user-supplied value)
+        result = await enrich_decision(
+            title=payload.title,
+            reasoning=payload.reasoning or "",
+            assumptions=payload.assumptions or "",
+            expected_outcome=payload.expected_outcome or "",
+        )
+        response.headers["Server-Timing"] = result.server_timing()
+        decision.category_tag = result.category_tag
+        decision.decision_type = result.decision_type
+        decision.embedding = result.embedding
+        decision.enrichment_status = DONE
+
     db.add(decision)
     db.commit()
     db.refresh(decision)
+    invalidate_user(decision.user_id)
+    get_retrieval_backend().capture(decision)
+    if mode == "async":
+        get_enrichment_worker().notify()
 
-    return DecisionResponse(
-        id=str(decision.id),
-        title=decision.title,
-        reasoning=decision.reasoning,
-        assumptions=decision.assumptions,
-        expected_outcome=decision.expected_outcome,
-        confidence_score=decision.confidence_score,
-        category_tag=decision.category_tag,
-        decision_type=decision.decision_type or "reversible",
-        created_at=decision.created_at.isoformat() if decision.created_at else None,
-        user_id=str(decision.user_id),
-    )
+    return _to_response(decision)
 
 
 
@@ -75,17 +104,7 @@ def list_decisions(user_id: str = "default_user", db: Session = Depends(get_db))
         .order_by(Decision.created_at.desc())
         .all()
     )
-    return [
-        DecisionResponse(
-            id=str(d.id), title=d.title, reasoning=d.reasoning,
-            assumptions=d.assumptions, expected_outcome=d.expected_outcome,
-            confidence_score=d.confidence_score, category_tag=d.category_tag,
-            decision_type=d.decision_type or "reversible",
-            created_at=d.created_at.isoformat() if d.created_at else None,
-            user_id=str(d.user_id),
-        )
-        for d in rows
-    ]
+    return [_to_response(d) for d in rows]
 
 
 @router.get("/{decision_id}", response_model=DecisionResponse)
@@ -93,11 +112,4 @@ def get_decision(decision_id: str, db: Session = Depends(get_db)):
     d = db.query(Decision).filter(Decision.id == decision_id).first()
     if not d:
         raise HTTPException(404, "Decision not found")
-    return DecisionResponse(
-        id=str(d.id), title=d.title, reasoning=d.reasoning,
-        assumptions=d.assumptions, expected_outcome=d.expected_outcome,
-        confidence_score=d.confidence_score, category_tag=d.category_tag,
-        decision_type=d.decision_type or "reversible",
-        created_at=d.created_at.isoformat() if d.created_at else None,
-        user_id=str(d.user_id),
-    )
+    return _to_response(d)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
@@ -9,8 +9,9 @@ from app.models.decision import Decision
 from app.models.weekly_summary import WeeklySummary
 from app.models.insight import Insight
 from app.schemas.insight_schema import WeeklySummaryCreate, WeeklyInsightsResponse
-from app.services.llm_service import generate_weekly_insight
+from app.services.llm_service import generate_weekly_insight, generation_metadata
 from app.services.weekly_analyzer import generate_balance_label
+from app.services.inference_executor import cancel_on_disconnect
 
 router = APIRouter(prefix="/insights", tags=["insights"])
 
@@ -38,7 +39,8 @@ def _compute_from_decisions(db: Session, user_id: str, period: str = "week") ->
     """Compute category breakdown percentages filtered by time period."""
     query = (
         db.query(Decision.category_tag, func.count(Decision.id).label("cnt"))
-        .filter(Decision.user_id == user_id)
+        # Decisions still awaiting enrichment have no category yet
+        .filter(Decision.user_id == user_id, Decision.category_tag.isnot(None))
     )
     days = PERIOD_DAYS.get(period)
     if days is not None:
@@ -71,6 +73,7 @@ def _compute_from_decisions(db: Session, user_id: str, period: str = "week") ->
 
 @router.get("/weekly", response_model=WeeklyInsightsResponse)
 async def get_weekly_insights(
+    request: Request,
     user_id: str = "default_user",
     period: str = "week",
     db: Session = Depends(get_db),
@@ -120,7 +123,8 @@ async def get_weekly_insights(
             source = "empty"
 
     # Generate AI insight
-    ai_insight = await generate_weekly_insight(summary_dict)
+    with generation_metadata() as meta:
+        ai_insight = await cancel_on_disconnect(request, generate_weekly_insight(summary_dict))
     balance_label = generate_balance_label(summary_dict)
 
     # Fetch last 5 unique insights (avoid duplicates by ordering + limiting)
@@ -154,6 +158,8 @@ async def get_weekly_insights(
     return WeeklyInsightsResponse(
         summary={**summary_dict, "balance_label": balance_label},
         ai_insight=ai_insight,
+        engine=meta.get("engine"),
+        tier=meta.get("tier"),
         recent_insights=[
             {
                 "id": str(i.id),
@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.db import get_db
@@ -13,24 +14,18 @@ from app.services.reflection_engine import (
     calculate_accuracy_score,
     extract_principles_from_lessons,
 )
+from app.services.inference_executor import ClientDisconnected, cancel_on_disconnect
+from app.services.retrieval_backend import get_retrieval_backend
+from app.services.semantic_cache import invalidate_user
+from app.services.llm_service import generation_metadata, stream_reflection_insight
+from app.utils.sse import SSE_HEADERS, sse_stream
+from app.utils.insight_engine import generate_reflection_insight_rule_based
 
 router = APIRouter(prefix="/reflections", tags=["reflections"])
 
 
-@router.post("/", response_model=ReflectionResponse, status_code=201)
-async def create_reflection(payload: ReflectionCreate, db: Session = Depends(get_db)):
-    """
-    Learning Layer – Submit reflection on a past decision:
-    1. Retrieve the original decision
-    2. Run reflection engine (LLM comparison expected vs actual)
-    3. Calculate heuristic accuracy score
-    4. Store reflection
-    """
-    decision = db.query(Decision).filter(Decision.id == payload.decision_id).first()
-    if not decision:
-        raise HTTPException(404, "Decision not found")
-
-    decision_dict = {
+def _decision_context(decision: Decision) -> dict:
+    return {
         "title": decision.title,
         "reasoning": decision.reasoning,
         "assumptions": decision.assumptions,
@@ -38,10 +33,9 @@ async def create_reflection(payload: ReflectionCreate, db: Session = Depends(get
         "confidence_score": decision.confidence_score,
     }
 
-    ai_insight = await run_reflection_engine(
-        decision_dict, payload.actual_outcome, payload.lessons or ""
-    )
 
+def _store_reflection(payload: ReflectionCreate, decision: Decision, db: Session) -> Reflection:
+    """Score and store a reflection, then run principle extraction."""
     auto_score = calculate_accuracy_score(
         decision.expected_outcome or "", payload.actual_outcome
     )
@@ -58,6 +52,8 @@ async def create_reflection(payload: ReflectionCreate, db: Session = Depends(get
     db.add(reflection)
     db.commit()
     db.refresh(reflection)
+    invalidate_user(decision.user_id)
+    get_retrieval_backend().add_reflection(decision.user_id, decision.id, reflection)
 
     # ── Principle extraction (triggered when >= 5 reflections exist) ──────────
     # Count total reflections for this user via join on decisions
@@ -108,6 +104,40 @@ async def create_reflection(payload: ReflectionCreate, db: Session = Depends(get
                 existing_texts.add(principle_text)
         db.commit()
 
+    return reflection
+
+
+@router.post("/", response_model=ReflectionResponse, status_code=201)
+async def create_reflection(
+    payload: ReflectionCreate, request: Request, db: Session = Depends(get_db)
+):
+    """
+    Learning Layer – Submit reflection on a past decision:
+    1. Retrieve the original decision
+    2. Run reflection engine (LLM comparison expected vs actual)
+    3. Calculate heuristic accuracy score
+    4. Store reflection
+    """
+    decision = db.query(Decision).filter(Decision.id == payload.decision_id).first()
+    if not decision:
+        raise HTTPException(404, "Decision not found")
+
+    decision_dict = _decision_context(decision)
+
+    try:
+        with generation_metadata() as meta:
+            ai_insight = await cancel_on_disconnect(request, run_reflection_engine(
+                decision_dict, payload.actual_outcome, payload.lessons or ""
+            ))
+    except ClientDisconnected:
+        # Still store the reflection — only the LLM generation is abandoned
+        ai_insight = generate_reflection_insight_rule_based(
+            decision_dict, payload.actual_outcome, payload.lessons or ""
+        )
+        meta["engine"] = "rules"
+
+    reflection = _store_reflection(payload, decision, db)
+
     return ReflectionResponse(
         id=str(reflection.id),
         decision_id=str(reflection.decision_id),
@@ -115,10 +145,44 @@ async def create_reflection(payload: ReflectionCreate, db: Session = Depends(get
         lessons=reflection.lessons,
         accuracy_score=reflection.accuracy_score,
         ai_insight=ai_insight,
+        engine=meta.get("engine"),
+        tier=meta.get("tier"),
         created_at=reflection.created_at.isoformat(),
     )
 
 
+@router.post("/stream")
+async def create_reflection_stream(payload: ReflectionCreate, db: Session = Depends(get_db)):
+    """
+    Streaming variant of POST /reflections (server-sent events).
+    The reflection is stored first and sent as a `context` event; the AI
+    insight then streams as `token` events and ends with a `final` event.
+    """
+    decision = db.query(Decision).filter(Decision.id == payload.decision_id).first()
+    if not decision:
+        raise HTTPException(404, "Decision not found")
+
+    decision_dict = _decision_context(decision)
+    reflection = _store_reflection(payload, decision, db)
+    context = {
+        "id": str(reflection.id),
+        "decision_id": str(reflection.decision_id),
+        "actual_outcome": reflection.actual_outcome,
+        "lessons": reflection.lessons,
+        "accuracy_score": reflection.accuracy_score,
+        "created_at": reflection.created_at.isoformat(),
+    }
+
+    async def events():
+        yield "context", context
+        async for item in stream_reflection_insight(
+            decision_dict, payload.actual_outcome, payload.lessons or ""
+        ):
+            yield item
+
+    return StreamingResponse(sse_stream(events()), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.get("/{decision_id}")
 def get_reflection(decision_id: str, db: Session = Depends(get_db)):
     r = db.query(Reflection).filter(Reflection.decision_id == decision_id).first()
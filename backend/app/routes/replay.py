@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, Query
+import time
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 from app.db import get_db
-from app.services.rag_service import find_similar_decisions
-from app.services.llm_service import generate_replay_summary, generate_alternative_strategy
+from app.services.rag_service import find_similar_decisions, get_user_data_version
+from app.services.embedding_service import generate_embedding_async
+from app.services.semantic_cache import get_semantic_cache
+from app.services.llm_service import (
+    generate_replay_summary,
+    generate_alternative_strategy,
+    generation_metadata,
+    stream_replay_summary,
+)
+from app.utils.sse import SSE_HEADERS, sse_stream
+from app.services.inference_executor import cancel_on_disconnect
 from app.models.decision import Decision
 
 router = APIRouter(prefix="/replay", tags=["replay"])
@@ -15,30 +26,82 @@ class ReplayRequest(BaseModel):
     query: str
     user_id: Optional[str] = "default_user"
     top_k: Optional[int] = 5
+    # Recall/latency knobs for this request (default VECTOR_EF_SEARCH / VECTOR_PROBES)
+    ef_search: Optional[int] = Field(None, ge=1, le=1000)
+    probes: Optional[int] = Field(None, ge=1)
 
 
 @router.post("/similar")
-async def replay_similar(payload: ReplayRequest, db: Session = Depends(get_db)):
+async def replay_similar(payload: ReplayRequest, request: Request, db: Session = Depends(get_db)):
     """
     Recall Layer – Semantic similarity search via pgvector:
     1. Embed the user query
     2. Find top-k similar past decisions using cosine similarity
     3. Generate pattern observation summary via LLM
+    Near-identical queries from the same user are served from the semantic cache.
     """
-    similar = find_similar_decisions(db, payload.query, payload.user_id, payload.top_k)  # type: ignore
+    user_id = payload.user_id or "default_user"
+    started = time.perf_counter()
+    query_embedding = await generate_embedding_async(payload.query)
+
+    cache = get_semantic_cache()
+    namespace = f"replay:{payload.top_k}"
+    version = get_user_data_version(db, user_id) if cache else ""
+    if cache:
+        cached = cache.lookup(user_id, namespace, query_embedding, version)
+        if cached is not None:
+            return {"query": payload.query, **cached, "semantic_cache_hit": True}
+
+    similar = await find_similar_decisions(
+        db, payload.query, user_id, payload.top_k, query_embedding=query_embedding,  # type: ignore
+        ef_search=payload.ef_search, probes=payload.probes,
+    )
     summary = ""
-    if similar:
-        summary = await generate_replay_summary(similar, payload.query)
-    return {
-        "query": payload.query,
+    with generation_metadata() as meta:
+        if similar:
+            summary = await cancel_on_disconnect(
+                request, generate_replay_summary(similar, payload.query)
+            )
+    result = {
         "decisions": similar,
         "pattern_summary": summary,
         "total_found": len(similar),
+        "engine": meta.get("engine"),
+        "tier": meta.get("tier"),
     }
+    if cache and not meta.get("budget_missed"):
+        cache.store(
+            user_id, namespace, query_embedding, result,
+            (time.perf_counter() - started) * 1000, version,
+        )
+    return {"query": payload.query, **result, "semantic_cache_hit": False}
+
+
+@router.post("/similar/stream")
+async def replay_similar_stream(payload: ReplayRequest, db: Session = Depends(get_db)):
+    """
+    Streaming variant of POST /replay/similar (server-sent events):
+    `context` (similar decisions) → `token`* → `final` (pattern summary).
+    """
+    similar = await find_similar_decisions(
+        db, payload.query, payload.user_id or "default_user", payload.top_k,  # type: ignore
+        ef_search=payload.ef_search, probes=payload.probes,
+    )
+
+    async def events():
+        yield "context", {"query": payload.query, "decisions": similar, "total_found": len(similar)}
+        if not similar:
+            yield "final", {"engine": None, "result": ""}
+            return
+        async for item in stream_replay_summary(similar, payload.query):
+            yield item
+
+    return StreamingResponse(sse_stream(events()), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @router.post("/alternative")
 async def alternative_strategy(
+    request: Request,
     decision_id: str = Query(...),
     db: Session = Depends(get_db),
 ):
@@ -51,9 +114,19 @@ async def alternative_strategy(
         from fastapi import HTTPException
         raise HTTPException(404, "Decision not found")
 
-    alt = await generate_alternative_strategy({
-        "title": d.title,
-        "reasoning": d.reasoning,
-        "expected_outcome": d.expected_outcome,
-    })
-    return {"decision_id": decision_id, "alternative_strategy": alt}
+    with generation_metadata() as meta:
+        alt = await cancel_on_disconnect(request, generate_alternative_strategy(
+            {
+                "title": d.title,
+                "reasoning": d.reasoning,
+                "expected_outcome": d.expected_outcome,
+            },
+            db=db,
+            decision_id=str(d.id),
+        ))
+    return {
+        "decision_id": decision_id,
+        "alternative_strategy": alt,
+        "engine": meta.get("engine"),
+        "tier": meta.get("tier"),
+    }
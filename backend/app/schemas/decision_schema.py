@@ -24,6 +24,7 @@ class DecisionResponse(BaseModel):
     decision_type: Optional[str] = "reversible"
     created_at: Optional[str] = None
     user_id: str
+    enrichment_status: str = "done"  # pending | done | failed
 
     @field_validator("id", mode="before")
     @classmethod
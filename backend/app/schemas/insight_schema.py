@@ -30,6 +30,8 @@ class InsightResponse(BaseModel):
 class WeeklyInsightsResponse(BaseModel):
     summary: dict
     ai_insight: str
+    engine: Optional[str] = None  # llm | rules | memo
+    tier: Optional[str] = None    # model tier that served the generation
     recent_insights: List[dict] = []
 
 
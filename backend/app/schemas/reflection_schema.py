@@ -17,6 +17,8 @@ class ReflectionResponse(BaseModel):
     lessons: Optional[str] = None
     accuracy_score: Optional[int] = None
     ai_insight: Optional[str] = None
+    engine: Optional[str] = None  # llm | rules
+    tier: Optional[str] = None    # model tier that served the generation
     created_at: str
 
     @field_validator("id", "decision_id", mode="before")
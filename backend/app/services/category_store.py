@@ -0,0 +1,82 @@
+"""
+Category Prototype Store — precomputed category vectors for classify_decision.
+
+The category descriptions in app/constants/categories.py are static, so they
+are encoded once per embedding model and kept in a single contiguous float32
+matrix (one row per prototype phrasing). Classifying a decision is then one
+matrix-vector product over that matrix plus a per-category max.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.constants.categories import CATEGORY_PROTOTYPES
+
+logger = logging.getLogger("jarvis.category_store")
+
+DEFAULT_CATEGORY = "Strategy"
+
+
+class CategoryPrototypeStore:
+    """Prototype matrix for one embedding model version."""
+
+    def __init__(self, model_version: str, prototypes: Dict[str, List[str]], encode: Callable):
+        self.model_version = model_version
+        self.categories: List[str] = list(prototypes.keys())
+
+        texts: List[str] = []
+        offsets: List[int] = []
+        for category in self.categories:
+            offsets.append(len(texts))
+            texts.extend(prototypes[category])
+
+        # Rows are grouped by category, so np.maximum.reduceat over `offsets`
+        # collapses prototype scores into one score per category.
+        self.offsets = np.asarray(offsets, dtype=np.intp)
+        self.matrix = np.ascontiguousarray(
+            np.asarray(encode(texts), dtype=np.float32)
+        )
+        logger.info(
+            f"Category prototypes encoded: {self.matrix.shape[0]} vectors "
+            f"for {len(self.categories)} categories ({model_version})"
+        )
+
+    def scores(self, embedding) -> np.ndarray:
+        """Best prototype cosine score per category (embeddings are normalized)."""
+        vec = np.asarray(embedding, dtype=np.float32)
+        return np.maximum.reduceat(self.matrix @ vec, self.offsets)
+
+    def top_k(self, embedding, k: int = 3) -> List[Tuple[str, float]]:
+        """Return the k best (category, score) pairs, highest first."""
+        scores = self.scores(embedding)
+        order = np.argsort(-scores)[:k]
+        return [(self.categories[i], float(scores[i])) for i in order]
+
+    def classify(self, embedding) -> str:
+        scores = self.scores(embedding)
+        if not scores.size:
+            return DEFAULT_CATEGORY
+        return self.categories[int(np.argmax(scores))]
+
+
+# ── Per-model-version registry ────────────────────────────────────────────────
+_stores: Dict[str, CategoryPrototypeStore] = {}
+_lock = threading.Lock()
+
+
+def get_category_store(model_version: str, encode: Callable) -> CategoryPrototypeStore:
+    """
+    Return the prototype store for `model_version`, encoding the prototypes
+    with `encode(texts) -> (n, dim) array` the first time it is requested.
+    """
+    store = _stores.get(model_version)
+    if store is None:
+        with _lock:
+            store = _stores.get(model_version)
+            if store is None:
+                store = CategoryPrototypeStore(model_version, CATEGORY_PROTOTYPES, encode)
+                _stores[model_version] = store
+    return store
@@ -4,12 +4,20 @@ Decision Service — Auto-classification of decision reversibility.
 classify_decision_type(decision_text) -> "reversible" | "irreversible"
 
 Strategy:
-1. Try local flan-t5 LLM (single token output check)
-2. Fall back to fast rule-based keyword classifier
+1. Fast rule-based keyword classifier (any match → irreversible)
+2. Linear classifier over the decision embedding, when confident
+   (see reversibility_model.py)
+3. Local flan-t5 LLM (single token output check)
+4. Default to reversible
 """
 
+import inspect
 import re
 import logging
+from collections import Counter
+
+from app.config import settings
+from app.utils import metrics
 from app.utils.prompts import build_reversibility_prompt
 
 logger = logging.getLogger("jarvis.decision_service")
@@ -37,6 +45,9 @@ _IRREVERSIBLE_PATTERNS = [
 
 _COMPILED = [re.compile(p, re.IGNORECASE) for p in _IRREVERSIBLE_PATTERNS]
 
+# Which step decided each classification
+_paths: Counter = Counter()
+
 
 def _rule_based_classify(text: str) -> str:
     """Fast keyword-based classifier. Returns 'reversible' or 'irreversible'."""
@@ -55,7 +66,7 @@ def _llm_classify(text: str) -> str:
     try:
         from app.services.llm_service import _call_local
         prompt = build_reversibility_prompt(text)
-        result = _call_local(prompt, max_tokens=5)
+        result = _call_local(prompt, max_tokens=5, kind="reversibility")
         word = result.strip().lower().split()[0] if result.strip() else ""
         if word in ("reversible", "irreversible"):
             return word
@@ -64,17 +75,117 @@ def _llm_classify(text: str) -> str:
     return ""
 
 
+def _model_classify(embedding) -> str:
+    """
+    Embedding classifier verdict, or '' when there is no model for the active
+    embedding backend or it is below REVERSIBILITY_MIN_CONFIDENCE.
+    """
+    if embedding is None:
+        return ""
+    try:
+        from app.services.reversibility_model import get_reversibility_model
+        model = get_reversibility_model()
+        if model is None:
+            return ""
+        label, confidence = model.classify(embedding)
+        if confidence >= settings.REVERSIBILITY_MIN_CONFIDENCE:
+            return label
+    except Exception as e:
+        logger.warning(f"Embedding classification failed: {e}")
+    return ""
+
+
+async def _llm_classify_async(text: str) -> str:
+    """Same as _llm_classify, but runs on the inference executor."""
+    try:
+        from app.services.llm_service import _run_local
+        result = await _run_local(build_reversibility_prompt(text), 5, "reversibility") or ""
+        word = result.strip().lower().split()[0] if result.strip() else ""
+        if word in ("reversible", "irreversible"):
+            return word
+    except Exception as e:
+        logger.warning(f"LLM classification failed: {e}")
+    return ""
+
+
+def _rules_step(decision_text: str, title: str) -> str:
+    """Step 1: rule-based (fast, deterministic, reliable); irreversible → trust it."""
+    if _rule_based_classify(decision_text) == "irreversible":
+        logger.info(f"Classified as IRREVERSIBLE (rule-based): {title[:50]}")
+        _paths["rules"] += 1
+        return "irreversible"
+    return ""
+
+
+def _model_step(embedding, title: str) -> str:
+    """Step 2: the embedding classifier, when confident."""
+    model_result = _model_classify(embedding)
+    if model_result:
+        logger.info(f"Classified as {model_result.upper()} (embedding model): {title[:50]}")
+        _paths["model"] += 1
+        return model_result
+    return ""
+
+
+def _classify_without_llm(decision_text: str, title: str, embedding) -> str:
+    """Steps 1–2 (rules, embedding model); "" when the LLM has to decide."""
+    return _rules_step(decision_text, title) or _model_step(embedding, title)
+
+
+def _llm_or_default(llm_result: str, title: str) -> str:
+    """Steps 3–4: the LLM's answer if it gave one, else reversible."""
+    if llm_result:
+        logger.info(f"Classified as {llm_result.upper()} (LLM): {title[:50]}")
+        _paths["llm"] += 1
+        return llm_result
+
+    logger.info(f"Classified as REVERSIBLE (default): {title[:50]}")
+    _paths["default"] += 1
+    return "reversible"
+
+
+async def classify_decision_type_async(
+    title: str = "",
+    reasoning: str = "",
+    assumptions: str = "",
+    expected_outcome: str = "",
+    embedding=None,
+) -> str:
+    """
+    Async variant of classify_decision_type for request handlers. Pass the
+    capture `embedding` to let the embedding classifier skip the LLM; it may
+    be an awaitable (an embedding still in flight), which is only awaited
+    when the keyword rules are inconclusive.
+    """
+    decision_text = " ".join(filter(None, [title, reasoning, assumptions, expected_outcome]))
+
+    if not decision_text.strip():
+        return "reversible"
+
+    rule_result = _rules_step(decision_text, title)
+    if rule_result:
+        return rule_result
+    if inspect.isawaitable(embedding):
+        embedding = await embedding
+    return (
+        _model_step(embedding, title)
+        or _llm_or_default(await _llm_classify_async(decision_text), title)
+    )
+
+
 def classify_decision_type(
     title: str = "",
     reasoning: str = "",
     assumptions: str = "",
     expected_outcome: str = "",
+    embedding=None,
 ) -> str:
     """
     Auto-classify a decision as 'reversible' or 'irreversible'.
 
     Args:
         title, reasoning, assumptions, expected_outcome — decision context strings
+        embedding — the decision's capture embedding, if already computed
 
     Returns:
         'reversible' | 'irreversible'
@@ -84,19 +195,11 @@ def classify_decision_type(
     if not decision_text.strip():
         return "reversible"  # Default safe
 
-    # Rule-based first (fast, deterministic, reliable)
-    rule_result = _rule_based_classify(decision_text)
-
-    # If rule-based says irreversible → trust it immediately
-    if rule_result == "irreversible":
-        logger.info(f"Classified as IRREVERSIBLE (rule-based): {title[:50]}")
-        return "irreversible"
+    # Not confident (or no model) → confirm with LLM
+    return (
+        _classify_without_llm(decision_text, title, embedding)
+        or _llm_or_default(_llm_classify(decision_text), title)
+    )
 
-    # If rule-based says reversible, optionally confirm with LLM
-    llm_result = _llm_classify(decision_text)
-    if llm_result:
-        logger.info(f"Classified as {llm_result.upper()} (LLM): {title[:50]}")
-        return llm_result
 
-    logger.info(f"Classified as REVERSIBLE (default): {title[:50]}")
-    return "reversible"
+metrics.register("reversibility_classifier", lambda: dict(_paths))
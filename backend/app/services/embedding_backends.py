@@ -0,0 +1,210 @@
+"""
+Embedding Backends — how the sentence-transformer embedder runs on CPU.
+
+Selected with EMBEDDING_BACKEND; every backend loads settings.EMBEDDING_MODEL
+lazily and returns L2-normalized float32 vectors from `encode(texts)`:
+
+  torch — reference SentenceTransformer in float32
+  int8  — same model with dynamic int8 quantization of every nn.Linear
+  onnx  — ONNX Runtime export via optimum (optional dependency) with the
+          model's mean pooling; exported once to EMBEDDING_ONNX_CACHE_DIR
+
+Vectors from different backends are close but not identical, so the backend
+is part of `model_id`, which keys the embedding cache and the category
+prototype store.
+
+Cosine parity against the reference backend on a fixed corpus:
+
+    python -m app.services.embedding_backends parity --backend onnx
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Tuple, Type
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger("jarvis.embedding_backends")
+
+# MiniLM was trained with 256-token inputs (SentenceTransformer.max_seq_length)
+_MAX_SEQ_LENGTH = 256
+
+
+class EmbeddingBackend:
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.model_name}|{self.name}"
+
+    def load(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    logger.info(f"Loading embedding model ({self.model_name}, backend={self.name})…")
+                    self._model = self._load()
+        return self._model
+
+    def _load(self) -> Any:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """(n, dim) float32 matrix of normalized vectors."""
+        vectors = self.load().encode(texts, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+
+
+class Int8Backend(EmbeddingBackend):
+    name = "int8"
+
+    def _load(self) -> Any:
+        import torch
+        model = super()._load()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend(EmbeddingBackend):
+    name = "onnx"
+
+    def _load(self) -> Tuple[Any, Any]:
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDING_BACKEND=onnx requires optimum[onnxruntime] (pip install 'optimum[onnxruntime]')"
+            ) from e
+        from transformers import AutoTokenizer
+
+        repo = self.model_name if "/" in self.model_name else f"sentence-transformers/{self.model_name}"
+        export_dir = os.path.join(settings.EMBEDDING_ONNX_CACHE_DIR, repo.replace("/", "--"))
+        tokenizer = AutoTokenizer.from_pretrained(repo)
+        if os.path.isdir(export_dir):
+            model = ORTModelForFeatureExtraction.from_pretrained(export_dir)
+        else:
+            logger.info(f"Exporting {repo} to ONNX ({export_dir}); this happens once")
+            model = ORTModelForFeatureExtraction.from_pretrained(repo, export=True)
+            model.save_pretrained(export_dir)
+        return tokenizer, model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        tokenizer, model = self.load()
+        inputs = tokenizer(
+            texts, padding=True, truncation=True, max_length=_MAX_SEQ_LENGTH, return_tensors="np"
+        )
+        hidden = np.asarray(model(**inputs).last_hidden_state, dtype=np.float32)
+        # Mean pooling over real tokens, then L2 normalization (as the ST pipeline does)
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    "torch": EmbeddingBackend,
+    "int8": Int8Backend,
+    "onnx": OnnxBackend,
+}
+
+_instances: Dict[Tuple[str, str], EmbeddingBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def get_embedding_backend(name: str | None = None, model_name: str | None = None) -> EmbeddingBackend:
+    """Return the (process-wide) backend instance; defaults come from settings."""
+    name = name or settings.EMBEDDING_BACKEND
+    model_name = model_name or settings.EMBEDDING_MODEL
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {name!r}; expected one of {sorted(_BACKENDS)}")
+    with _instances_lock:
+        key = (name, model_name)
+        if key not in _instances:
+            _instances[key] = _BACKENDS[name](model_name)
+        return _instances[key]
+
+
+# ── Parity check ──────────────────────────────────────────────────────────────
+
+def _parity_corpus() -> List[str]:
+    from app.constants.categories import CATEGORY_PROTOTYPES
+
+    corpus = [text for texts in CATEGORY_PROTOTYPES.values() for text in texts]
+    corpus += [
+        "Hire a contractor for the website rebuild",
+        "Raise prices for new customers starting next quarter",
+        "Offer a discount to close the enterprise deal",
+        "Delay the onboarding revamp until the support backlog clears",
+        "Move bookkeeping to an outsourced accountant",
+        "Launch a podcast to grow the brand audience",
+        "Pivot the product towards small agencies",
+        "Renew the office lease for another year",
+        "Stop taking custom development projects",
+        "Automate invoice reminders",
+        "What should I focus on this week to grow revenue?",
+        "pricing under pressure",
+    ]
+    return corpus
+
+
+def parity(candidate: str, reference: str = "torch", min_cosine: float = 0.99, k: int = 5) -> bool:
+    """
+    Encode the fixed corpus with both backends and report the per-text cosine
+    between reference and candidate vectors, plus how many of each text's
+    reference top-k neighbours the candidate still retrieves. Returns True
+    when the minimum cosine reaches `min_cosine`.
+    """
+    import time
+
+    corpus = _parity_corpus()
+    timings = {}
+    vectors = {}
+    for name in (reference, candidate):
+        backend = get_embedding_backend(name)
+        backend.encode(corpus[:2])  # load + warm up
+        started = time.perf_counter()
+        vectors[name] = backend.encode(corpus)
+        timings[name] = time.perf_counter() - started
+
+    ref, cand = vectors[reference], vectors[candidate]
+    cosines = np.sum(ref * cand, axis=1)
+
+    k = min(k, len(corpus) - 1)
+    def neighbours(m: np.ndarray) -> np.ndarray:
+        sims = m @ m.T
+        np.fill_diagonal(sims, -np.inf)
+        return np.argsort(-sims, axis=1)[:, :k]
+
+    ref_nn, cand_nn = neighbours(ref), neighbours(cand)
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_nn, cand_nn)])
+
+    worst = int(np.argmin(cosines))
+    print(f"{len(corpus)} texts: cosine mean {cosines.mean():.4f}, min {cosines.min():.4f} "
+          f"({corpus[worst]!r}), neighbour recall@{k} {recall:.3f}")
+    print(f"encode time: {reference} {timings[reference] * 1000:.0f} ms, "
+          f"{candidate} {timings[candidate] * 1000:.0f} ms")
+    return float(cosines.min()) >= min_cosine
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Embedding backend tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("parity", help="compare a backend against the reference on a fixed corpus")
+    p.add_argument("--backend", required=True, choices=sorted(_BACKENDS))
+    p.add_argument("--reference", default="torch", choices=sorted(_BACKENDS))
+    p.add_argument("--min-cosine", type=float, default=0.99)
+    p.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(0 if parity(args.backend, args.reference, args.min_cosine, args.k) else 1)
@@ -0,0 +1,224 @@
+"""
+Embedding Cache — persistent, content-addressed store of embedding vectors.
+
+Vectors are keyed by (model name, normalization flag, sha256 of the text) and
+stored as float32 blobs in a SQLite database on local disk. SQLite in WAL mode
+lets every uvicorn worker on the host share the same cache file safely.
+
+Eviction is least-recently-used: each hit refreshes `last_access`, and once
+the table grows past `max_entries` the oldest rows are trimmed back to 90%.
+Any SQLite error is logged and treated as a miss — the cache never blocks
+embedding generation.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger("jarvis.embedding_cache")
+
+# Recount rows (and evict if needed) after this many inserts
+_EVICT_CHECK_INTERVAL = 256
+# Fraction of max_entries kept after an eviction pass
+_EVICT_LOW_WATERMARK = 0.9
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+
+
+def cache_key(model_name: str, normalize: bool, text: str) -> str:
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_name}|{int(normalize)}|{digest}"
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inserts_since_check = _EVICT_CHECK_INTERVAL  # check on first insert
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key         TEXT PRIMARY KEY,
+                dim         INTEGER NOT NULL,
+                vec         BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access_idx ON embeddings (last_access)"
+        )
+        conn.commit()
+
+    # ── Connection handling ───────────────────────────────────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ── Lookups ───────────────────────────────────────────────────────────────
+
+    def get_many(
+        self, model_name: str, normalize: bool, texts: Sequence[str]
+    ) -> List[Optional[np.ndarray]]:
+        """Return one cached vector (or None) per input text, in order."""
+        keys = [cache_key(model_name, normalize, t) for t in texts]
+        found = {}
+        try:
+            conn = self._conn()
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), _SQL_CHUNK):
+                chunk = unique[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, dim, vec FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, dim, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Embedding cache read failed: {e}")
+
+        out = [found.get(k) for k in keys]
+        hit_count = sum(v is not None for v in out)
+        with self._lock:
+            self.hits += hit_count
+            self.misses += len(out) - hit_count
+        return out
+
+    def put_many(
+        self, model_name: str, normalize: bool, texts: Sequence[str], vectors
+    ) -> None:
+        now = time.time()
+        rows = []
+        for text, vec in zip(texts, vectors):
+            arr = np.asarray(vec, dtype=np.float32)
+            rows.append((cache_key(model_name, normalize, text), arr.shape[0], arr.tobytes(), now))
+        if not rows:
+            return
+        try:
+            conn = self._conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vec, last_access) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Embedding cache write failed: {e}")
+            return
+
+        with self._lock:
+            self.writes += len(rows)
+            self._inserts_since_check += len(rows)
+            due = self._inserts_since_check >= _EVICT_CHECK_INTERVAL
+            if due:
+                self._inserts_since_check = 0
+        if due:
+            self._evict()
+
+    # ── Eviction ──────────────────────────────────────────────────────────────
+
+    def _evict(self) -> None:
+        try:
+            conn = self._conn()
+            (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count <= self.max_entries:
+                return
+            excess = count - int(self.max_entries * _EVICT_LOW_WATERMARK)
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            conn.commit()
+            with self._lock:
+                self.evictions += excess
+            logger.info(f"Embedding cache evicted {excess} least-recently-used entries")
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Embedding cache eviction failed: {e}")
+
+    def clear(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM embeddings")
+        conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "path": self.path,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+# ── Process-wide instance ─────────────────────────────────────────────────────
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Return the shared cache, or None when disabled via EMBEDDING_CACHE_ENABLED."""
+    global _cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = EmbeddingCache(
+                        settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES
+                    )
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"Embedding cache unavailable, continuing without it: {e}")
+                    return None
+    return _cache
+
+
+def _cache_stats() -> dict:
+    cache = _cache if settings.EMBEDDING_CACHE_ENABLED else None
+    return cache.stats() if cache else {"enabled": settings.EMBEDDING_CACHE_ENABLED}
+
+
+metrics.register("embedding_cache", _cache_stats)
@@ -0,0 +1,163 @@
+"""
+Embedding Dispatcher — micro-batches concurrent single-text embedding calls.
+
+Callers await `embed(text)`. Pending texts are queued and flushed as one
+model batch as soon as either EMBEDDING_BATCH_MAX_SIZE texts are waiting or
+the oldest one has waited EMBEDDING_BATCH_MAX_WAIT_MS. The batch is encoded
+in a worker thread so the event loop keeps serving other requests, and each
+caller's future is resolved with its own vector.
+"""
+
+import asyncio
+import logging
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger("jarvis.embedding_dispatcher")
+
+
+class EmbeddingDispatcher:
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.loop = asyncio.get_running_loop()
+
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._worker = self.loop.create_task(self._run())
+
+        self.batch_sizes = metrics.Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_depths = metrics.Histogram([0, 1, 2, 4, 8, 16, 32, 64, 128])
+        self.wait_ms = metrics.Histogram([1, 2, 5, 10, 25, 50, 100])
+        self.batches = 0
+        self.texts = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Queue one text and wait for its normalized float32 vector."""
+        future = self.loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+        return await future
+
+    async def _run(self) -> None:
+        from app.services.embedding_service import _encode
+
+        while True:
+            await self._has_items.wait()
+
+            # Wait for the batch to fill, but never past the oldest item's deadline
+            deadline = self._pending[0][2] + self.max_wait
+            remaining = deadline - time.perf_counter()
+            if len(self._pending) < self.max_batch_size and remaining > 0:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            self.queue_depths.observe(len(self._pending))
+            if not self._pending:
+                self._has_items.clear()
+            if len(self._pending) < self.max_batch_size:
+                self._batch_full.clear()
+
+            # Callers that gave up (client disconnect, timeout) are dropped
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            now = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.wait_ms.observe((now - enqueued) * 1000)
+            self.batch_sizes.observe(len(batch))
+            self.batches += 1
+            self.texts += len(batch)
+
+            texts = [text for text, _, _ in batch]
+            try:
+                vectors = await self.loop.run_in_executor(None, _encode, texts)
+            except Exception as e:
+                logger.warning(f"Embedding batch of {len(texts)} failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def close(self) -> None:
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        for _, future, _ in self._pending:
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "texts": self.texts,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_depth_after_flush": self.queue_depths.snapshot(),
+            "wait_ms": self.wait_ms.snapshot(),
+        }
+
+
+# ── Process-wide instance (bound to the running event loop) ───────────────────
+_dispatcher: EmbeddingDispatcher | None = None
+
+
+def get_dispatcher() -> EmbeddingDispatcher:
+    global _dispatcher
+    loop = asyncio.get_running_loop()
+    if _dispatcher is None or _dispatcher.loop is not loop:
+        _dispatcher = EmbeddingDispatcher(
+            settings.EMBEDDING_BATCH_MAX_SIZE, settings.EMBEDDING_BATCH_MAX_WAIT_MS
+        )
+    return _dispatcher
+
+
+async def embed(text: str) -> np.ndarray:
+    """Embed one text, batched with concurrent callers when batching is enabled."""
+    if not settings.EMBEDDING_BATCHING_ENABLED:
+        from app.services.embedding_service import _encode
+        vectors = await asyncio.get_running_loop().run_in_executor(None, _encode, [text])
+        return vectors[0]
+    return await get_dispatcher().embed(text)
+
+
+async def shutdown_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.close()
+        _dispatcher = None
+
+
+def _dispatcher_stats() -> dict:
+    if _dispatcher is None:
+        return {"enabled": settings.EMBEDDING_BATCHING_ENABLED, "started": False}
+    return {"enabled": settings.EMBEDDING_BATCHING_ENABLED, "started": True, **_dispatcher.stats()}
+
+
+metrics.register("embedding_dispatcher", _dispatcher_stats)
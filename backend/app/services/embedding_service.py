@@ -1,47 +1,91 @@
-from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import List, Tuple
+import logging
 import numpy as np
-from app.constants.categories import CATEGORIES
+from app.services.category_store import CategoryPrototypeStore, get_category_store
+from app.services.embedding_backends import EmbeddingBackend, get_embedding_backend
+from app.services.embedding_cache import get_embedding_cache
 
-_model: SentenceTransformer | None = None
+logger = logging.getLogger("jarvis.embedding")
 
 
-def get_model() -> SentenceTransformer:
-    """Lazy-load the sentence-transformer model (384-dim)."""
-    global _model
-    if _model is None:
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
-    return _model
+def get_backend() -> EmbeddingBackend:
+    """The configured embedding backend (EMBEDDING_BACKEND); loads the model lazily."""
+    return get_embedding_backend()
 
 
-def generate_embedding(text: str) -> List[float]:
-    """Generate a normalized 384-dim embedding vector."""
-    model = get_model()
-    return model.encode(text, normalize_embeddings=True).tolist()
+def _encode(texts: List[str], use_cache: bool = True) -> np.ndarray:
+    """
+    Encode texts into an (n, 384) float32 matrix of normalized vectors.
+    Texts already present in the embedding cache skip the model entirely;
+    the remaining (deduplicated) texts are encoded in a single batch.
+    """
+    backend = get_backend()
+    cache = get_embedding_cache() if use_cache else None
+    if cache is None:
+        return backend.encode(texts)
+
+    vectors = cache.get_many(backend.model_id, True, texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if missing:
+        encoded = backend.encode(missing)
+        cache.put_many(backend.model_id, True, missing, encoded)
+        fresh = dict(zip(missing, encoded))
+        vectors = [v if v is not None else fresh[t] for t, v in zip(texts, vectors)]
+    return np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+
+
+# Vectors stay float32 NumPy arrays end to end: pgvector binds them directly
+# (see app/db.py), so there is no need to round-trip through Python lists.
+
+def generate_embedding(text: str, use_cache: bool = True) -> np.ndarray:
+    """Generate a normalized 384-dim float32 embedding vector."""
+    return _encode([text], use_cache)[0]
+
+
+def generate_embeddings_batch(texts: List[str], use_cache: bool = True) -> np.ndarray:
+    """(n, 384) float32 matrix, one normalized row per text."""
+    if not texts:
+        return np.empty((0, 384), dtype=np.float32)
+    return _encode(list(texts), use_cache)
+
+
+async def generate_embedding_async(text: str) -> np.ndarray:
+    """Async variant of generate_embedding, micro-batched with concurrent callers."""
+    from app.services.embedding_dispatcher import embed
+    return await embed(text)
 
 
-def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
-    model = get_model()
-    return model.encode(texts, normalize_embeddings=True).tolist()
+def _encode_prototypes(texts: List[str]) -> np.ndarray:
+    return get_backend().encode(texts)
+
+
+def get_prototype_store() -> CategoryPrototypeStore:
+    """Category prototype matrix for the active embedding model (encoded once)."""
+    return get_category_store(get_backend().model_id, _encode_prototypes)
+
+
+def classify_embedding(embedding) -> str:
+    """Classify an already-computed normalized embedding into a category."""
+    return get_prototype_store().classify(embedding)
+
+
+def classify_decision_scores(
+    title: str, reasoning: str = "", top_k: int = 3
+) -> List[Tuple[str, float]]:
+    """Top-k (category, cosine score) pairs for a decision, best first."""
+    input_emb = _encode([f"{title} {reasoning}".strip()])[0]
+    return get_prototype_store().top_k(input_emb, top_k)
 
 
 def classify_decision(title: str, reasoning: str = "") -> str:
     """
     Auto-classify a decision into a category using semantic cosine similarity
-    against predefined category description strings.
+    against the precomputed category prototype matrix.
     """
-    model = get_model()
-    input_text = f"{title} {reasoning}".strip()
-    input_emb = model.encode(input_text, normalize_embeddings=True)
-
-    best_category = "Strategy"
-    best_score = -1.0
-
-    for category, description in CATEGORIES.items():
-        cat_emb = model.encode(description, normalize_embeddings=True)
-        score = float(np.dot(input_emb, cat_emb))
-        if score > best_score:
-            best_score = score
-            best_category = category
-
-    return best_category
+    ranked = classify_decision_scores(title, reasoning, top_k=2)
+    if len(ranked) > 1:
+        logger.debug(
+            f"Category {ranked[0][0]} ({ranked[0][1]:.3f}) "
+            f"margin {ranked[0][1] - ranked[1][1]:.3f} over {ranked[1][0]}"
+        )
+    return ranked[0][0] if ranked else "Strategy"
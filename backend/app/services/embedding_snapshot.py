@@ -0,0 +1,391 @@
+"""
+Embedding Snapshots — decision embeddings on local disk, memory-mapped by
+every worker on the host.
+
+An export writes one version directory under EMBEDDING_SNAPSHOT_DIR:
+
+    <dir>/<version>/shard-00000.npy       float32 (rows, dim), normalized
+    <dir>/<version>/shard-00000.ids.npy   decision ids, row-aligned
+    <dir>/<version>/index.json            version, as_of, dim, shard names and
+                                          per-user [shard, offset, count]
+    <dir>/CURRENT                         name of the published version
+    <dir>/append.log                      decisions embedded (or removed)
+                                          after the snapshot was taken
+
+A user's rows are contiguous inside one shard, so their vectors are a single
+read-only np.memmap slice: workers score it in place and share the pages
+through the OS page cache, so memory stays flat as workers are added. Opening
+a snapshot reads index.json and maps the shards — no table scan at start-up.
+
+The append log is a sequence of binary records written with one O_APPEND
+write under flock by the capture paths of every worker on the host; readers
+tail it on each lookup. An export publishes CURRENT first and then rewrites
+the log keeping only records newer than the snapshot, so a reader never sees
+a version without the records it is missing.
+
+Snapshots are host-local (like the embedding cache): captures made on other
+hosts show up after the next export there.
+
+    python -m app.services.embedding_snapshot export
+    python -m app.services.embedding_snapshot status
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils import metrics
+from app.utils.similarity import normalize_rows, top_k_indices
+
+logger = logging.getLogger("jarvis.embedding_snapshot")
+
+_CURRENT = "CURRENT"
+_LOG = "append.log"
+_EXPORT_LOCK = ".export.lock"
+# ts, user id length, decision id length, dim (0 = removal)
+_RECORD = struct.Struct("<dHHI")
+# Log records this much older than as_of are still replayed (clock skew
+# between workers; replaying a record the snapshot already has is harmless)
+_LOG_SLACK_SECONDS = 5.0
+_KEEP_VERSIONS = 2
+
+
+# ── Append log ────────────────────────────────────────────────────────────────
+
+def _encode_record(user_id: str, decision_id: str, embedding=None) -> bytes:
+    uid, did = user_id.encode("utf-8"), decision_id.encode("utf-8")
+    vec = b"" if embedding is None else normalize_rows(embedding).tobytes()
+    return _RECORD.pack(time.time(), len(uid), len(did), len(vec) // 4) + uid + did + vec
+
+
+def _decode_records(buf: bytes) -> Tuple[List[Tuple[float, str, str, Optional[np.ndarray]]], int]:
+    """Parse complete records from buf; returns them and the bytes consumed."""
+    records, pos = [], 0
+    while pos + _RECORD.size <= len(buf):
+        ts, ulen, dlen, dim = _RECORD.unpack_from(buf, pos)
+        end = pos + _RECORD.size + ulen + dlen + dim * 4
+        if end > len(buf):
+            break  # a write in progress
+        p = pos + _RECORD.size
+        user_id = buf[p:p + ulen].decode("utf-8")
+        decision_id = buf[p + ulen:p + ulen + dlen].decode("utf-8")
+        vec = np.frombuffer(buf, dtype=np.float32, count=dim, offset=p + ulen + dlen) if dim else None
+        records.append((ts, user_id, decision_id, vec))
+        pos = end
+    return records, pos
+
+
+def append(directory: str, user_id: str, decision_id: str, embedding=None) -> None:
+    """Record a decision's embedding (None: the decision was removed)."""
+    record = _encode_record(str(user_id), str(decision_id), embedding)
+    path = os.path.join(directory, _LOG)
+    os.makedirs(directory, exist_ok=True)
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # An export may have rotated the log while we waited for the lock
+            try:
+                if os.fstat(fd).st_ino != os.stat(path).st_ino:
+                    continue
+            except FileNotFoundError:
+                continue
+            os.write(fd, record)
+            return
+        finally:
+            os.close(fd)  # releases the lock
+
+
+def _truncate_log(directory: str, as_of: float) -> int:
+    """Rewrite the log keeping records newer than as_of; returns how many."""
+    path = os.path.join(directory, _LOG)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        with os.fdopen(os.dup(fd), "rb") as f:
+            records, _ = _decode_records(f.read())
+        kept = [r for r in records if r[0] >= as_of - _LOG_SLACK_SECONDS]
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            for ts, user_id, decision_id, vec in kept:
+                uid, did = user_id.encode("utf-8"), decision_id.encode("utf-8")
+                raw = b"" if vec is None else vec.tobytes()
+                f.write(_RECORD.pack(ts, len(uid), len(did), len(raw) // 4) + uid + did + raw)
+        # Writers waiting on the old file's lock notice the new inode and retry
+        os.replace(tmp, path)
+    finally:
+        os.close(fd)
+    return len(kept)
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+
+def _write_shard(path: str, name: str, vectors: List[np.ndarray], ids: List[str]) -> None:
+    np.save(os.path.join(path, f"{name}.npy"), normalize_rows(np.stack(vectors)))
+    width = max(len(i) for i in ids)
+    np.save(os.path.join(path, f"{name}.ids.npy"), np.array(ids, dtype=f"<U{width}"))
+
+
+def export_snapshot(engine, directory: Optional[str] = None, shard_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Stream every embedded decision (ordered by user, via the user index) into
+    shards of about shard_rows rows and publish them as a new version. Only
+    one process per host exports at a time; others return "skipped".
+    """
+    from sqlalchemy import text
+
+    directory = directory or settings.EMBEDDING_SNAPSHOT_DIR
+    shard_rows = max(1, shard_rows or settings.EMBEDDING_SNAPSHOT_SHARD_ROWS)
+    os.makedirs(directory, exist_ok=True)
+    lock = open(os.path.join(directory, _EXPORT_LOCK), "w")
+    try:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return {"skipped": "export running in another process"}
+
+        started = time.monotonic()
+        as_of = time.time()  # before the read: later captures are in the log
+        version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(as_of))
+        path = os.path.join(directory, version)
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        shards: List[str] = []
+        users: Dict[str, List[int]] = {}
+        vectors: List[np.ndarray] = []
+        ids: List[str] = []
+        dim = 0
+
+        def flush():
+            if ids:
+                name = f"shard-{len(shards):05d}"
+                _write_shard(tmp, name, vectors, ids)
+                shards.append(name)
+                vectors.clear()
+                ids.clear()
+
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text("""
+                SELECT user_id, id, embedding FROM decisions
+                WHERE embedding IS NOT NULL
+                ORDER BY user_id, created_at
+            """))
+            current = None
+            for user_id, decision_id, embedding in result:
+                if user_id != current:
+                    # Users never span shards: start a new one when this is full
+                    if len(ids) >= shard_rows:
+                        flush()
+                    users[user_id] = [len(shards), len(ids), 0]
+                    current = user_id
+                vec = np.asarray(embedding, dtype=np.float32)
+                dim = dim or vec.shape[0]
+                vectors.append(vec)
+                ids.append(str(decision_id))
+                users[user_id][2] += 1
+            flush()
+
+        rows = sum(u[2] for u in users.values())
+        with open(os.path.join(tmp, "index.json"), "w") as f:
+            json.dump({"version": version, "as_of": as_of, "dim": dim, "rows": rows,
+                       "shards": shards, "users": users}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp, path)
+
+        # Publish, then drop log records the new version already contains
+        current_tmp = os.path.join(directory, _CURRENT + ".tmp")
+        with open(current_tmp, "w") as f:
+            f.write(version)
+        os.replace(current_tmp, os.path.join(directory, _CURRENT))
+        log_records = _truncate_log(directory, as_of)
+
+        # Mapped files of old versions stay readable until workers reopen
+        versions = sorted(
+            v for v in os.listdir(directory)
+            if os.path.isdir(os.path.join(directory, v)) and not v.endswith(".tmp")
+        )
+        for old in versions[:-_KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(directory, old), ignore_errors=True)
+
+        summary = {
+            "version": version, "rows": rows, "users": len(users), "shards": len(shards),
+            "log_records": log_records, "seconds": round(time.monotonic() - started, 1),
+        }
+        logger.info(f"Embedding snapshot exported: {summary}")
+        return summary
+    finally:
+        lock.close()
+
+
+# ── Reader ────────────────────────────────────────────────────────────────────
+
+class EmbeddingSnapshot:
+    """
+    Read-only view of the published snapshot plus the append log. Call
+    refresh() before a lookup; it reopens when a new version is published
+    and otherwise only reads log bytes appended since the last call.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.version: Optional[str] = None
+        self.as_of = 0.0
+        self.dim = 0
+        self._users: Dict[str, List[int]] = {}
+        self._shards: List[Tuple[np.ndarray, np.ndarray]] = []
+        # Log state: per-user overrides (vector, or None for removed)
+        self._log_ino: Optional[int] = None
+        self._log_offset = 0
+        self._log: Dict[str, Dict[str, Optional[np.ndarray]]] = {}
+        self._lock = threading.Lock()
+
+        self.reopens = 0
+        self.log_records = 0
+
+    @property
+    def available(self) -> bool:
+        return self.version is not None
+
+    def _open(self) -> None:
+        try:
+            with open(os.path.join(self.directory, _CURRENT)) as f:
+                version = f.read().strip()
+            path = os.path.join(self.directory, version)
+            with open(os.path.join(path, "index.json")) as f:
+                index = json.load(f)
+            shards = [
+                (np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"),
+                 np.load(os.path.join(path, f"{name}.ids.npy"), mmap_mode="r"))
+                for name in index["shards"]
+            ]
+        except FileNotFoundError:
+            self.version = None
+            return
+        self.version = version
+        self.as_of = index["as_of"]
+        self.dim = index["dim"]
+        self._users = index["users"]
+        self._shards = shards
+        self._log_ino = None  # replay the log against the new version
+        self.reopens += 1
+
+    def refresh(self) -> None:
+        with self._lock:
+            try:
+                with open(os.path.join(self.directory, _CURRENT)) as f:
+                    published = f.read().strip()
+            except FileNotFoundError:
+                published = None
+            if published != self.version:
+                self._open()
+            self._tail()
+
+    def _tail(self) -> None:
+        path = os.path.join(self.directory, _LOG)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._log_ino:
+            # Rotated by an export (or first read): start over
+            self._log_ino, self._log_offset, self._log = st.st_ino, 0, {}
+        if st.st_size <= self._log_offset:
+            return
+        with open(path, "rb") as f:
+            f.seek(self._log_offset)
+            records, consumed = _decode_records(f.read(st.st_size - self._log_offset))
+        self._log_offset += consumed
+        for ts, user_id, decision_id, vec in records:
+            if ts >= self.as_of - _LOG_SLACK_SECONDS:
+                self._log.setdefault(user_id, {})[decision_id] = None if vec is None else vec.copy()
+        self.log_records += len(records)
+
+    def user_matrix(self, user_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """The user's (ids, vectors) in the snapshot: memmap slices, no copy."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return np.empty(0, dtype="<U1"), np.empty((0, self.dim), dtype=np.float32)
+        shard, offset, count = entry
+        vectors, ids = self._shards[shard]
+        return ids[offset:offset + count], vectors[offset:offset + count]
+
+    def search(self, user_id: str, query, top_k: int) -> List[Tuple[str, float]]:
+        """Top-k (decision id, similarity) over the snapshot and the log."""
+        query = normalize_rows(query)
+        with self._lock:
+            ids, vectors = self.user_matrix(user_id)
+            overrides = dict(self._log.get(user_id, {}))
+
+        # Reads the shared pages in place
+        scores = vectors @ query if len(ids) else np.empty(0, dtype=np.float32)
+        if overrides and len(ids):
+            # Log entries replace (or remove) the snapshot's copy
+            scores = np.where(np.isin(ids, list(overrides)), -np.inf, scores)
+        logged = [(i, v) for i, v in overrides.items() if v is not None]
+        if logged:
+            scores = np.concatenate([scores, np.stack([v for _, v in logged]) @ query])
+
+        results = []
+        for i in top_k_indices(scores, top_k):
+            if scores[i] == -np.inf:
+                break
+            decision_id = str(ids[i]) if i < len(ids) else logged[i - len(ids)][0]
+            results.append((decision_id, float(scores[i])))
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "users": len(self._users),
+            "rows": sum(u[2] for u in self._users.values()),
+            "mapped_bytes": sum(v.nbytes + i.nbytes for v, i in self._shards),
+            "log_users": len(self._log),
+            "log_records": self.log_records,
+            "reopens": self.reopens,
+        }
+
+
+# ── Process-wide reader ───────────────────────────────────────────────────────
+_snapshot: Optional[EmbeddingSnapshot] = None
+
+
+def get_embedding_snapshot() -> EmbeddingSnapshot:
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = EmbeddingSnapshot(settings.EMBEDDING_SNAPSHOT_DIR)
+    return _snapshot
+
+
+metrics.register("embedding_snapshot", lambda: _snapshot.stats() if _snapshot else {"opened": False})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.db import engine
+
+    parser = argparse.ArgumentParser(description="Embedding snapshot export")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="show the published snapshot and log")
+    e = sub.add_parser("export", help="export a new snapshot version")
+    e.add_argument("--shard-rows", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "status":
+        snapshot = get_embedding_snapshot()
+        snapshot.refresh()
+        print(json.dumps(snapshot.stats(), indent=2))
+    else:
+        print(json.dumps(export_snapshot(engine, shard_rows=args.shard_rows), indent=2))
@@ -0,0 +1,101 @@
+"""
+Capture Enrichment — everything derived from a decision's text at capture.
+
+One canonical text is built and encoded once; that single vector is stored
+for retrieval and reused for both classifiers:
+
+    canonical text ── embed ─┬─ category (prototype matrix)
+                             └─ reversibility (rules → embedding model → LLM)
+
+The keyword rules run while the embedding is in flight; when they already
+answer (irreversible), classification does not wait for the vector. The LLM
+is only reached when the embedding model is missing or unsure.
+
+Per-stage wall times are recorded in `timings_ms`, aggregated under
+/metrics ("capture_enrichment") and sent back as a Server-Timing header.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Dict, TypeVar
+
+import numpy as np
+
+from app.services.decision_service import classify_decision_type_async
+from app.services.embedding_dispatcher import embed
+from app.services.embedding_service import classify_embedding
+from app.utils import metrics
+
+T = TypeVar("T")
+
+_STAGES = ("embed", "category", "reversibility", "total")
+_stage_ms = {stage: metrics.Histogram([5, 10, 25, 50, 100, 250, 500, 1000, 5000]) for stage in _STAGES}
+
+
+@dataclass
+class Enrichment:
+    text: str
+    embedding: np.ndarray
+    category_tag: str
+    decision_type: str
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. `embed;dur=12.1, category;dur=0.2`."""
+        return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in self.timings_ms.items())
+
+
+def canonical_text(title: str, reasoning: str = "", expected_outcome: str = "") -> str:
+    """The text a decision is embedded as (for storage, retrieval and classification)."""
+    return " ".join(part.strip() for part in (title, reasoning, expected_outcome) if part and part.strip())
+
+
+async def _timed(timings: Dict[str, float], stage: str, awaitable: Awaitable[T]) -> T:
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = (time.perf_counter() - started) * 1000
+
+
+async def enrich_decision(
+    title: str,
+    reasoning: str = "",
+    assumptions: str = "",
+    expected_outcome: str = "",
+) -> Enrichment:
+    """Embed, categorize and classify a new decision in one pass."""
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    text = canonical_text(title, reasoning, expected_outcome)
+
+    embedding_task = asyncio.ensure_future(_timed(timings, "embed", embed(text)))
+    try:
+        # Includes the wait for the vector when the rules are inconclusive
+        decision_type = await _timed(timings, "reversibility", classify_decision_type_async(
+            title=title,
+            reasoning=reasoning,
+            assumptions=assumptions,
+            expected_outcome=expected_outcome,
+            embedding=embedding_task,
+        ))
+        embedding = await embedding_task
+    finally:
+        if not embedding_task.done():
+            embedding_task.cancel()
+
+    category_started = time.perf_counter()
+    category_tag = classify_embedding(embedding)
+    timings["category"] = (time.perf_counter() - category_started) * 1000
+    timings["total"] = (time.perf_counter() - started) * 1000
+
+    for stage, ms in timings.items():
+        _stage_ms[stage].observe(ms)
+    return Enrichment(text, embedding, category_tag, decision_type, timings)
+
+
+metrics.register(
+    "capture_enrichment",
+    lambda: {stage: hist.snapshot() for stage, hist in _stage_ms.items()},
+)
@@ -0,0 +1,249 @@
+"""
+Enrichment Worker — fills in decisions captured with deferred enrichment.
+
+POST /decisions in async mode writes the row with enrichment_status
+'pending' and returns. This worker claims pending rows in batches, runs the
+same enrich_decision pass as the synchronous path, and writes back
+category_tag, decision_type and embedding:
+
+    pending ──(claimed, enriched)──▶ done
+       │
+       └──(ENRICHMENT_MAX_ATTEMPTS failures)──▶ failed
+
+Claims are leases (enrichment_claimed_at) taken with FOR UPDATE SKIP LOCKED,
+so several worker processes can share the queue, and rows held by a process
+that died are picked up again once the lease expires. The worker wakes when
+a row is captured in this process and otherwise polls every
+ENRICHMENT_POLL_SECONDS, which also sweeps rows left from earlier runs.
+
+It only runs where it has work: at start-up when DECISION_ENRICHMENT_MODE is
+async (or pending rows are left over), otherwise on the first
+`?enrichment=async` capture. Outside async mode it stops once no pending
+rows remain.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger("jarvis.enrichment_worker")
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+_CLAIM_SQL = text("""
+    UPDATE decisions
+       SET enrichment_claimed_at = NOW(),
+           enrichment_attempts = enrichment_attempts + 1
+     WHERE id IN (
+        SELECT id FROM decisions
+         WHERE enrichment_status = 'pending'
+           AND (enrichment_claimed_at IS NULL
+                OR enrichment_claimed_at < NOW() - make_interval(secs => :lease))
+         ORDER BY created_at
+         LIMIT :n
+         FOR UPDATE SKIP LOCKED
+     )
+    RETURNING id, user_id, title, reasoning, assumptions, expected_outcome,
+              created_at, enrichment_attempts
+""")
+
+
+_PENDING_SQL = text("SELECT EXISTS (SELECT 1 FROM decisions WHERE enrichment_status = 'pending')")
+
+
+def has_pending_rows() -> bool:
+    """Whether any decision waits for enrichment (served by the partial pending index)."""
+    from app.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return bool(db.execute(_PENDING_SQL).scalar())
+    except Exception as e:
+        logger.warning(f"Pending enrichment check failed: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def _lag_ms(created_at: Optional[datetime]) -> float:
+    if created_at is None:
+        return 0.0
+    if created_at.tzinfo is None:  # the ORM writes naive UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created_at).total_seconds() * 1000
+
+
+class EnrichmentWorker:
+    def __init__(self, batch_size: int, poll_seconds: float, max_attempts: int, lease_seconds: float):
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = max(0.1, poll_seconds)
+        self.max_attempts = max(1, max_attempts)
+        self.lease_seconds = lease_seconds
+        self.loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self.loop.create_task(self._run())
+
+        self.enriched = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.lag_ms = metrics.Histogram([100, 250, 500, 1000, 2500, 5000, 10000, 60000])
+
+    def notify(self) -> None:
+        """A pending row was just written; process it without waiting for the poll."""
+        self._wake.set()
+
+    # ── Database (sync SQLAlchemy, run off the event loop) ────────────────────
+
+    def _claim(self) -> List:
+        from app.db import SessionLocal
+
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                _CLAIM_SQL, {"n": self.batch_size, "lease": self.lease_seconds}
+            ).fetchall()
+            db.commit()
+            return rows
+        finally:
+            db.close()
+
+    def _save(self, results: List) -> None:
+        from app.db import SessionLocal
+        from app.models.decision import Decision
+        from app.services.retrieval_backend import decision_fields, get_retrieval_backend
+
+        db = SessionLocal()
+        enriched = []
+        try:
+            for row, enrichment in results:
+                decision = db.get(Decision, row.id)
+                if decision is None:  # deleted while pending
+                    continue
+                if isinstance(enrichment, Exception):
+                    if row.enrichment_attempts >= self.max_attempts:
+                        decision.enrichment_status = FAILED
+                    # otherwise it stays pending and is retried after the lease
+                    continue
+                decision.category_tag = enrichment.category_tag
+                decision.decision_type = enrichment.decision_type
+                decision.embedding = enrichment.embedding
+                decision.enrichment_status = DONE
+                enriched.append((decision.user_id, decision_fields(decision), decision.embedding))
+            db.commit()
+        finally:
+            db.close()
+        backend = get_retrieval_backend()
+        for user_id, fields, embedding in enriched:
+            backend.add(user_id, fields, embedding)
+
+    # ── Loop ──────────────────────────────────────────────────────────────────
+
+    async def _process(self, rows: List) -> None:
+        from app.services.enrichment import enrich_decision
+        from app.services.semantic_cache import invalidate_user
+
+        # Concurrent passes share embedding micro-batches
+        results = await asyncio.gather(
+            *(
+                enrich_decision(
+                    title=row.title,
+                    reasoning=row.reasoning or "",
+                    assumptions=row.assumptions or "",
+                    expected_outcome=row.expected_outcome or "",
+                )
+                for row in rows
+            ),
+            return_exceptions=True,
+        )
+        await asyncio.to_thread(self._save, list(zip(rows, results)))
+
+        self.batches += 1
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Enrichment of decision {row.id} failed (attempt {row.enrichment_attempts}): {result}")
+                if row.enrichment_attempts >= self.max_attempts:
+                    self.failed += 1
+                else:
+                    self.retried += 1
+            else:
+                self.enriched += 1
+                self.lag_ms.observe(_lag_ms(row.created_at))
+        for user_id in {row.user_id for row in rows}:
+            invalidate_user(user_id)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                # Drain: keep claiming while full batches come back
+                while True:
+                    rows = await asyncio.to_thread(self._claim)
+                    if rows:
+                        await self._process(rows)
+                    if len(rows) < self.batch_size:
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Enrichment sweep failed: {e}")
+            # Started for a one-off async capture: stop once the queue is empty
+            if settings.DECISION_ENRICHMENT_MODE != "async" and not await asyncio.to_thread(has_pending_rows):
+                if not self._wake.is_set():  # nothing captured during the check
+                    logger.info("No pending enrichment left; worker stopped")
+                    return
+
+    async def close(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "enriched": self.enriched,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+            "capture_to_enriched_ms": self.lag_ms.snapshot(),
+        }
+
+
+# ── Process-wide instance (bound to the running event loop) ───────────────────
+_worker: Optional[EnrichmentWorker] = None
+
+
+def get_enrichment_worker() -> EnrichmentWorker:
+    global _worker
+    loop = asyncio.get_running_loop()
+    if _worker is None or _worker.loop is not loop or _worker._task.done():
+        _worker = EnrichmentWorker(
+            settings.ENRICHMENT_BATCH_SIZE,
+            settings.ENRICHMENT_POLL_SECONDS,
+            settings.ENRICHMENT_MAX_ATTEMPTS,
+            settings.ENRICHMENT_LEASE_SECONDS,
+        )
+    return _worker
+
+
+async def shutdown_enrichment_worker() -> None:
+    global _worker
+    if _worker is not None:
+        await _worker.close()
+        _worker = None
+
+
+metrics.register("enrichment_worker", lambda: _worker.stats() if _worker else {"started": False})
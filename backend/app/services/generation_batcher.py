@@ -0,0 +1,160 @@
+"""
+Generation Batcher — dynamic batching for local seq2seq generation.
+
+Concurrent prompts are collected for a short window (LLM_BATCH_WINDOW_MS) and
+grouped by model tier, `max_new_tokens` and approximate input length, so each padded
+batch wastes little work on padding. Every group is flushed as one batched
+`generate` call on the inference executor, and the decoded outputs are handed
+back to their callers in order.
+
+A batch is only cancelled once every caller in it has gone away.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger("jarvis.generation_batcher")
+
+# Rough characters-per-token for flan-t5 prompts (English text)
+_CHARS_PER_TOKEN = 4
+
+# run_batch(prompts, max_new_tokens, kinds, model_name) -> raw outputs in prompt order
+RunBatch = Callable[[List[str], int, List[Optional[str]], Optional[str]], Awaitable[List[str]]]
+
+# (model_name, max_new_tokens, length bucket)
+GroupKey = Tuple[Optional[str], int, int]
+
+
+def length_bucket(prompt: str, bucket_tokens: int) -> int:
+    """Bucket index for a prompt, based on its estimated token count."""
+    return (len(prompt) // _CHARS_PER_TOKEN) // max(1, bucket_tokens)
+
+
+class _Group:
+    def __init__(self):
+        self.items: List[Tuple[str, Optional[str], asyncio.Future]] = []
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class GenerationBatcher:
+    def __init__(self, run_batch: RunBatch, window_ms: float, max_batch_size: int, bucket_tokens: int):
+        self.run_batch = run_batch
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.bucket_tokens = bucket_tokens
+        self.loop = asyncio.get_running_loop()
+        self._groups: Dict[GroupKey, _Group] = {}
+
+        self.batch_sizes = metrics.Histogram([1, 2, 4, 8, 16])
+        self.batches = 0
+        self.prompts = 0
+
+    async def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int,
+        kind: Optional[str] = None,
+        model_name: Optional[str] = None,
+    ) -> str:
+        """Queue a prompt and wait for its raw (unfiltered) generated text."""
+        key = (model_name, max_new_tokens, length_bucket(prompt, self.bucket_tokens))
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group()
+            group.timer = self.loop.call_later(self.window, self._flush, key)
+
+        future = self.loop.create_future()
+        group.items.append((prompt, kind, future))
+        if len(group.items) >= self.max_batch_size:
+            self._flush(key)
+        return await future
+
+    def pending(self) -> int:
+        """Prompts collected in open groups, not yet handed to the executor."""
+        return sum(len(group.items) for group in self._groups.values())
+
+    def _flush(self, key: GroupKey) -> None:
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+        items = [item for item in group.items if not item[2].done()]
+        if not items:
+            return
+
+        self.batches += 1
+        self.prompts += len(items)
+        self.batch_sizes.observe(len(items))
+
+        task = self.loop.create_task(self._execute(key[0], key[1], items))
+
+        def _on_caller_done(_):
+            if all(f.done() for _, _, f in items) and not task.done():
+                task.cancel()
+
+        for _, _, future in items:
+            future.add_done_callback(_on_caller_done)
+
+    async def _execute(
+        self,
+        model_name: Optional[str],
+        max_new_tokens: int,
+        items: List[Tuple[str, Optional[str], asyncio.Future]],
+    ) -> None:
+        prompts = [p for p, _, _ in items]
+        kinds = [k for _, k, _ in items]
+        try:
+            outputs = await self.run_batch(prompts, max_new_tokens, kinds, model_name)
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), text in zip(items, outputs):
+            if not future.done():
+                future.set_result(text)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "open_groups": len(self._groups),
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "batch_size": self.batch_sizes.snapshot(),
+        }
+
+
+# ── Process-wide instance (bound to the running event loop) ───────────────────
+_batcher: GenerationBatcher | None = None
+
+
+def get_generation_batcher(run_batch: RunBatch) -> GenerationBatcher:
+    global _batcher
+    loop = asyncio.get_running_loop()
+    if _batcher is None or _batcher.loop is not loop:
+        _batcher = GenerationBatcher(
+            run_batch,
+            settings.LLM_BATCH_WINDOW_MS,
+            settings.LLM_BATCH_MAX_SIZE,
+            settings.LLM_BATCH_LENGTH_BUCKET,
+        )
+    return _batcher
+
+
+def pending_generations() -> int:
+    """Prompts waiting in the batcher's collection window (0 before first use)."""
+    return _batcher.pending() if _batcher else 0
+
+
+metrics.register(
+    "generation_batcher",
+    lambda: {"enabled": settings.LLM_BATCHING_ENABLED, **(_batcher.stats() if _batcher else {})},
+)
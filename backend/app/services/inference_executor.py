@@ -0,0 +1,182 @@
+"""
+Inference Executor — runs blocking model inference off the event loop.
+
+A dedicated thread pool with LLM_SLOTS workers executes generation calls.
+At most LLM_MAX_QUEUE callers may wait for a free slot; beyond that new calls
+fail fast with InferenceQueueFull so the worker sheds load instead of piling
+up requests. Every call has a deadline (queue wait + generation).
+
+Target functions must accept a `cancel_event` keyword (threading.Event). It is
+set when the caller times out or is cancelled, and generation code checks it
+between decoding steps to stop early. The slot stays occupied until the
+thread actually returns, so cancelled work never oversubscribes the CPU.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from app.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger("jarvis.inference")
+
+T = TypeVar("T")
+
+# How often a request is checked for client disconnect while generating
+_DISCONNECT_POLL_SECONDS = 0.25
+
+
+class InferenceQueueFull(Exception):
+    """Raised when every slot is busy and the wait queue is at capacity."""
+
+
+class ClientDisconnected(Exception):
+    """Raised when the HTTP client went away while inference was running."""
+
+
+class InferenceExecutor:
+    def __init__(self, slots: int, max_queue: int):
+        self.slots = max(1, slots)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="inference")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.slots)
+            self._loop = loop
+        return self._semaphore
+
+    async def run(
+        self, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any
+    ) -> T:
+        """
+        Run `fn(*args, cancel_event=..., **kwargs)` on an inference thread.
+        Raises InferenceQueueFull, asyncio.TimeoutError or CancelledError.
+        """
+        slots = self._slots()
+        if slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise InferenceQueueFull(
+                f"{self.running} running, {self.waiting} waiting (max {self.max_queue})"
+            )
+
+        deadline = time.monotonic() + timeout if timeout else None
+        self.waiting += 1
+        try:
+            if deadline is None:
+                await slots.acquire()
+            else:
+                await asyncio.wait_for(slots.acquire(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        cancel_event = threading.Event()
+        loop = asyncio.get_running_loop()
+        self.running += 1
+        future = loop.run_in_executor(
+            self._pool, functools.partial(fn, *args, cancel_event=cancel_event, **kwargs)
+        )
+        future.add_done_callback(self._on_thread_done)
+
+        try:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            result = await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            cancel_event.set()
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            cancel_event.set()
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return result
+
+    def _on_thread_done(self, _future) -> None:
+        # The slot is only released once the thread has actually finished
+        self.running -= 1
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "slots": self.slots,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
+
+
+# ── Process-wide instance ─────────────────────────────────────────────────────
+_executor: InferenceExecutor | None = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    global _executor
+    if _executor is None:
+        _executor = InferenceExecutor(settings.LLM_SLOTS, settings.LLM_MAX_QUEUE)
+    return _executor
+
+
+def shutdown_inference_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+async def cancel_on_disconnect(request, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable` while watching the HTTP client. If the client disconnects
+    first, the work is cancelled (which stops any running generation) and
+    ClientDisconnected is raised.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=_DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected from {request.url.path}; cancelling inference")
+                task.cancel()
+                raise ClientDisconnected(request.url.path)
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+metrics.register(
+    "inference_executor",
+    lambda: _executor.stats() if _executor else {"started": False},
+)
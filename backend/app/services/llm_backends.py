@@ -0,0 +1,242 @@
+"""
+LLM Backends — how the local seq2seq model is loaded and run on CPU.
+
+Selected with LLM_BACKEND; every backend loads settings.LLM_MODEL lazily on
+first use and returns a (tokenizer, model) pair whose `model.generate`
+accepts the usual transformers kwargs (stopping criteria, streamer, …):
+
+  torch — reference float32 PyTorch model
+  int8  — same weights with dynamic int8 quantization of every nn.Linear
+  onnx  — ONNX Runtime export via optimum (optional dependency); the export
+          is written to LLM_ONNX_CACHE_DIR once and reused by every worker
+  remote — no local model; generation goes over HTTP (see remote_llm.py)
+
+Parity check against the reference backend on a fixed prompt set:
+
+    python -m app.services.llm_backends parity --backend int8
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Tuple, Type
+
+from app.config import settings
+
+logger = logging.getLogger("jarvis.llm_backends")
+
+
+class LLMBackend:
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._loaded: Tuple[Any, Any] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        """Identifies weights + numerics; part of LLM memo keys."""
+        return f"{self.model_name}|{self.name}"
+
+    def load(self) -> Tuple[Any, Any]:
+        """Return (tokenizer, model), loading them on first call."""
+        if self._loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    logger.info(f"Loading local LLM ({self.model_name}, backend={self.name})…")
+                    self._loaded = self._load()
+                    logger.info("✅ Local LLM ready")
+        return self._loaded
+
+    def _load(self) -> Tuple[Any, Any]:
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+        model.eval()
+        return tokenizer, model
+
+
+class Int8Backend(LLMBackend):
+    """Dynamic int8 quantization: weights stored as int8, activations quantized per call."""
+
+    name = "int8"
+
+    def _load(self) -> Tuple[Any, Any]:
+        import torch
+        tokenizer, model = super()._load()
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return tokenizer, model
+
+
+class OnnxBackend(LLMBackend):
+    """ONNX Runtime encoder/decoder sessions (with KV cache) through optimum."""
+
+    name = "onnx"
+
+    def _load(self) -> Tuple[Any, Any]:
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError as e:
+            raise RuntimeError(
+                "LLM_BACKEND=onnx requires optimum[onnxruntime] (pip install 'optimum[onnxruntime]')"
+            ) from e
+        from transformers import AutoTokenizer
+
+        export_dir = os.path.join(settings.LLM_ONNX_CACHE_DIR, self.model_name.replace("/", "--"))
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        if os.path.isdir(export_dir):
+            model = ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+        else:
+            logger.info(f"Exporting {self.model_name} to ONNX ({export_dir}); this happens once")
+            model = ORTModelForSeq2SeqLM.from_pretrained(self.model_name, export=True)
+            model.save_pretrained(export_dir)
+        return tokenizer, model
+
+
+class RemoteBackend(LLMBackend):
+    """Placeholder for LLM_BACKEND=remote: identifies the model, never loads it."""
+
+    name = "remote"
+
+    def _load(self) -> Tuple[Any, Any]:
+        raise RuntimeError("LLM_BACKEND=remote has no local model; use app.services.remote_llm")
+
+
+_BACKENDS: Dict[str, Type[LLMBackend]] = {
+    "torch": LLMBackend,
+    "int8": Int8Backend,
+    "onnx": OnnxBackend,
+    "remote": RemoteBackend,
+}
+
+_instances: Dict[Tuple[str, str], LLMBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def get_llm_backend(name: str | None = None, model_name: str | None = None) -> LLMBackend:
+    """Return the (process-wide) backend instance; defaults come from settings."""
+    name = name or settings.LLM_BACKEND
+    if name == "remote":
+        model_name = model_name or settings.LLM_REMOTE_MODEL or settings.LLM_MODEL
+    model_name = model_name or settings.LLM_MODEL
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND {name!r}; expected one of {sorted(_BACKENDS)}")
+    with _instances_lock:
+        key = (name, model_name)
+        if key not in _instances:
+            _instances[key] = _BACKENDS[name](model_name)
+        return _instances[key]
+
+
+# ── Parity check ──────────────────────────────────────────────────────────────
+
+def parity_prompts():
+    """Fixed (kind, prompt, max_new_tokens) set used by the parity check and benchmarks."""
+    from app.utils.prompts import (
+        build_alternative_strategy_prompt,
+        build_daily_guidance_prompt,
+        build_insight_prompt,
+        build_reflection_prompt,
+        build_replay_prompt,
+    )
+
+    decision = {
+        "title": "Hire a contractor for the website rebuild",
+        "reasoning": "Internal team is at capacity and the launch date is fixed",
+        "assumptions": "Contractor can ramp up within a week",
+        "expected_outcome": "Site relaunched before the spring campaign",
+        "confidence_score": 7,
+    }
+    summary = {
+        "maintenance_pct": 55.0, "growth_pct": 20.0, "brand_pct": 10.0,
+        "admin_pct": 10.0, "strategic_pct": 5.0, "total_decisions": 20,
+    }
+    past = [
+        {"title": "Discounted the annual plan", "reasoning": "Client pushed back on price",
+         "category_tag": "Revenue Growth", "similarity": 0.81},
+        {"title": "Delayed the onboarding revamp", "reasoning": "Support backlog was too high",
+         "category_tag": "Maintenance", "similarity": 0.74},
+    ]
+    return [
+        ("reflection", build_reflection_prompt(decision, "Relaunch slipped three weeks", "Scope creep"), 300),
+        ("alternative_strategy", build_alternative_strategy_prompt(decision), 200),
+        ("weekly_insight", build_insight_prompt(summary), 200),
+        ("replay_summary", build_replay_prompt(past, "pricing under pressure"), 400),
+        ("daily_guidance", build_daily_guidance_prompt("Close two new clients", past, summary), 512),
+    ]
+
+
+def _max_rss_mb() -> float:
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_prompts(backend: LLMBackend, prompts) -> Dict[str, Any]:
+    import time
+    import torch
+
+    tokenizer, model = backend.load()
+    outputs, seconds = [], []
+    for _, prompt, max_tokens in prompts:
+        inputs = tokenizer([prompt], return_tensors="pt", truncation=True, max_length=512)
+        started = time.perf_counter()
+        with torch.inference_mode():
+            ids = model.generate(**inputs, max_new_tokens=max_tokens, do_sample=False, num_beams=1)
+        seconds.append(time.perf_counter() - started)
+        outputs.append(tokenizer.decode(ids[0], skip_special_tokens=True))
+    return {"outputs": outputs, "seconds": seconds}
+
+
+def _token_agreement(tokenizer, a: str, b: str) -> float:
+    """Share of positions where the two outputs have the same token."""
+    ta, tb = tokenizer(a)["input_ids"], tokenizer(b)["input_ids"]
+    longest = max(len(ta), len(tb))
+    if not longest:
+        return 1.0
+    return sum(x == y for x, y in zip(ta, tb)) / longest
+
+
+def parity(candidate: str, reference: str = "torch", min_agreement: float = 0.9) -> bool:
+    """
+    Greedy-decode the fixed prompt set with both backends and print per-prompt
+    token agreement and latency. Returns True when the mean agreement reaches
+    `min_agreement`. Run each backend in its own process to compare RSS.
+    """
+    prompts = parity_prompts()
+    ref = _run_prompts(get_llm_backend(reference), prompts)
+    rss_ref = _max_rss_mb()
+    cand_backend = get_llm_backend(candidate)
+    cand = _run_prompts(cand_backend, prompts)
+    tokenizer = cand_backend.load()[0]
+
+    agreements = []
+    print(f"{'kind':<22}{'agree':>8}{'exact':>7}{reference + ' s':>10}{candidate + ' s':>10}")
+    for (kind, _, _), r, c, rs, cs in zip(
+        prompts, ref["outputs"], cand["outputs"], ref["seconds"], cand["seconds"]
+    ):
+        agreement = _token_agreement(tokenizer, r, c)
+        agreements.append(agreement)
+        print(f"{kind:<22}{agreement:>8.2f}{str(r == c):>7}{rs:>10.2f}{cs:>10.2f}")
+
+    mean = sum(agreements) / len(agreements)
+    speedup = sum(ref["seconds"]) / max(sum(cand["seconds"]), 1e-9)
+    print(f"mean agreement {mean:.3f} (min {min_agreement}), speedup {speedup:.2f}x, "
+          f"max RSS after {reference} {rss_ref:.0f} MB, after both {_max_rss_mb():.0f} MB")
+    return mean >= min_agreement
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Local LLM backend tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("parity", help="compare a backend against the reference on fixed prompts")
+    p.add_argument("--backend", required=True, choices=sorted(_BACKENDS))
+    p.add_argument("--reference", default="torch", choices=sorted(_BACKENDS))
+    p.add_argument("--min-agreement", type=float, default=0.9)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(0 if parity(args.backend, args.reference, args.min_agreement) else 1)
@@ -0,0 +1,137 @@
+"""
+LLM Memo — memoization of deterministic LLM results.
+
+Results are keyed by (prompt template id, canonicalized inputs, model id).
+Inputs are canonicalized as sorted-key JSON, so dicts that compare equal map
+to the same key regardless of insertion order. Because the inputs are part
+of the key, a memo entry is only ever invalidated by a change to those
+inputs (or to the model / decoding mode captured in the model id).
+
+Two tiers:
+- an in-process LRU for every memoized template
+- the `llm_results` table for outputs tied to a database row (per subject id)
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.llm_result import LLMResult
+from app.utils import metrics
+
+logger = logging.getLogger("jarvis.llm_memo")
+
+
+def memo_key(template_id: str, inputs: Dict[str, Any], model_id: str) -> str:
+    canonical = json.dumps(
+        {"template": template_id, "model": model_id, "inputs": inputs},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMMemo:
+    """Thread-safe in-process LRU of memoized outputs."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.persisted_hits = 0
+        self.persisted_writes = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def load_persisted(self, db: Session, key: str) -> Optional[str]:
+        """Look up a persisted output; a hit is promoted into the LRU."""
+        try:
+            row = db.query(LLMResult).filter(LLMResult.id == key).first()
+        except Exception as e:
+            logger.warning(f"Memo lookup failed: {e}")
+            db.rollback()
+            return None
+        if row is None:
+            return None
+        with self._lock:
+            self.persisted_hits += 1
+        self.put(key, row.output)
+        return row.output
+
+    def save_persisted(
+        self,
+        db: Session,
+        key: str,
+        template_id: str,
+        model_id: str,
+        subject_id: str,
+        output: str,
+    ) -> None:
+        """Store `output` for a subject, replacing outputs memoized for older inputs."""
+        try:
+            db.query(LLMResult).filter(
+                LLMResult.subject_id == subject_id,
+                LLMResult.template_id == template_id,
+                LLMResult.id != key,
+            ).delete(synchronize_session=False)
+            db.merge(LLMResult(
+                id=key,
+                template_id=template_id,
+                model_id=model_id,
+                subject_id=subject_id,
+                output=output,
+                created_at=datetime.utcnow(),
+            ))
+            db.commit()
+            with self._lock:
+                self.persisted_writes += 1
+        except Exception as e:
+            logger.warning(f"Memo persist failed: {e}")
+            db.rollback()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persisted_hits": self.persisted_hits,
+            "persisted_writes": self.persisted_writes,
+        }
+
+
+_memo = LLMMemo(settings.LLM_MEMO_MAX_ENTRIES)
+
+
+def get_llm_memo() -> LLMMemo:
+    return _memo
+
+
+metrics.register("llm_memo", lambda: {"enabled": settings.LLM_DETERMINISTIC, **_memo.stats()})
@@ -1,5 +1,22 @@
+import asyncio
 import logging
-from typing import Any, Dict, List
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.services.inference_executor import InferenceQueueFull, get_inference_executor
+from app.services.generation_batcher import get_generation_batcher, pending_generations
+from app.services.llm_backends import get_llm_backend
+from app.services.llm_memo import get_llm_memo, memo_key
+from app.services.model_tiers import RULES_TIER, get_model_tiers
+from app.services.quality_breaker import get_quality_breaker
+from app.services.remote_llm import get_remote_llm
+from app.services.token_budget import get_token_budgets
+from app.utils import metrics
 from app.utils.prompts import (
     build_reflection_prompt,
     build_replay_prompt,
@@ -17,60 +34,594 @@ from app.utils.insight_engine import (
 
 logger = logging.getLogger("jarvis.llm")
 
-# ── Lazy-loaded local pipeline ────────────────────────────────────────────────
-_pipe = None
+# ── Local model (loaded lazily by the configured backend) ─────────────────────
 
+# Phrases that indicate the model is echoing the prompt instead of answering it
+_ECHO_PHRASES = [
+    "whether the prediction",
+    "concrete takeaway",
+    "reasoning error",
+    "1. whether",
+    "2. what reasoning",
+    "3. one concrete",
+    "be direct, empathetic",
+    "in 2-3 sentences",
+    "respond with exactly",
+    "line 1:", "line 2:", "line 3:",
+]
 
-def _get_pipeline():
-    global _pipe
-    if _pipe is None:
-        from transformers import pipeline
-        logger.info("Loading local LLM pipeline (flan-t5-base)…")
-        _pipe = pipeline(
-            "text2text-generation",
-            model="google/flan-t5-base",
-            device=-1,
+# flan-t5 was trained with 512-token inputs
+_MAX_INPUT_TOKENS = 512
+
+# Output structure each prompt kind must satisfy (checked during decoding)
+_MIN_LINES = {"daily_guidance": 3}
+# Minimum output length per kind (default 80 chars); one-word answers are valid
+_MIN_CHARS = {"reversibility": 1}
+
+
+def _get_model(model_name: Optional[str] = None):
+    """
+    Lazy-load the seq2seq tokenizer and model (LLM_BACKEND). Returns
+    (tokenizer, model). `model_name` selects a fallback tier; default LLM_MODEL.
+    With the remote backend, fallback tiers run locally on torch.
+    """
+    backend = "torch" if settings.LLM_BACKEND == "remote" else None
+    return get_llm_backend(backend, model_name).load()
+
+
+def _uses_remote(model_name: Optional[str]) -> bool:
+    """The primary tier generates over HTTP when LLM_BACKEND=remote."""
+    return settings.LLM_BACKEND == "remote" and model_name is None
+
+
+def _decoding_kwargs() -> Dict[str, Any]:
+    """Greedy decoding in deterministic mode, temperature sampling otherwise."""
+    if settings.LLM_DETERMINISTIC:
+        return {"do_sample": False, "num_beams": 1}
+    return {"do_sample": True, "temperature": 0.7}
+
+
+def _model_id() -> str:
+    """Identifies model + decoding mode for memo keys."""
+    mode = "greedy" if settings.LLM_DETERMINISTIC else "sampled"
+    return f"{get_llm_backend().model_id}|{mode}"
+
+
+def _echoes_prompt(text: str) -> bool:
+    lower = text.lower()
+    return any(phrase in lower for phrase in _ECHO_PHRASES)
+
+
+def _accept_output(text: str, kind: Optional[str] = None) -> str:
+    """Return `text` if it passes the quality filter, otherwise ""."""
+    text = text.strip()
+    # Reject if too short or echoes the prompt structure
+    if len(text) < _MIN_CHARS.get(kind, 80):
+        return ""
+    if _echoes_prompt(text):
+        logger.warning("LLM output rejected — echoing prompt template. Using rule-based engine.")
+        return ""
+    return text
+
+
+def _stopping_criteria(
+    tokenizer, kinds: List[Optional[str]], cancel_event: Optional[threading.Event]
+):
+    """Per-row quality criteria (echo / structure) plus optional cancellation."""
+    from transformers import StoppingCriteriaList
+    from app.services.stopping_criteria import CancelCriteria, QualityStoppingCriteria
+
+    quality = QualityStoppingCriteria(
+        tokenizer, _ECHO_PHRASES, [_MIN_LINES.get(k, 1) for k in kinds]
+    )
+    criteria = StoppingCriteriaList([quality])
+    if cancel_event is not None:
+        criteria.append(CancelCriteria(cancel_event))
+    return criteria, quality
+
+
+# ── Assisted generation ───────────────────────────────────────────────────────
+# For kinds in LLM_ASSISTED_KINDS a small draft model proposes tokens and the
+# main model verifies several at once. Under greedy decoding the output is the
+# same as plain decoding, so memo keys do not change. transformers only
+# supports it for single-prompt generation, so these kinds bypass batching.
+
+def _assisted(kinds: List[Optional[str]], model_name: Optional[str] = None) -> bool:
+    return (
+        settings.LLM_DETERMINISTIC
+        and len(kinds) == 1
+        and kinds[0] in settings.LLM_ASSISTED_KINDS
+        and model_name in (None, settings.LLM_MODEL)
+    )
+
+
+def _assistant_kwargs(kinds: List[Optional[str]], model_name: Optional[str] = None) -> Dict[str, Any]:
+    """`assistant_model=` for generate() when assisted generation applies, else {}."""
+    if not _assisted(kinds, model_name):
+        return {}
+    draft = get_llm_backend(settings.LLM_DRAFT_BACKEND, settings.LLM_DRAFT_MODEL).load()[1]
+    return {"assistant_model": draft}
+
+
+def _generate_batch(
+    prompts: List[str],
+    max_tokens: int,
+    kinds: Optional[List[Optional[str]]] = None,
+    model_name: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> List[str]:
+    """
+    Generate raw completions for several prompts in one padded `generate`
+    call on `model_name` (default LLM_MODEL). Output order matches `prompts`;
+    a cancelled batch yields "" for all.
+
+    Rows are stopped early (and yield "") as soon as their partial output is
+    certain to fail the quality filter. Rows whose required structure the
+    tokenizer cannot produce at all are skipped without decoding.
+    """
+    import torch
+    from app.services.stopping_criteria import can_emit_newlines
+
+    tokenizer, model = _get_model(model_name)
+    budgets = get_token_budgets()
+    kinds = kinds or [None] * len(prompts)
+    outputs = [""] * len(prompts)
+
+    active = []
+    for i, kind in enumerate(kinds):
+        if _MIN_LINES.get(kind, 1) > 1 and not can_emit_newlines(tokenizer):
+            budgets.record_abort(kind, "unsatisfiable")
+            continue
+        active.append(i)
+    if not active:
+        return outputs
+
+    inputs = tokenizer(
+        [prompts[i] for i in active],
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
+        max_length=_MAX_INPUT_TOKENS,
+    )
+    active_kinds = [kinds[i] for i in active]
+    criteria, quality = _stopping_criteria(tokenizer, active_kinds, cancel_event)
+    with torch.inference_mode():
+        output_ids = model.generate(
+            **inputs,
+            max_new_tokens=max_tokens,
+            stopping_criteria=criteria,
+            **_decoding_kwargs(),
+            **_assistant_kwargs(active_kinds, model_name),
         )
-        logger.info("✅ Local LLM pipeline ready")
-    return _pipe
+    if cancel_event is not None and cancel_event.is_set():
+        return outputs
+
+    texts = tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+    for row, i in enumerate(active):
+        if quality.aborted[row]:
+            budgets.record_abort(kinds[i], quality.aborted[row])
+            logger.info(f"LLM generation aborted early ({quality.aborted[row]}) for {kinds[i]}")
+            continue
+        outputs[i] = texts[row]
+        budgets.record_usage(kinds[i], int((output_ids[row] != tokenizer.pad_token_id).sum()))
+    return outputs
+
+
+def _meets_structure(kind: Optional[str], text: str) -> bool:
+    """Whether accepted output has the shape its kind needs (e.g. three guidance lines)."""
+    if not text:
+        return False
+    lines = [line for line in text.split("\n") if line.strip()]
+    return len(lines) >= _MIN_LINES.get(kind, 1)
 
 
-def _call_local(prompt: str, max_tokens: int = 256) -> str:
+def _call_local(
+    prompt: str,
+    max_tokens: int = 256,
+    cancel_event: Optional[threading.Event] = None,
+    kind: Optional[str] = None,
+) -> str:
     """Run inference locally. Returns empty string if output quality is too low."""
-    # Phrases that indicate the model is echoing the prompt instead of answering it
-    _ECHO_PHRASES = [
-        "whether the prediction",
-        "concrete takeaway",
-        "reasoning error",
-        "1. whether",
-        "2. what reasoning",
-        "3. one concrete",
-        "be direct, empathetic",
-        "in 2-3 sentences",
-        "respond with exactly",
-        "line 1:", "line 2:", "line 3:",
-    ]
+    breaker = get_quality_breaker()
+    if not breaker.allow(kind):
+        return ""
+    verdict: Optional[bool] = None
     try:
-        pipe = _get_pipeline()
-        result = pipe(
-            prompt,
-            max_new_tokens=max_tokens,
-            do_sample=True,
-            temperature=0.7,
-        )
-        text = result[0].get("generated_text", "").strip()
-        lower = text.lower()
-
-        # Reject if too short or echoes the prompt structure
-        if len(text) < 80:
-            return ""
-        if any(phrase in lower for phrase in _ECHO_PHRASES):
-            logger.warning("LLM output rejected — echoing prompt template. Using rule-based engine.")
-            return ""
+        tier = _select_tier()
+        model_name = None if tier == settings.LLM_MODEL else tier
+        if tier == RULES_TIER or _uses_remote(model_name):
+            return ""  # the remote client is async-only
+        started = time.perf_counter()
+        max_tokens = get_token_budgets().budget(kind, max_tokens)
+        raw = _generate_batch([prompt], max_tokens, [kind], model_name, cancel_event)[0]
+        get_model_tiers().record_latency((time.perf_counter() - started) * 1000)
+        text = _accept_output(raw, kind)
+        verdict = _meets_structure(kind, text)
         return text
     except Exception as e:
+        verdict = False
         logger.warning(f"Local LLM inference failed: {e}")
         return ""
+    finally:
+        _record_verdict(kind, verdict)
+
+
+def _record_verdict(kind: Optional[str], verdict: Optional[bool]) -> None:
+    breaker = get_quality_breaker()
+    if verdict is None:
+        breaker.abandon(kind)
+    else:
+        breaker.record(kind, verdict)
+
+
+async def _run_batch(
+    prompts: List[str],
+    max_tokens: int,
+    kinds: Optional[List[Optional[str]]] = None,
+    model_name: Optional[str] = None,
+) -> List[str]:
+    """Run one batched generation on the inference executor."""
+    return await get_inference_executor().run(
+        _generate_batch, prompts, max_tokens, kinds, model_name,
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+    )
+
+
+def _select_tier() -> str:
+    """Pick the model tier for the next generation from live load signals."""
+    depth = get_inference_executor().waiting + pending_generations()
+    tier = get_model_tiers().select(depth)
+    info = _call_info.get()
+    if info is not None:
+        info["tier"] = tier
+    return tier
+
+
+async def _run_local(
+    prompt: str, max_tokens: int = 256, kind: Optional[str] = None
+) -> Optional[str]:
+    """
+    Generate on the inference executor so generation never blocks the event
+    loop, batched with concurrent prompts when LLM_BATCHING_ENABLED. Each
+    output is still quality-filtered individually.
+
+    Returns the accepted text, "" if the model output was rejected, or None if
+    no generation happened (timeout, full queue, error). Timeouts and a full
+    queue degrade to the rule-based fallback unless LLM_QUEUE_FULL_POLICY is
+    "reject", which surfaces a 503.
+
+    `kind` names the prompt type; it selects the early-abort rules and the
+    adaptive token budget, and its quality breaker may skip the model
+    entirely (returns None). Under load a cheaper model tier may serve the
+    call, or none at all (the "rules" tier also returns None).
+    """
+    breaker = get_quality_breaker()
+    if not breaker.allow(kind):
+        return None
+    verdict: Optional[bool] = None  # None = no verdict (skipped, cancelled, queue full)
+    try:
+        tier = _select_tier()
+        if tier == RULES_TIER:
+            return None
+        model_name = None if tier == settings.LLM_MODEL else tier
+        max_tokens = get_token_budgets().budget(kind, max_tokens)
+        started = time.perf_counter()
+        if _uses_remote(model_name):
+            # The inference server batches on its side; the client pools connections
+            raw = await asyncio.wait_for(
+                get_remote_llm().generate(prompt, max_tokens, _decoding_kwargs()),
+                settings.LLM_TIMEOUT_SECONDS,
+            )
+        elif settings.LLM_BATCHING_ENABLED and not _assisted([kind], model_name):
+            batcher = get_generation_batcher(_run_batch)
+            raw = await asyncio.wait_for(
+                batcher.submit(prompt, max_tokens, kind, model_name), settings.LLM_TIMEOUT_SECONDS
+            )
+        else:
+            raw = (await _run_batch([prompt], max_tokens, [kind], model_name))[0]
+        get_model_tiers().record_latency((time.perf_counter() - started) * 1000)
+        text = _accept_output(raw, kind)
+        verdict = _meets_structure(kind, text)
+        return text
+    except InferenceQueueFull as e:
+        if settings.LLM_QUEUE_FULL_POLICY == "reject":
+            raise
+        logger.warning(f"LLM queue full ({e}). Using rule-based engine.")
+    except asyncio.TimeoutError:
+        verdict = False
+        get_model_tiers().record_latency(settings.LLM_TIMEOUT_SECONDS * 1000)
+        logger.warning(
+            f"LLM generation exceeded {settings.LLM_TIMEOUT_SECONDS:.0f}s. Using rule-based engine."
+        )
+    except Exception as e:
+        verdict = False
+        logger.warning(f"Local LLM inference failed: {e}")
+    finally:
+        _record_verdict(kind, verdict)
+    return None
+
+
+# ── Token streaming ───────────────────────────────────────────────────────────
+
+def _generate_stream(
+    prompt: str,
+    max_tokens: int,
+    on_text: Callable[[str], None],
+    kind: Optional[str] = None,
+    model_name: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Optional[str]:
+    """
+    Generate for one prompt, calling `on_text(chunk)` as text is decoded.
+    Applies the same quality stopping criteria and unsatisfiable-structure
+    skip as _generate_batch; returns the abort reason, or None.
+    """
+    import torch
+    from transformers import TextStreamer
+    from app.services.stopping_criteria import can_emit_newlines
+
+    class _CallbackStreamer(TextStreamer):
+        def on_finalized_text(self, text: str, stream_end: bool = False):
+            if text:
+                on_text(text)
+
+    tokenizer, model = _get_model(model_name)
+    if _MIN_LINES.get(kind, 1) > 1 and not can_emit_newlines(tokenizer):
+        return "unsatisfiable"
+
+    inputs = tokenizer(
+        [prompt], return_tensors="pt", truncation=True, max_length=_MAX_INPUT_TOKENS
+    )
+    criteria, quality = _stopping_criteria(tokenizer, [kind], cancel_event)
+    with torch.inference_mode():
+        output_ids = model.generate(
+            **inputs,
+            max_new_tokens=max_tokens,
+            streamer=_CallbackStreamer(tokenizer, skip_special_tokens=True),
+            stopping_criteria=criteria,
+            **_decoding_kwargs(),
+            **_assistant_kwargs([kind], model_name),
+        )
+    if quality.aborted[0]:
+        return quality.aborted[0]
+    get_token_budgets().record_usage(kind, int((output_ids[0] != tokenizer.pad_token_id).sum()))
+    return None
+
+
+async def _stream_local(
+    prompt: str, max_tokens: int, kind: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Yield text chunks as the model decodes them (on the inference executor).
+    Closing the iterator early cancels the generation. Failures end the
+    stream quietly; callers validate whatever text was produced. The "rules"
+    tier yields nothing.
+    """
+    tier = _select_tier()
+    if tier == RULES_TIER:
+        return
+    model_name = None if tier == settings.LLM_MODEL else tier
+    if _uses_remote(model_name):
+        # No token streaming over the remote endpoint: one chunk when done
+        try:
+            yield await get_remote_llm().generate(prompt, max_tokens, _decoding_kwargs())
+        except Exception as e:
+            logger.warning(f"Remote generation failed: {e!r}")
+        return
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def on_text(chunk: str) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, chunk)
+
+    max_tokens = get_token_budgets().budget(kind, max_tokens)
+    task = asyncio.ensure_future(get_inference_executor().run(
+        _generate_stream, prompt, max_tokens, on_text, kind, model_name,
+        timeout=settings.LLM_TIMEOUT_SECONDS,
+    ))
+    task.add_done_callback(lambda _: queue.put_nowait(done))
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is done:
+                break
+            yield chunk
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(f"Streaming generation failed: {task.exception()!r}")
+        elif task.result():
+            # Stopped early (or skipped): the caller's quality check rejects it
+            get_token_budgets().record_abort(kind, task.result())
+            logger.info(f"LLM stream aborted early ({task.result()}) for {kind}")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def _stream_with_fallback(
+    kind: str,
+    prompt: str,
+    max_tokens: int,
+    finalize: Callable[[str], Any],
+    fallback: Callable[[], Any],
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream (event, data) pairs: "token" events while the model decodes, then a
+    "final" event with the structured result. `finalize(text)` turns the full
+    output into the result, or returns a falsy value to reject it.
+
+    If the partial output starts echoing the prompt, generation is aborted
+    and a "fallback" event is sent, followed by the rule-based result. While
+    the kind's quality breaker is open the model is skipped the same way.
+    """
+    if not get_quality_breaker().allow(kind):
+        yield "fallback", {"reason": "breaker_open"}
+        yield "final", {"engine": "rules", "result": fallback()}
+        return
+
+    text = ""
+    verdict: Optional[bool] = None
+    stream = _stream_local(prompt, max_tokens, kind)
+    try:
+        async for chunk in stream:
+            text += chunk
+            if _echoes_prompt(text):
+                verdict = False
+                get_token_budgets().record_abort(kind, "echo")
+                logger.warning("LLM stream rejected — echoing prompt template. Using rule-based engine.")
+                yield "fallback", {"reason": "echo"}
+                yield "final", {"engine": "rules", "result": fallback()}
+                return
+            yield "token", {"text": chunk}
+
+        result = finalize(text)
+        # No text at all means nothing was generated (rules tier, failure)
+        verdict = bool(result) if text else None
+        if not result:
+            yield "fallback", {"reason": "quality"}
+            yield "final", {"engine": "rules", "result": fallback()}
+            return
+        yield "final", {"engine": "llm", "result": result}
+    finally:
+        await stream.aclose()
+        _record_verdict(kind, verdict)
+
+
+# ── Latency budgets ───────────────────────────────────────────────────────────
+# Each kind races the model against its LLM_LATENCY_BUDGETS_MS deadline. The
+# rule-based answer is computed up front (microseconds), so a missed deadline
+# costs nothing extra; the late model output can still be memoized.
+
+_generation_meta: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_generation_meta", default=None)
+# Per-call details filled in by _run_local (the model tier that served it)
+_call_info: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_call_info", default=None)
+_engine_counts: Dict[str, Counter] = defaultdict(Counter)
+
+
+@contextmanager
+def generation_metadata() -> Iterator[Dict[str, Any]]:
+    """
+    Collect metadata about the generation(s) awaited inside the block, e.g.
+    `{"engine": "llm" | "rules" | "memo", "tier": "google/flan-t5-small",
+    "budget_missed": bool}`.
+    """
+    meta: Dict[str, Any] = {}
+    token = _generation_meta.set(meta)
+    try:
+        yield meta
+    finally:
+        _generation_meta.reset(token)
+
+
+def _record_engine(
+    kind: str, engine: str, budget_missed: bool = False, tier: Optional[str] = None
+) -> None:
+    _engine_counts[kind][engine] += 1
+    if budget_missed:
+        _engine_counts[kind]["budget_missed"] += 1
+    meta = _generation_meta.get()
+    if meta is not None:
+        meta["engine"] = engine
+        meta["tier"] = tier
+        meta["budget_missed"] = budget_missed
+
+
+async def _within_budget(
+    kind: str,
+    llm: Awaitable[Optional[str]],
+    fallback: Callable[[], Any],
+    finalize: Callable[[Optional[str]], Any] = lambda text: text,
+    on_late: Optional[Callable[[Any], None]] = None,
+) -> Tuple[Any, bool]:
+    """
+    Await `llm` (a `_run_local` call) for at most the kind's latency budget.
+
+    Returns (value, completed): the finalized model output, or the rule-based
+    `fallback()` when the output was rejected, generation failed or the budget
+    ran out. `completed` is True when the primary model finished in time, i.e.
+    the value is reproducible and may be memoized (output from a fallback
+    model tier is not).
+
+    On a missed budget the generation keeps running only if `on_late` is given
+    and LLM_CACHE_LATE_RESULTS is on; `on_late(value)` then receives what the
+    call would have returned. Otherwise it is cancelled to free the slot.
+    """
+    rules_value = fallback()
+    budget_ms = settings.LLM_LATENCY_BUDGETS_MS.get(kind, 0)
+    # The task runs in a copy of the current context, so it shares `info`
+    info: Dict[str, Any] = {}
+    token = _call_info.set(info)
+    try:
+        task = asyncio.ensure_future(llm)
+    finally:
+        _call_info.reset(token)
+    try:
+        if budget_ms > 0:
+            raw = await asyncio.wait_for(asyncio.shield(task), budget_ms / 1000)
+        else:
+            raw = await task
+    except asyncio.TimeoutError:
+        if on_late is not None and settings.LLM_CACHE_LATE_RESULTS:
+            def _store_late(t: asyncio.Future) -> None:
+                if t.cancelled() or t.exception() is not None or t.result() is None:
+                    return
+                if info.get("tier") != settings.LLM_MODEL:
+                    return
+                on_late(finalize(t.result()) or rules_value)
+                _engine_counts[kind]["late_cached"] += 1
+
+            task.add_done_callback(_store_late)
+        else:
+            task.cancel()
+        logger.info(f"LLM missed its {budget_ms:.0f}ms budget for {kind}. Using rule-based engine.")
+        _record_engine(kind, "rules", budget_missed=True, tier=info.get("tier"))
+        return rules_value, False
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+    value = finalize(raw)
+    tier = info.get("tier")
+    _record_engine(kind, "llm" if value else "rules", tier=tier)
+    return value or rules_value, raw is not None and tier == settings.LLM_MODEL
+
+
+async def _memoized(
+    kind: str,
+    inputs: Dict[str, Any],
+    generate: Callable[[Optional[Callable[[Any], None]]], Awaitable[Tuple[Any, bool]]],
+    db: Optional[Session] = None,
+    subject_id: Optional[str] = None,
+) -> Any:
+    """
+    Return the memoized result for (kind, inputs, model id), or call
+    `generate(on_late)` -> (value, cacheable) and memoize the value when
+    cacheable. `on_late` memoizes a result that arrives after the latency
+    budget. Only active in deterministic mode; with `db` + `subject_id` the
+    result is also persisted in llm_results for that row.
+    """
+    if not settings.LLM_DETERMINISTIC:
+        value, _ = await generate(None)
+        return value
+
+    memo = get_llm_memo()
+    model_id = _model_id()
+    key = memo_key(kind, inputs, model_id)
+    cached = memo.get(key)
+    if cached is None and db is not None and subject_id:
+        cached = memo.load_persisted(db, key)
+    if cached is not None:
+        _record_engine(kind, "memo")
+        return cached
+
+    value, cacheable = await generate(lambda late: memo.put(key, late))
+    if cacheable:
+        memo.put(key, value)
+        if db is not None and subject_id:
+            memo.save_persisted(db, key, kind, model_id, subject_id, value)
+    return value
 
 
 # ── Public API ────────────────────────────────────────────────────────────────
@@ -78,25 +629,40 @@ def _call_local(prompt: str, max_tokens: int = 256) -> str:
 async def generate_reflection_insight(
     decision: Dict[str, Any], actual_outcome: str, lessons: str
 ) -> str:
-    # Try local model first; fall back to rule-based engine (always high quality)
-    result = _call_local(build_reflection_prompt(decision, actual_outcome, lessons), 300)
-    if result:
-        return result
-    return generate_reflection_insight_rule_based(decision, actual_outcome, lessons)
+    # Race the local model against the budget; the rule-based engine is always high quality
+    value, _ = await _within_budget(
+        "reflection",
+        _run_local(build_reflection_prompt(decision, actual_outcome, lessons), 300, "reflection"),
+        lambda: generate_reflection_insight_rule_based(decision, actual_outcome, lessons),
+    )
+    return value
 
 
 async def generate_replay_summary(decisions: List[Dict], query: str) -> str:
-    result = _call_local(build_replay_prompt(decisions, query), 400)
-    if result:
-        return result
-    return generate_replay_summary_rule_based(decisions, query)
+    value, _ = await _within_budget(
+        "replay_summary",
+        _run_local(build_replay_prompt(decisions, query), 400, "replay_summary"),
+        lambda: generate_replay_summary_rule_based(decisions, query),
+    )
+    return value
 
 
-async def generate_alternative_strategy(decision: Dict[str, Any]) -> str:
-    result = _call_local(build_alternative_strategy_prompt(decision), 200)
-    if result:
-        return result
-    return generate_alternative_strategy_rule_based(decision)
+async def generate_alternative_strategy(
+    decision: Dict[str, Any],
+    db: Optional[Session] = None,
+    decision_id: Optional[str] = None,
+) -> str:
+    # Decisions are immutable, so in deterministic mode the strategy is
+    # generated once and persisted against the decision id.
+    def generate(on_late):
+        return _within_budget(
+            "alternative_strategy",
+            _run_local(build_alternative_strategy_prompt(decision), 200, "alternative_strategy"),
+            lambda: generate_alternative_strategy_rule_based(decision),
+            on_late=on_late,
+        )
+
+    return await _memoized("alternative_strategy", decision, generate, db, decision_id)
 
 
 async def generate_daily_guidance(
@@ -106,20 +672,87 @@ async def generate_daily_guidance(
     decision_type: str = "reversible",
 ) -> Dict[str, str]:
     prompt = build_daily_guidance_prompt(query, similar_decisions, weekly_summary, decision_type)
-    raw = _call_local(prompt, 512)
-    if raw:
-        lines = [line.strip() for line in raw.strip().split("\n") if line.strip()]
-        if len(lines) >= 3:
-            return {
-                "high_impact":         lines[0],
-                "avoid_busy_work":     lines[1],
-                "long_term_alignment": lines[2],
-            }
-    return generate_daily_guidance_rule_based(query, similar_decisions, weekly_summary)
+
+    def generate(on_late):
+        return _within_budget(
+            "daily_guidance",
+            _run_local(prompt, 512, "daily_guidance"),
+            lambda: generate_daily_guidance_rule_based(query, similar_decisions, weekly_summary),
+            finalize=_parse_guidance,
+            on_late=on_late,
+        )
+
+    # The prompt is the complete input, so it doubles as the memo key
+    return await _memoized("daily_guidance", {"prompt": prompt}, generate)
+
+
+def _parse_guidance(raw: Optional[str]) -> Optional[Dict[str, str]]:
+    """Split accepted model output into the three guidance lines, if present."""
+    if not raw:
+        return None
+    lines = [line.strip() for line in raw.strip().split("\n") if line.strip()]
+    if len(lines) < 3:
+        return None
+    return {
+        "high_impact":         lines[0],
+        "avoid_busy_work":     lines[1],
+        "long_term_alignment": lines[2],
+    }
 
 
 async def generate_weekly_insight(summary: Dict[str, Any]) -> str:
-    result = _call_local(build_insight_prompt(summary), 200)
-    if result:
-        return result
-    return generate_weekly_insight_rule_based(summary)
+    def generate(on_late):
+        return _within_budget(
+            "weekly_insight",
+            _run_local(build_insight_prompt(summary), 200, "weekly_insight"),
+            lambda: generate_weekly_insight_rule_based(summary),
+            on_late=on_late,
+        )
+
+    return await _memoized("weekly_insight", summary, generate)
+
+
+# ── Streaming API (server-sent events) ────────────────────────────────────────
+# Each yields (event, data) pairs: "token"*, optional "fallback", then "final".
+
+def stream_reflection_insight(
+    decision: Dict[str, Any], actual_outcome: str, lessons: str
+) -> AsyncIterator[Tuple[str, Any]]:
+    return _stream_with_fallback(
+        "reflection",
+        build_reflection_prompt(decision, actual_outcome, lessons), 300,
+        _accept_output,
+        lambda: generate_reflection_insight_rule_based(decision, actual_outcome, lessons),
+    )
+
+
+def stream_replay_summary(decisions: List[Dict], query: str) -> AsyncIterator[Tuple[str, Any]]:
+    return _stream_with_fallback(
+        "replay_summary",
+        build_replay_prompt(decisions, query), 400,
+        _accept_output,
+        lambda: generate_replay_summary_rule_based(decisions, query),
+    )
+
+
+def stream_daily_guidance(
+    query: str,
+    similar_decisions: List[Dict],
+    weekly_summary: Dict[str, Any] | None,
+    decision_type: str = "reversible",
+) -> AsyncIterator[Tuple[str, Any]]:
+    return _stream_with_fallback(
+        "daily_guidance",
+        build_daily_guidance_prompt(query, similar_decisions, weekly_summary, decision_type), 512,
+        lambda text: _parse_guidance(_accept_output(text)),
+        lambda: generate_daily_guidance_rule_based(query, similar_decisions, weekly_summary),
+    )
+
+
+metrics.register(
+    "llm_engines",
+    lambda: {
+        "budgets_ms": settings.LLM_LATENCY_BUDGETS_MS,
+        "kinds": {kind: dict(counts) for kind, counts in _engine_counts.items()},
+    },
+)
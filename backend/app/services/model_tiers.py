@@ -0,0 +1,138 @@
+"""
+Model Tiers — load-adaptive choice of which model serves a generation.
+
+The tiers are LLM_MODEL followed by LLM_FALLBACK_TIERS, best first, e.g.
+
+    ["google/flan-t5-base", "google/flan-t5-small", "rules"]
+
+where "rules" means no generation at all (the rule-based engine answers).
+Fallback model tiers run on the same LLM_BACKEND as the primary model.
+Each call steps down one tier per unit of pressure, taking the worst of
+three live signals:
+
+  queue — callers waiting for an inference slot, per LLM_TIER_QUEUE_STEP
+  p95   — end-to-end generation latency over the last LLM_TIER_WINDOW_SECONDS,
+          in multiples of LLM_TIER_P95_MS
+  cpu   — 1-minute load average per core above LLM_TIER_CPU_LOAD (one step),
+          or above 1.5× that (two steps)
+
+Latency samples age out of the window, so the service climbs back to the
+best tier on its own once load drops.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils import metrics
+
+RULES_TIER = "rules"
+
+# os.getloadavg() is cheap, but there is no point sampling it per call
+_CPU_SAMPLE_SECONDS = 1.0
+
+
+class ModelTiers:
+    def __init__(
+        self,
+        tiers: List[str],
+        queue_step: int,
+        p95_ms: float,
+        cpu_load: float,
+        window_seconds: float,
+    ):
+        self.tiers = tiers
+        self.queue_step = max(1, queue_step)
+        self.p95_ms = p95_ms
+        self.cpu_load = cpu_load
+        self.window = window_seconds
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=1000)
+        self._cpu: Tuple[float, float] = (0.0, 0.0)  # (sampled_at, load per core)
+        self._lock = threading.Lock()
+
+        self.selected: Counter = Counter()
+        self.last_signals: Dict[str, float] = {}
+
+    @property
+    def primary(self) -> str:
+        return self.tiers[0]
+
+    def record_latency(self, ms: float) -> None:
+        with self._lock:
+            self._latencies.append((time.monotonic(), ms))
+
+    def p95(self) -> Optional[float]:
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            while self._latencies and self._latencies[0][0] < cutoff:
+                self._latencies.popleft()
+            samples = sorted(ms for _, ms in self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(math.ceil(0.95 * len(samples))) - 1)]
+
+    def _cpu_per_core(self) -> float:
+        now = time.monotonic()
+        sampled_at, load = self._cpu
+        if now - sampled_at >= _CPU_SAMPLE_SECONDS:
+            try:
+                load = os.getloadavg()[0] / (os.cpu_count() or 1)
+            except OSError:  # not available on this platform
+                load = 0.0
+            self._cpu = (now, load)
+        return load
+
+    def select(self, queue_depth: int) -> str:
+        """Tier to use for the next generation, given the current queue depth."""
+        if len(self.tiers) == 1:
+            self.selected[self.primary] += 1
+            return self.primary
+
+        p95 = self.p95()
+        cpu = self._cpu_per_core()
+        steps = {
+            "queue": queue_depth // self.queue_step,
+            "p95": int(p95 // self.p95_ms) if p95 is not None and self.p95_ms > 0 else 0,
+            "cpu": 0 if self.cpu_load <= 0 or cpu < self.cpu_load else (1 if cpu < 1.5 * self.cpu_load else 2),
+        }
+        tier = self.tiers[min(max(steps.values()), len(self.tiers) - 1)]
+        self.last_signals = {
+            "queue_depth": queue_depth,
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "cpu_load_per_core": round(cpu, 2),
+        }
+        self.selected[tier] += 1
+        return tier
+
+    def stats(self) -> dict:
+        return {
+            "tiers": self.tiers,
+            "selected": dict(self.selected),
+            "signals": self.last_signals,
+        }
+
+
+_tiers: ModelTiers | None = None
+_tiers_lock = threading.Lock()
+
+
+def get_model_tiers() -> ModelTiers:
+    global _tiers
+    if _tiers is None:
+        with _tiers_lock:
+            if _tiers is None:
+                _tiers = ModelTiers(
+                    [settings.LLM_MODEL, *settings.LLM_FALLBACK_TIERS],
+                    settings.LLM_TIER_QUEUE_STEP,
+                    settings.LLM_TIER_P95_MS,
+                    settings.LLM_TIER_CPU_LOAD,
+                    settings.LLM_TIER_WINDOW_SECONDS,
+                )
+    return _tiers
+
+
+metrics.register("llm_tiers", lambda: get_model_tiers().stats())
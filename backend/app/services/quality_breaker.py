@@ -0,0 +1,136 @@
+"""
+Quality Breaker — per prompt kind circuit breaker for LLM output quality.
+
+Every generation of a kind is recorded as good (accepted) or bad (rejected
+by the quality filter, or failed). When the bad share over the last
+LLM_BREAKER_WINDOW outcomes reaches LLM_BREAKER_THRESHOLD, the breaker opens
+and that kind skips the model entirely, going straight to the rule-based
+engine.
+
+    closed ──(bad rate ≥ threshold)──▶ open ──(cooldown over)──▶ half-open
+       ▲                                 ▲                           │
+       └────────(probe accepted)─────────┼────(probe rejected)───────┘
+
+In half-open state exactly one request (the probe) reaches the model; all
+others keep using the rules until the probe's verdict is in.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app.config import settings
+from app.utils import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _KindState:
+    def __init__(self, window: int):
+        self.outcomes: Deque[bool] = deque(maxlen=window)  # True = bad
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.counters = {
+            "good": 0, "bad": 0, "skipped": 0, "opened": 0, "probes": 0, "recovered": 0,
+        }
+
+    def bad_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class QualityBreaker:
+    def __init__(self, window: int, min_samples: int, threshold: float, cooldown_seconds: float):
+        self.window = max(1, window)
+        self.min_samples = max(1, min(min_samples, self.window))
+        self.threshold = threshold
+        self.cooldown = cooldown_seconds
+        self._kinds: Dict[str, _KindState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, kind: str) -> _KindState:
+        if kind not in self._kinds:
+            self._kinds[kind] = _KindState(self.window)
+        return self._kinds[kind]
+
+    def allow(self, kind: Optional[str]) -> bool:
+        """Whether a generation of `kind` should reach the model right now."""
+        if not kind or not settings.LLM_BREAKER_ENABLED:
+            return True
+        with self._lock:
+            s = self._state(kind)
+            if s.state == OPEN and time.monotonic() - s.opened_at >= self.cooldown:
+                s.state = HALF_OPEN
+            if s.state == HALF_OPEN and not s.probe_in_flight:
+                s.probe_in_flight = True
+                s.counters["probes"] += 1
+                return True
+            if s.state == CLOSED:
+                return True
+            s.counters["skipped"] += 1
+            return False
+
+    def record(self, kind: Optional[str], good: bool) -> None:
+        """Record the verdict on a generation that `allow` let through."""
+        if not kind or not settings.LLM_BREAKER_ENABLED:
+            return
+        with self._lock:
+            s = self._state(kind)
+            s.counters["good" if good else "bad"] += 1
+            if s.state == HALF_OPEN and s.probe_in_flight:
+                s.probe_in_flight = False
+                if good:
+                    s.state = CLOSED
+                    s.outcomes.clear()
+                    s.counters["recovered"] += 1
+                else:
+                    s.state = OPEN
+                    s.opened_at = time.monotonic()
+                    s.counters["opened"] += 1
+                return
+            s.outcomes.append(not good)
+            if (
+                s.state == CLOSED
+                and len(s.outcomes) >= self.min_samples
+                and s.bad_rate() >= self.threshold
+            ):
+                s.state = OPEN
+                s.opened_at = time.monotonic()
+                s.counters["opened"] += 1
+
+    def abandon(self, kind: Optional[str]) -> None:
+        """A let-through generation ended without a verdict (cancelled, queue full)."""
+        if not kind:
+            return
+        with self._lock:
+            s = self._kinds.get(kind)
+            if s is not None and s.state == HALF_OPEN and s.probe_in_flight:
+                s.probe_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                kind: {"state": s.state, "bad_rate": round(s.bad_rate(), 3), **s.counters}
+                for kind, s in self._kinds.items()
+            }
+
+
+_breaker = QualityBreaker(
+    settings.LLM_BREAKER_WINDOW,
+    settings.LLM_BREAKER_MIN_SAMPLES,
+    settings.LLM_BREAKER_THRESHOLD,
+    settings.LLM_BREAKER_COOLDOWN_SECONDS,
+)
+
+
+def get_quality_breaker() -> QualityBreaker:
+    return _breaker
+
+
+metrics.register(
+    "llm_quality_breaker",
+    lambda: {"enabled": settings.LLM_BREAKER_ENABLED, "kinds": _breaker.stats()},
+)
@@ -1,44 +1,167 @@
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.services.embedding_service import generate_embedding
-from app.models.reflection import Reflection
+from app.config import settings
+from app.services import vector_index
+from app.utils import metrics
+from app.services.embedding_service import classify_embedding, generate_embedding_async
+from app.services.retrieval_backend import _Row, get_retrieval_backend
 from app.models.weekly_summary import WeeklySummary
 
 
-def find_similar_decisions(
+# Retrieval statement: nearest embedded decisions plus the user's decisions
+# that are not embedded yet, each joined to its latest reflection — one round
+# trip however large top_k is. The query vector appears once, as a bound
+# parameter, so the text is identical for every query. Distance operator and
+# index knobs come from vector_index.
+_SIMILAR_SQL = """
+    WITH nearest AS (
+        SELECT id, title, reasoning, assumptions, expected_outcome,
+               confidence_score, category_tag, created_at,
+               embedding {op} {q} AS distance
+        FROM {source}
+        WHERE user_id = {uid}
+          AND embedding IS NOT NULL
+        ORDER BY distance
+        LIMIT {k}
+    ), unenriched AS (
+        SELECT id, title, reasoning, assumptions, expected_outcome,
+               confidence_score, category_tag, created_at,
+               NULL::float8 AS distance
+        FROM decisions
+        WHERE user_id = {uid}
+          AND embedding IS NULL
+        ORDER BY created_at DESC
+        LIMIT {pending}
+    ), candidates AS (
+        SELECT * FROM nearest
+        UNION ALL
+        SELECT * FROM unenriched
+    ), available AS (
+        -- Embedded rows the user has (capped at k): always one row, so an
+        -- empty ANN result still says whether an exact scan would find any
+        SELECT count(*) AS available FROM (
+            SELECT 1 FROM decisions
+            WHERE user_id = {uid} AND embedding IS NOT NULL
+            LIMIT {k}
+        ) e
+    )
+    SELECT c.*, {similarity} AS similarity,
+           r.id AS reflection_id, r.actual_outcome, r.lessons, a.available
+    FROM available a
+    LEFT JOIN candidates c ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT id, actual_outcome, lessons
+        FROM reflections
+        WHERE decision_id = c.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) r ON TRUE
+    ORDER BY c.distance NULLS LAST
+"""
+# Exact scan: OFFSET 0 keeps the user filter inside the subquery, so the
+# ANN index cannot serve the ORDER BY (GUCs would not reach a cached plan)
+_EXACT_SOURCE = "(SELECT * FROM decisions WHERE user_id = {uid} OFFSET 0) d"
+
+
+def _render(exact: bool, q: str, uid: str, k: str, pending: str) -> str:
+    return _SIMILAR_SQL.format(
+        op=vector_index.distance_operator(),
+        similarity=vector_index.similarity_expression("c.distance"),
+        source=_EXACT_SOURCE.format(uid=uid) if exact else "decisions",
+        q=q, uid=uid, k=k, pending=pending,
+    )
+
+
+def _prepared_name(exact: bool) -> str:
+    return f"jarvis_similar_{vector_index.metric()}_{'exact' if exact else 'ann'}"
+
+
+def _prepare_sql(exact: bool) -> str:
+    return f"PREPARE {_prepared_name(exact)} (vector, text, int, int) AS " + _render(
+        exact, q="$1", uid="$2", k="$3", pending="$4"
+    )
+
+
+def _inline_sql(exact: bool) -> str:
+    return _render(exact, q="CAST(:q AS vector)", uid=":uid", k=":k", pending=":pending")
+
+
+def _similar_rows(
+    db: Session,
+    query_embedding: np.ndarray,
+    user_id: str,
+    top_k: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    exact: bool = False,
+) -> Tuple[List[Any], int]:
+    """
+    Run the retrieval statement, preceded (same round trip) by the
+    transaction-local index knobs. Returns the candidate rows and how many
+    embedded decisions the user has (capped at top_k). With PGVECTOR_PREPARED_STATEMENTS it is
+    prepared once per pooled connection (parsed and planned server-side,
+    then reused); the float32 query vector is bound by pgvector's adapter.
+    """
+    conn = db.connection()
+    knobs, params = vector_index.search_knobs(conn, top_k, ef_search, probes, exact)
+    params.update({
+        "q": np.asarray(query_embedding, dtype=np.float32),
+        "uid": user_id,
+        "k": top_k,
+        "pending": max(0, settings.ENRICHMENT_INLINE_LIMIT),
+    })
+    if not settings.PGVECTOR_PREPARED_STATEMENTS:
+        rows = conn.execute(text(knobs + _inline_sql(exact)), params).fetchall()
+    else:
+        name = _prepared_name(exact)
+        # conn.info lives as long as the DBAPI connection, like the PREPARE
+        if not conn.info.get(name):
+            conn.exec_driver_sql(_prepare_sql(exact))
+            conn.info[name] = True
+        rows = conn.execute(
+            text(f"{knobs} EXECUTE {name} (:q, :uid, :k, :pending)"), params
+        ).fetchall()
+    # No candidates: the single row only carries `available`
+    available = rows[0].available if rows else 0
+    return [r for r in rows if r.id is not None], available
+
+
+async def find_similar_decisions(
     db: Session,
     query: str,
     user_id: str = "default_user",
     top_k: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
     """
-    RAG Step 1–2: Embed the query, run pgvector cosine similarity search,
-    return top-k decisions enriched with their reflection outcomes.
+    RAG Step 1–2: Embed the query, run the similarity search of the
+    RETRIEVAL_BACKEND (pgvector by default), return top-k decisions enriched
+    with their reflection outcomes.
+    Pass `query_embedding` when the caller has already embedded the query.
+    Decisions still waiting for the enrichment worker are scored in-process
+    (see _score_unenriched) so fresh captures are not missing from results.
+    `ef_search` / `probes` override the index knobs for this query only.
     """
     # Step 1: Generate embedding
-    query_embedding = generate_embedding(query)
-    embedding_str = "[" + ",".join(str(x) for x in query_embedding) + "]"
-
-    # Step 2: pgvector cosine similarity query
-    # Note: embedding_str is f-string interpolated (not bound param) because
-    # SQLAlchemy's :param syntax conflicts with PostgreSQL's ::vector cast.
-    # It is safe here since embedding_str is a computed float array, not user input.
-    sql = text(f"""
-        SELECT id, title, reasoning, assumptions, expected_outcome,
-               confidence_score, category_tag, created_at,
-               1 - (embedding <=> '{embedding_str}'::vector) AS similarity
-        FROM decisions
-        WHERE user_id = :uid
-          AND embedding IS NOT NULL
-        ORDER BY embedding <=> '{embedding_str}'::vector
-        LIMIT :k
-    """)
+    if query_embedding is None:
+        query_embedding = await generate_embedding_async(query)
 
-    rows = db.execute(sql, {"uid": user_id, "k": top_k}).fetchall()
+    # Step 2: similarity search (pgvector statement or in-process index)
+    rows = get_retrieval_backend().search(db, user_id, query_embedding, top_k, ef_search, probes)
+    scored = [r for r in rows if r.distance is not None]
+    unenriched = [r for r in rows if r.distance is None]
+    if unenriched:
+        scored += await _score_unenriched(unenriched, query_embedding)
+        scored.sort(key=lambda r: r.similarity, reverse=True)
 
     results = []
-    for row in rows:
+    for row in scored[:top_k]:
         d = {
             "id": str(row.id),
             "title": row.title,
@@ -50,18 +173,58 @@ def find_similar_decisions(
             "created_at": str(row.created_at),
             "similarity": round(float(row.similarity), 4),
         }
-        # Attach reflection if available
-        reflection = (
-            db.query(Reflection).filter(Reflection.decision_id == str(row.id)).first()
-        )
-        if reflection:
-            d["actual_outcome"] = reflection.actual_outcome
-            d["lessons"] = reflection.lessons
+        # Latest reflection, if any (joined above)
+        if row.reflection_id is not None:
+            d["actual_outcome"] = row.actual_outcome
+            d["lessons"] = row.lessons
         results.append(d)
 
     return results
 
 
+async def _score_unenriched(rows: List[Any], query_embedding) -> List[Any]:
+    """
+    Score decisions that have no embedding yet (captured with deferred
+    enrichment) against the query in-process. Their text is embedded through
+    the shared dispatcher and embedding cache, so the worker's later pass
+    reuses the vectors. Category is derived from the same vector.
+    """
+    from app.services.embedding_dispatcher import embed
+    from app.services.enrichment import canonical_text
+
+    vectors = await asyncio.gather(*(
+        embed(canonical_text(r.title, r.reasoning or "", r.expected_outcome or ""))
+        for r in rows
+    ))
+    query = np.asarray(query_embedding, dtype=np.float32)
+    scored = []
+    for r, vec in zip(rows, vectors):
+        row = dict(getattr(r, "_mapping", r))
+        # Vectors are normalized, so cosine similarity is the dot product
+        row["similarity"] = float(np.dot(vec, query))
+        row["category_tag"] = row["category_tag"] or classify_embedding(vec)
+        scored.append(_Row(row))
+    return scored
+
+
+def get_user_data_version(db: Session, user_id: str = "default_user") -> str:
+    """
+    Cheap version stamp of a user's captured data: the latest decision and
+    reflection timestamps. Changes whenever the user captures something new.
+    """
+    row = db.execute(
+        text("""
+            SELECT
+                (SELECT MAX(created_at) FROM decisions WHERE user_id = :uid) AS d,
+                (SELECT MAX(r.created_at)
+                   FROM reflections r JOIN decisions dd ON dd.id = r.decision_id
+                  WHERE dd.user_id = :uid) AS r
+        """),
+        {"uid": user_id},
+    ).first()
+    return f"{row.d}|{row.r}" if row else ""
+
+
 def get_latest_weekly_summary(
     db: Session, user_id: str = "default_user"
 ) -> Dict[str, Any] | None:
@@ -111,3 +274,10 @@ def build_rag_context(
         )
 
     return "\n".join(parts)
+
+
+metrics.register("vector_search", lambda: {
+    "index": vector_index.index_name() if settings.VECTOR_INDEX_TYPE != "none" else None,
+    "scan_mode": settings.VECTOR_SCAN_MODE,
+    "exact_fallbacks": get_retrieval_backend().stats().get("exact_fallbacks", 0),
+})
@@ -0,0 +1,259 @@
+"""
+Remote LLM — pooled HTTP client for generation on a separate inference box.
+
+Used by llm_service when LLM_BACKEND=remote. One shared httpx.AsyncClient per
+event loop keeps connections alive (optionally over HTTP/2), and a semaphore
+bounds in-flight requests to LLM_REMOTE_MAX_CONCURRENCY.
+
+Endpoint styles (LLM_REMOTE_STYLE):
+  tgi    — POST {url}/generate        {"inputs", "parameters"} → {"generated_text"}
+  openai — POST {url}/v1/completions  {"model", "prompt", …}   → {"choices": [{"text"}]}
+
+Transient failures (connect errors, timeouts, 429, 5xx) are retried up to
+LLM_REMOTE_RETRIES times with exponential backoff and full jitter; a 429/503
+Retry-After header is honoured. With LLM_REMOTE_HEDGE_AFTER_MS set, a request
+still running after that long is duplicated (if a concurrency slot is free)
+and whichever copy answers first wins — this trims tail latency at the cost
+of a little extra load.
+
+For local testing: python -m app.services.remote_llm_stub
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger("jarvis.remote_llm")
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RemoteLLMError(Exception):
+    """The remote endpoint failed after all retries (or returned a bad payload)."""
+
+
+class RemoteLLMClient:
+    def __init__(
+        self,
+        base_url: str,
+        style: str,
+        model: str,
+        api_key: str = "",
+        max_concurrency: int = 16,
+        timeout: float = 30.0,
+        retries: int = 2,
+        backoff_ms: float = 200.0,
+        hedge_after_ms: float = 0.0,
+        http2: bool = False,
+    ):
+        if style not in ("tgi", "openai"):
+            raise ValueError(f"Unknown LLM_REMOTE_STYLE {style!r}; expected 'tgi' or 'openai'")
+        self.base_url = base_url.rstrip("/")
+        self.style = style
+        self.model = model
+        self.api_key = api_key
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff_ms / 1000.0
+        self.hedge_after = hedge_after_ms / 1000.0
+        self.http2 = http2
+        self.loop = asyncio.get_running_loop()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        self.in_flight = 0
+        self.requests = 0
+        self.attempts = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.latency_ms = metrics.Histogram([100, 250, 500, 1000, 2500, 5000, 10000, 30000])
+
+    # ── HTTP plumbing ─────────────────────────────────────────────────────────
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("LLM_REMOTE_HTTP2 needs the 'h2' package (httpx[http2]); using HTTP/1.1")
+                    http2 = False
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=min(5.0, self.timeout)),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=60.0,
+                ),
+                headers=headers,
+                http2=http2,
+            )
+        return self._client
+
+    def _request(self, prompt: str, max_tokens: int, decoding: Dict[str, Any]):
+        sample = bool(decoding.get("do_sample"))
+        temperature = decoding.get("temperature", 0.7) if sample else 0.0
+        if self.style == "openai":
+            return f"{self.base_url}/v1/completions", {
+                "model": self.model,
+                "prompt": prompt,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            }
+        parameters: Dict[str, Any] = {
+            "max_new_tokens": max_tokens,
+            "do_sample": sample,
+            "return_full_text": False,
+        }
+        if sample:
+            parameters["temperature"] = temperature
+        return f"{self.base_url}/generate", {"inputs": prompt, "parameters": parameters}
+
+    def _parse(self, data: Any) -> str:
+        try:
+            if self.style == "openai":
+                return data["choices"][0]["text"]
+            if isinstance(data, list):  # HF Inference API wraps the result in a list
+                data = data[0]
+            return data["generated_text"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise RemoteLLMError(f"Unexpected {self.style} response: {str(data)[:200]}") from e
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None and "retry-after" in response.headers:
+            try:
+                return min(float(response.headers["retry-after"]), self.timeout)
+            except ValueError:
+                pass
+        # Exponential backoff with full jitter
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    async def _attempt_with_retries(self, url: str, payload: Dict[str, Any]) -> str:
+        last_error: Exception | None = None
+        for attempt in range(self.retries + 1):
+            response = None
+            self.attempts += 1
+            try:
+                response = await self._http().post(url, json=payload)
+                if response.status_code not in _RETRY_STATUS:
+                    response.raise_for_status()
+                    return self._parse(response.json())
+                last_error = RemoteLLMError(f"HTTP {response.status_code}")
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                last_error = e
+            except httpx.HTTPStatusError as e:  # 4xx other than 429: not retryable
+                raise RemoteLLMError(f"HTTP {e.response.status_code}: {e.response.text[:200]}") from e
+            if attempt < self.retries:
+                self.retried += 1
+                await asyncio.sleep(self._delay(attempt, response))
+        raise RemoteLLMError(f"Remote generation failed after {self.retries + 1} attempts: {last_error!r}")
+
+    async def _slotted(self, url: str, payload: Dict[str, Any]) -> str:
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await self._attempt_with_retries(url, payload)
+            finally:
+                self.in_flight -= 1
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    async def generate(self, prompt: str, max_tokens: int, decoding: Dict[str, Any]) -> str:
+        """Raw generated text for `prompt`; raises RemoteLLMError when all attempts fail."""
+        self.requests += 1
+        url, payload = self._request(prompt, max_tokens, decoding)
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._slotted(url, payload))
+        tasks = {primary}
+        try:
+            if self.hedge_after > 0:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+                # Hedge only when it will not queue behind other requests
+                if not done and not self._slots.locked():
+                    self.hedged += 1
+                    tasks.add(asyncio.ensure_future(self._slotted(url, payload)))
+
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self.latency_ms.observe((time.perf_counter() - started) * 1000)
+                        return task.result()
+                if not tasks:
+                    raise next(iter(done)).exception()
+            raise RemoteLLMError("no attempt was made")  # unreachable
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "url": self.base_url,
+            "style": self.style,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failures": self.failures,
+            "latency_ms": self.latency_ms.snapshot(),
+        }
+
+
+# ── Process-wide instance (bound to the running event loop) ───────────────────
+_client: RemoteLLMClient | None = None
+
+
+def get_remote_llm() -> RemoteLLMClient:
+    global _client
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.loop is not loop:
+        if not settings.LLM_REMOTE_URL:
+            raise RemoteLLMError("LLM_BACKEND=remote requires LLM_REMOTE_URL")
+        _client = RemoteLLMClient(
+            settings.LLM_REMOTE_URL,
+            settings.LLM_REMOTE_STYLE,
+            settings.LLM_REMOTE_MODEL or settings.LLM_MODEL,
+            settings.LLM_REMOTE_API_KEY,
+            settings.LLM_REMOTE_MAX_CONCURRENCY,
+            settings.LLM_REMOTE_TIMEOUT_SECONDS,
+            settings.LLM_REMOTE_RETRIES,
+            settings.LLM_REMOTE_BACKOFF_MS,
+            settings.LLM_REMOTE_HEDGE_AFTER_MS,
+            settings.LLM_REMOTE_HTTP2,
+        )
+    return _client
+
+
+async def shutdown_remote_llm() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+metrics.register("remote_llm", lambda: _client.stats() if _client else {"started": False})
@@ -0,0 +1,86 @@
+"""
+Stub remote LLM server for local testing of LLM_BACKEND=remote.
+
+Serves both endpoint styles (TGI `/generate` and OpenAI `/v1/completions`)
+with a deterministic canned completion, plus configurable latency, jitter
+and failure rate to exercise retries and hedging:
+
+    cd backend && python -m app.services.remote_llm_stub --port 8081 \\
+        --latency-ms 300 --jitter-ms 700 --error-rate 0.1
+
+    LLM_BACKEND=remote LLM_REMOTE_URL=http://127.0.0.1:8081 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def _completion(prompt: str, max_tokens: int) -> str:
+    """Deterministic text that passes the quality filter (long enough, no echo)."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    lines = [
+        f"Focus on the one task that moves revenue this week (stub {digest}).",
+        "Defer low-value admin work until the afternoon block.",
+        "Tie today's choice back to the quarterly growth goal.",
+    ]
+    words = "\n".join(lines).split(" ")
+    return " ".join(words[: max(1, max_tokens)])
+
+
+def create_app(latency_ms: float, jitter_ms: float, error_rate: float) -> FastAPI:
+    app = FastAPI(title="JARVIS remote LLM stub")
+    app.state.requests = 0
+
+    async def _simulate() -> JSONResponse | None:
+        app.state.requests += 1
+        await asyncio.sleep((latency_ms + random.uniform(0, jitter_ms)) / 1000)
+        if random.random() < error_rate:
+            return JSONResponse({"error": "stub failure"}, status_code=503, headers={"Retry-After": "0"})
+        return None
+
+    @app.post("/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        failure = await _simulate()
+        if failure is not None:
+            return failure
+        max_tokens = body.get("parameters", {}).get("max_new_tokens", 256)
+        return {"generated_text": _completion(body["inputs"], max_tokens)}
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        failure = await _simulate()
+        if failure is not None:
+            return failure
+        text = _completion(body["prompt"], body.get("max_tokens", 256))
+        return {
+            "object": "text_completion",
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "text": text, "finish_reason": "stop"}],
+        }
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "requests": app.state.requests}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stub remote LLM server (TGI + OpenAI styles)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate), host=args.host, port=args.port)
@@ -0,0 +1,414 @@
+"""
+Retrieval Backends — where find_similar_decisions gets its candidates.
+
+  pgvector  the retrieval statement in rag_service: ANN index scan plus the
+            user's not-yet-embedded decisions and latest reflections, one
+            round trip per query (default)
+  memory    a per-user in-process index: the user's normalized embeddings in
+            one contiguous float32 matrix, scored with a single matrix-vector
+            product and cut to top-k with argpartition. Decision fields and
+            latest reflections are held next to it, so a warm query does not
+            touch the database at all.
+  snapshot  the same scoring over the host's memory-mapped embedding snapshot
+            (embedding_snapshot.py), shared by every worker instead of copied
+            per process; one primary-key query then fetches the hits' fields
+            and reflections. Falls back to pgvector until a snapshot exists.
+
+Both return the same rows (decision columns, distance, similarity,
+reflection_id, actual_outcome, lessons); rows with distance None are
+decisions still waiting for enrichment, which rag_service scores in-process.
+
+The memory backend loads a user with one query on first use and is then
+kept current by the capture paths in this process (add on capture and on
+enrichment, reflection updates, remove). Users are evicted least-recently-
+used first beyond RETRIEVAL_MEMORY_MAX_USERS, and reloaded after
+RETRIEVAL_MEMORY_TTL_SECONDS so captures made by other worker processes
+show up — with several workers, that TTL bounds how stale a replay can be.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.utils import metrics
+from app.utils.similarity import normalize_rows, top_k_indices
+
+# Decision columns every backend returns, in the retrieval statement's order
+_FIELDS = (
+    "id", "title", "reasoning", "assumptions", "expected_outcome",
+    "confidence_score", "category_tag", "created_at",
+)
+_REFLECTION_FIELDS = ("reflection_id", "actual_outcome", "lessons")
+
+
+class _Row(dict):
+    """Attribute access over a dict, mirroring SQLAlchemy result rows."""
+    __getattr__ = dict.__getitem__
+
+
+def decision_fields(decision) -> Dict[str, Any]:
+    """The retrieval columns of a Decision (read before commit expires it)."""
+    return {f: getattr(decision, f) for f in _FIELDS}
+
+
+class RetrievalBackend(ABC):
+    """Interface behind find_similar_decisions. Capture hooks default to no-ops."""
+
+    name = "base"
+
+    @abstractmethod
+    def search(
+        self,
+        db: Session,
+        user_id: str,
+        query_embedding: np.ndarray,
+        top_k: int,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+    ) -> List[Any]:
+        """Nearest decisions for the user plus their not-yet-embedded ones."""
+
+    def add(self, user_id: str, fields: Dict[str, Any], embedding=None) -> None:
+        """A decision was captured or enriched (embedding None while pending)."""
+
+    def add_reflection(self, user_id: str, decision_id: str, reflection) -> None:
+        """A reflection was stored; it is now the decision's latest."""
+
+    def remove(self, user_id: str, decision_id: str) -> None:
+        """A decision was deleted."""
+
+    def capture(self, decision) -> None:
+        self.add(decision.user_id, decision_fields(decision), decision.embedding)
+
+    def stats(self) -> dict:
+        return {}
+
+
+# ── pgvector ──────────────────────────────────────────────────────────────────
+
+class PgvectorBackend(RetrievalBackend):
+    name = "pgvector"
+
+    def __init__(self):
+        self.exact_fallbacks = 0
+
+    def search(self, db, user_id, query_embedding, top_k, ef_search=None, probes=None):
+        from app.services.rag_service import _similar_rows
+
+        rows, available = _similar_rows(db, query_embedding, user_id, top_k, ef_search, probes)
+        embedded = sum(1 for r in rows if r.distance is not None)
+        if embedded < available:
+            # The ANN scan ran out before k rows passed the user filter
+            # (possibly with no rows at all); users without embedded
+            # decisions have available == 0 and are not rescanned
+            self.exact_fallbacks += 1
+            rows, _ = _similar_rows(db, query_embedding, user_id, top_k, exact=True)
+        return rows
+
+    def stats(self) -> dict:
+        return {"exact_fallbacks": self.exact_fallbacks}
+
+
+# ── In-process ────────────────────────────────────────────────────────────────
+
+# One statement loads a user: every decision with its latest reflection
+_LOAD_SQL = text("""
+    SELECT d.id, d.title, d.reasoning, d.assumptions, d.expected_outcome,
+           d.confidence_score, d.category_tag, d.created_at, d.embedding,
+           r.id AS reflection_id, r.actual_outcome, r.lessons
+    FROM decisions d
+    LEFT JOIN LATERAL (
+        SELECT id, actual_outcome, lessons
+        FROM reflections
+        WHERE decision_id = d.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) r ON TRUE
+    WHERE d.user_id = :uid
+""")
+
+
+def _as_vector(value) -> np.ndarray:
+    if isinstance(value, str):  # pgvector adapter not registered: '[0.1,...]'
+        return np.array(value.strip("[]").split(","), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+class _UserIndex:
+    """
+    One user's vectors: rows [0, n) of a contiguous float32 matrix (capacity
+    doubles as it fills), slot-aligned with ids and row dicts. Removal moves
+    the last row into the hole, so the live rows stay contiguous.
+    """
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.n = 0
+        self.ids: List[str] = []
+        self.rows: List[Dict[str, Any]] = []
+        self.slots: Dict[str, int] = {}
+        self.pending: Dict[str, Dict[str, Any]] = {}  # captured, no embedding yet
+        self.loaded_at = time.monotonic()
+
+    def row(self, decision_id: str) -> Optional[Dict[str, Any]]:
+        slot = self.slots.get(decision_id)
+        return self.rows[slot] if slot is not None else self.pending.get(decision_id)
+
+    def add(self, row: Dict[str, Any], embedding) -> None:
+        decision_id = str(row["id"])
+        previous = self.row(decision_id) or {}
+        for f in _REFLECTION_FIELDS:  # kept across re-enrichment
+            row.setdefault(f, previous.get(f))
+        self.remove(decision_id)
+        if embedding is None:
+            self.pending[decision_id] = row
+            return
+
+        if self.n == self.matrix.shape[0]:
+            grown = np.empty((self.n * 2, self.matrix.shape[1]), dtype=np.float32)
+            grown[:self.n] = self.matrix[:self.n]
+            self.matrix = grown
+        self.matrix[self.n] = normalize_rows(_as_vector(embedding))
+        self.slots[decision_id] = self.n
+        self.ids.append(decision_id)
+        self.rows.append(row)
+        self.n += 1
+
+    def remove(self, decision_id: str) -> None:
+        self.pending.pop(decision_id, None)
+        slot = self.slots.pop(decision_id, None)
+        if slot is None:
+            return
+        last = self.n - 1
+        if slot != last:
+            self.matrix[slot] = self.matrix[last]
+            self.ids[slot] = self.ids[last]
+            self.rows[slot] = self.rows[last]
+            self.slots[self.ids[slot]] = slot
+        self.ids.pop()
+        self.rows.pop()
+        self.n = last
+
+    def search(self, query: np.ndarray, top_k: int) -> List[_Row]:
+        scores = self.matrix[:self.n] @ query
+        results = []
+        for i in top_k_indices(scores, top_k):
+            similarity = float(scores[i])
+            # Same distance as the ip operator (pgvector's <#> is -dot)
+            results.append(_Row(self.rows[i], distance=-similarity, similarity=similarity))
+        pending = sorted(
+            self.pending.values(), key=lambda r: r["created_at"] or datetime.min, reverse=True
+        )[:max(0, settings.ENRICHMENT_INLINE_LIMIT)]
+        results.extend(_Row(r, distance=None, similarity=None) for r in pending)
+        return results
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+
+class InMemoryBackend(RetrievalBackend):
+    name = "memory"
+
+    def __init__(self, max_users: int, ttl_seconds: float, dim: int = 384):
+        self.max_users = max(1, max_users)
+        self.ttl = ttl_seconds
+        self.dim = dim
+        self._users: "OrderedDict[str, _UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self.search_ms = metrics.Histogram([0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25])
+
+    def _load(self, db: Session, user_id: str) -> _UserIndex:
+        rows = db.execute(_LOAD_SQL, {"uid": user_id}).fetchall()
+        index = _UserIndex(self.dim, capacity=max(16, len(rows)))
+        for r in rows:
+            row = dict(r._mapping)
+            embedding = row.pop("embedding")
+            index.add(row, embedding)
+        self.loads += 1
+        return index
+
+    def _index(self, db: Session, user_id: str) -> _UserIndex:
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None and time.monotonic() - index.loaded_at <= self.ttl:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return index
+        # Load outside the lock; a concurrent load of the same user just wins last
+        index = self._load(db, user_id)
+        with self._lock:
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evictions += 1
+        return index
+
+    def search(self, db, user_id, query_embedding, top_k, ef_search=None, probes=None):
+        # ef_search / probes are ANN knobs; this scan is exact
+        index = self._index(db, user_id)
+        query = normalize_rows(query_embedding)
+        started = time.perf_counter()
+        with self._lock:
+            rows = index.search(query, top_k)
+        self.search_ms.observe((time.perf_counter() - started) * 1000)
+        return rows
+
+    # Capture hooks only touch users already loaded; others load fresh on use
+
+    def add(self, user_id, fields, embedding=None):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                index.add({**fields, "id": str(fields["id"])}, embedding)
+
+    def add_reflection(self, user_id, decision_id, reflection):
+        with self._lock:
+            index = self._users.get(user_id)
+            row = index.row(str(decision_id)) if index is not None else None
+            if row is not None:
+                row["reflection_id"] = reflection.id
+                row["actual_outcome"] = reflection.actual_outcome
+                row["lessons"] = reflection.lessons
+
+    def remove(self, user_id, decision_id):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                index.remove(str(decision_id))
+
+    def stats(self) -> dict:
+        with self._lock:
+            indexes = list(self._users.values())
+        return {
+            "users": len(indexes),
+            "vectors": sum(i.n for i in indexes),
+            "pending": sum(len(i.pending) for i in indexes),
+            "matrix_bytes": sum(i.nbytes() for i in indexes),
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "search_ms": self.search_ms.snapshot(),
+        }
+
+
+# ── Memory-mapped snapshot ────────────────────────────────────────────────────
+
+# Hits from the snapshot (ids and scores as arrays) plus the user's
+# not-yet-embedded decisions, each with its latest reflection
+_HITS_SQL = text("""
+    WITH hits AS (
+        SELECT * FROM unnest(CAST(:ids AS uuid[]), CAST(:scores AS float8[])) AS h(id, similarity)
+    ), candidates AS (
+        SELECT d.id, d.title, d.reasoning, d.assumptions, d.expected_outcome,
+               d.confidence_score, d.category_tag, d.created_at,
+               -h.similarity AS distance, h.similarity
+        FROM hits h
+        JOIN decisions d ON d.id = h.id AND d.user_id = :uid
+        UNION ALL
+        SELECT * FROM (
+            SELECT id, title, reasoning, assumptions, expected_outcome,
+                   confidence_score, category_tag, created_at,
+                   NULL::float8 AS distance, NULL::float8 AS similarity
+            FROM decisions
+            WHERE user_id = :uid
+              AND embedding IS NULL
+            ORDER BY created_at DESC
+            LIMIT :pending
+        ) u
+    )
+    SELECT c.*, r.id AS reflection_id, r.actual_outcome, r.lessons
+    FROM candidates c
+    LEFT JOIN LATERAL (
+        SELECT id, actual_outcome, lessons
+        FROM reflections
+        WHERE decision_id = c.id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) r ON TRUE
+    ORDER BY c.distance NULLS LAST
+""")
+
+
+class SnapshotBackend(RetrievalBackend):
+    name = "snapshot"
+
+    def __init__(self):
+        from app.services.embedding_snapshot import get_embedding_snapshot
+
+        self.snapshot = get_embedding_snapshot()
+        self.fallback = PgvectorBackend()
+        self.fallbacks = 0
+        self.search_ms = metrics.Histogram([0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25])
+
+    def search(self, db, user_id, query_embedding, top_k, ef_search=None, probes=None):
+        self.snapshot.refresh()
+        if not self.snapshot.available:
+            self.fallbacks += 1
+            return self.fallback.search(db, user_id, query_embedding, top_k, ef_search, probes)
+
+        started = time.perf_counter()
+        hits = self.snapshot.search(user_id, query_embedding, top_k)
+        self.search_ms.observe((time.perf_counter() - started) * 1000)
+        return db.execute(_HITS_SQL, {
+            "ids": [h[0] for h in hits],
+            "scores": [h[1] for h in hits],
+            "uid": user_id,
+            "pending": max(0, settings.ENRICHMENT_INLINE_LIMIT),
+        }).fetchall()
+
+    # Embeddings written after the export go to the host's append log
+
+    def add(self, user_id, fields, embedding=None):
+        if embedding is not None:
+            from app.services.embedding_snapshot import append
+            append(self.snapshot.directory, user_id, str(fields["id"]), embedding)
+
+    def remove(self, user_id, decision_id):
+        from app.services.embedding_snapshot import append
+        append(self.snapshot.directory, user_id, str(decision_id))
+
+    def stats(self) -> dict:
+        return {
+            "fallbacks": self.fallbacks,
+            "search_ms": self.search_ms.snapshot(),
+            **self.fallback.stats(),
+        }
+
+
+# ── Process-wide instance ─────────────────────────────────────────────────────
+_backend: Optional[RetrievalBackend] = None
+
+
+def get_retrieval_backend() -> RetrievalBackend:
+    """The backend selected by RETRIEVAL_BACKEND (pgvector | memory | snapshot)."""
+    global _backend
+    if _backend is None or _backend.name != settings.RETRIEVAL_BACKEND:
+        if settings.RETRIEVAL_BACKEND == "memory":
+            _backend = InMemoryBackend(
+                settings.RETRIEVAL_MEMORY_MAX_USERS,
+                settings.RETRIEVAL_MEMORY_TTL_SECONDS,
+            )
+        elif settings.RETRIEVAL_BACKEND == "snapshot":
+            _backend = SnapshotBackend()
+        else:
+            _backend = PgvectorBackend()
+    return _backend
+
+
+metrics.register("retrieval_backend", lambda: {
+    "backend": settings.RETRIEVAL_BACKEND,
+    **(_backend.stats() if _backend else {}),
+})
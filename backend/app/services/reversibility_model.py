@@ -0,0 +1,336 @@
+"""
+Reversibility Model — logistic regression over the capture embedding.
+
+Replaces the flan-t5 confirmation step in decision_service for confident
+cases: P(irreversible) = sigmoid(w · embedding + b), a single dot product on
+the vector the capture path already computed. Below
+REVERSIBILITY_MIN_CONFIDENCE the LLM is still consulted.
+
+Artifacts are versioned .npz files in REVERSIBILITY_MODEL_DIR
+(`reversibility-<UTC timestamp>.npz`) holding the weights, the Platt-scaled
+bias, the embedding model id they were trained on and the held-out
+calibration examples. The newest artifact for the active embedding backend
+is loaded lazily; none → classifier off.
+
+Offline training / calibration (labels bootstrapped from the keyword rules
+over stored decisions plus a built-in seed set):
+
+    cd backend && python -m app.services.reversibility_model train [--no-db]
+
+Evaluation scores the current artifact on its held-out calibration split,
+or on a labelled JSONL file ({"text": ..., "label": "reversible" | "irreversible"}):
+
+    cd backend && python -m app.services.reversibility_model evaluate [--file labels.jsonl]
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger("jarvis.reversibility_model")
+
+_PREFIX = "reversibility-"
+
+
+@dataclass
+class ReversibilityModel:
+    weights: np.ndarray      # (dim,) float32
+    bias: float
+    version: str
+    embedding_model_id: str
+
+    def probability(self, embedding) -> float:
+        """P(irreversible) for one normalized embedding."""
+        z = float(np.dot(self.weights, np.asarray(embedding, dtype=np.float32))) + self.bias
+        return float(1.0 / (1.0 + np.exp(-z)))
+
+    def classify(self, embedding) -> Tuple[str, float]:
+        """(label, confidence) where confidence is the probability of the label."""
+        p = self.probability(embedding)
+        return ("irreversible", p) if p >= 0.5 else ("reversible", 1.0 - p)
+
+    def save(self, directory: str, **extra) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{_PREFIX}{self.version}.npz")
+        np.savez(
+            path,
+            weights=self.weights.astype(np.float32),
+            bias=np.float32(self.bias),
+            version=self.version,
+            embedding_model_id=self.embedding_model_id,
+            **{k: np.asarray(v) for k, v in extra.items()},
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ReversibilityModel":
+        with np.load(path) as data:
+            return cls(
+                weights=data["weights"].astype(np.float32),
+                bias=float(data["bias"]),
+                version=str(data["version"]),
+                embedding_model_id=str(data["embedding_model_id"]),
+            )
+
+
+# ── Loading ───────────────────────────────────────────────────────────────────
+_model: Optional[ReversibilityModel] = None
+_loaded_for: Optional[str] = None
+_lock = threading.Lock()
+
+
+def get_reversibility_model() -> Optional[ReversibilityModel]:
+    """Newest artifact trained on the active embedding model, or None."""
+    global _model, _loaded_for
+    if not settings.REVERSIBILITY_MODEL_ENABLED:
+        return None
+    from app.services.embedding_service import get_backend
+    model_id = get_backend().model_id
+    if _loaded_for == model_id:
+        return _model
+    with _lock:
+        if _loaded_for != model_id:
+            _model = None
+            path = _newest_artifact(model_id)
+            if path is not None:
+                _model = ReversibilityModel.load(path)
+                logger.info(f"Loaded reversibility model {_model.version} ({path})")
+            else:
+                logger.info(f"No reversibility model for {model_id}; using the LLM fallback")
+            _loaded_for = model_id
+    return _model
+
+
+def _newest_artifact(model_id: str) -> Optional[str]:
+    # Timestamped names sort chronologically; newest first
+    for path in sorted(glob.glob(os.path.join(settings.REVERSIBILITY_MODEL_DIR, f"{_PREFIX}*.npz")), reverse=True):
+        if ReversibilityModel.load(path).embedding_model_id == model_id:
+            return path
+    return None
+
+
+# ── Training ──────────────────────────────────────────────────────────────────
+
+# Hand-labelled seed examples so training works on an empty database
+_SEED: List[Tuple[str, str]] = [
+    ("Try a new subject line for the weekly newsletter", "reversible"),
+    ("Move the team standup to the afternoon", "reversible"),
+    ("Test a different landing page headline for two weeks", "reversible"),
+    ("Switch the project board from Trello to Notion", "reversible"),
+    ("Run a one-off discount for returning customers this weekend", "reversible"),
+    ("Post on LinkedIn three times a week this month", "reversible"),
+    ("Trial a freelancer for a single design task", "reversible"),
+    ("Block Friday mornings for deep work", "reversible"),
+    ("Pause the Instagram ads while we review performance", "reversible"),
+    ("Reorder the onboarding checklist steps", "reversible"),
+    ("Sign a three-year exclusive distribution agreement", "irreversible"),
+    ("Take out a bank loan to buy the warehouse", "irreversible"),
+    ("Hire two full-time engineers", "irreversible"),
+    ("Rebrand the company under a new name", "irreversible"),
+    ("Shut down the consulting arm to focus on product", "irreversible"),
+    ("Raise a seed round and give up 20% equity", "irreversible"),
+    ("Sell the e-commerce business to a competitor", "irreversible"),
+    ("Commit to a ten-year office lease", "irreversible"),
+    ("Pivot from agencies to enterprise customers", "irreversible"),
+    ("Move all pricing to a premium subscription model", "irreversible"),
+]
+
+
+def _bootstrap(use_db: bool) -> Tuple[List[str], List[str], np.ndarray]:
+    """
+    (embedded texts, full texts, labels): stored decisions labelled by the
+    keyword rules, plus the seed set. The embedded text matches what the
+    capture path encodes; the label uses the full text like the rules do.
+    """
+    from app.services.decision_service import _rule_based_classify
+    from app.services.enrichment import canonical_text
+
+    texts, full, labels = [], [], []
+    for text, label in _SEED:
+        texts.append(text)
+        full.append(text)
+        labels.append(1.0 if label == "irreversible" else 0.0)
+
+    if use_db:
+        from app.db import SessionLocal
+        from app.models.decision import Decision
+
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                Decision.title, Decision.reasoning, Decision.assumptions, Decision.expected_outcome
+            ).all()
+        finally:
+            db.close()
+        for r in rows:
+            whole = " ".join(filter(None, [r.title, r.reasoning, r.assumptions, r.expected_outcome]))
+            texts.append(canonical_text(r.title, r.reasoning or "", r.expected_outcome or ""))
+            full.append(whole)
+            labels.append(1.0 if _rule_based_classify(whole) == "irreversible" else 0.0)
+        logger.info(f"Bootstrapped {len(rows)} stored decisions")
+    return texts, full, np.asarray(labels, dtype=np.float32)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def _fit_logistic(
+    x: np.ndarray, y: np.ndarray, l2: float = 1e-2, lr: float = 0.5, epochs: int = 500
+) -> Tuple[np.ndarray, float]:
+    """Class-balanced L2 logistic regression by full-batch gradient descent."""
+    pos = max(float(y.sum()), 1.0)
+    neg = max(float(len(y) - y.sum()), 1.0)
+    sample_w = np.where(y > 0.5, len(y) / (2 * pos), len(y) / (2 * neg)).astype(np.float32)
+    w = np.zeros(x.shape[1], dtype=np.float32)
+    b = 0.0
+    for _ in range(epochs):
+        err = (_sigmoid(x @ w + b) - y) * sample_w
+        w -= lr * (x.T @ err / len(y) + l2 * w)
+        b -= lr * float(err.mean())
+    return w, b
+
+
+def _platt(scores: np.ndarray, y: np.ndarray) -> Tuple[float, float]:
+    """Fit sigmoid(a * score + c) on held-out scores (Platt scaling)."""
+    a, c = 1.0, 0.0
+    for _ in range(500):
+        err = _sigmoid(a * scores + c) - y
+        a -= 0.1 * float((err * scores).mean())
+        c -= 0.1 * float(err.mean())
+    return a, c
+
+
+def _split(y: np.ndarray, holdout: float, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Stratified train / calibration index split."""
+    rng = np.random.default_rng(seed)
+    train, calib = [], []
+    for label in (0.0, 1.0):
+        idx = rng.permutation(np.flatnonzero(y == label))
+        n_cal = int(round(len(idx) * holdout))
+        calib.extend(idx[:n_cal])
+        train.extend(idx[n_cal:])
+    return np.asarray(train), np.asarray(calib)
+
+
+def _report(name: str, p: np.ndarray, y: np.ndarray, threshold: float) -> dict:
+    eps = 1e-7
+    confident = np.maximum(p, 1 - p) >= threshold
+    correct = (p >= 0.5) == (y > 0.5)
+    out = {
+        "n": int(len(y)),
+        "accuracy": float(correct.mean()) if len(y) else 0.0,
+        "log_loss": float(-np.mean(y * np.log(p + eps) + (1 - y) * np.log(1 - p + eps))) if len(y) else 0.0,
+        "coverage": float(confident.mean()) if len(y) else 0.0,
+        "confident_accuracy": float(correct[confident].mean()) if confident.any() else 0.0,
+    }
+    print(f"{name:<12} n={out['n']:<5} acc={out['accuracy']:.3f} log_loss={out['log_loss']:.3f} "
+          f"coverage@{threshold}={out['coverage']:.2f} (acc {out['confident_accuracy']:.3f})")
+    return out
+
+
+def train(use_db: bool = True, holdout: float = 0.2, seed: int = 0, out_dir: Optional[str] = None) -> str:
+    """Train, calibrate, report and save a new versioned artifact. Returns its path."""
+    from app.services.embedding_service import _encode, get_backend
+
+    texts, _, y = _bootstrap(use_db)
+    x = _encode(texts)
+    train_idx, calib_idx = _split(y, holdout, seed)
+
+    w, b = _fit_logistic(x[train_idx], y[train_idx])
+    if len(calib_idx) and 0 < y[calib_idx].sum() < len(calib_idx):
+        a, c = _platt(x[calib_idx] @ w + b, y[calib_idx])
+    else:
+        logger.warning("Calibration split lacks both classes; skipping Platt scaling")
+        a, c = 1.0, 0.0
+    # Fold the calibration into the linear model: a * (w·x + b) + c
+    w, b = (a * w).astype(np.float32), a * b + c
+
+    threshold = settings.REVERSIBILITY_MIN_CONFIDENCE
+    model = ReversibilityModel(
+        weights=w,
+        bias=float(b),
+        version=datetime.utcnow().strftime("%Y%m%dT%H%M%SZ"),
+        embedding_model_id=get_backend().model_id,
+    )
+    p = _sigmoid(x @ w + b)
+    _report("train", p[train_idx], y[train_idx], threshold)
+    calib = _report("calibration", p[calib_idx], y[calib_idx], threshold) if len(calib_idx) else {}
+
+    path = model.save(
+        out_dir or settings.REVERSIBILITY_MODEL_DIR,
+        n_samples=len(y),
+        n_irreversible=int(y.sum()),
+        calibration_accuracy=calib.get("accuracy", 0.0),
+        # Held out from the fit, kept for `evaluate`
+        holdout_texts=np.asarray([texts[i] for i in calib_idx], dtype=str),
+        holdout_labels=y[calib_idx],
+    )
+    print(f"saved {path}")
+    return path
+
+
+def _holdout(path: str) -> Tuple[List[str], np.ndarray]:
+    """The calibration split saved with an artifact (empty for older ones)."""
+    with np.load(path) as data:
+        if "holdout_texts" not in data:
+            return [], np.zeros(0, dtype=np.float32)
+        return [str(t) for t in data["holdout_texts"]], data["holdout_labels"].astype(np.float32)
+
+
+def _read_labelled(path: str) -> Tuple[List[str], np.ndarray]:
+    texts, labels = [], []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                texts.append(row["text"])
+                labels.append(1.0 if row["label"] == "irreversible" else 0.0)
+    return texts, np.asarray(labels, dtype=np.float32)
+
+
+def _evaluate(labelled_file: Optional[str] = None) -> None:
+    """Score the current artifact on its held-out split, or on a labelled file."""
+    from app.services.embedding_service import _encode, get_backend
+
+    path = _newest_artifact(get_backend().model_id) if settings.REVERSIBILITY_MODEL_ENABLED else None
+    if path is None:
+        print("no model for the active embedding backend")
+        return
+    model = ReversibilityModel.load(path)
+    texts, y = _read_labelled(labelled_file) if labelled_file else _holdout(path)
+    if not texts:
+        print("artifact has no held-out split; retrain or pass --file")
+        return
+    p = np.asarray([model.probability(v) for v in _encode(texts)])
+    _report(f"v{model.version}", p, y, settings.REVERSIBILITY_MIN_CONFIDENCE)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Reversibility classifier tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    t = sub.add_parser("train", help="bootstrap labels, train, calibrate and save an artifact")
+    t.add_argument("--no-db", action="store_true", help="train on the built-in seed set only")
+    t.add_argument("--holdout", type=float, default=0.2, help="share held out for calibration")
+    t.add_argument("--seed", type=int, default=0)
+    t.add_argument("--out-dir", default=None)
+    e = sub.add_parser("evaluate", help="score the current artifact on its held-out split")
+    e.add_argument("--file", default=None, help="labelled JSONL to score instead")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "train":
+        train(not args.no_db, args.holdout, args.seed, args.out_dir)
+    else:
+        _evaluate(args.file)
@@ -0,0 +1,133 @@
+"""
+Semantic Cache — per-user reuse of responses for near-identical queries.
+
+Each entry stores the query embedding next to the final response. A new query
+is served from cache when its cosine similarity to a cached query in the same
+namespace (endpoint + options) reaches SEMANTIC_CACHE_THRESHOLD.
+
+Entries expire after SEMANTIC_CACHE_TTL_SECONDS, each user keeps at most
+SEMANTIC_CACHE_PER_USER entries (least-recently-used first out), and cold
+users are dropped beyond SEMANTIC_CACHE_MAX_USERS.
+
+Invalidation: capturing a decision or reflection clears that user's entries
+in this worker. Entries also carry the user's data version (latest capture
+timestamp), so other workers stop serving them as soon as the version moves.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.utils import metrics
+
+
+@dataclass
+class _Entry:
+    namespace: str
+    embedding: np.ndarray
+    value: Any
+    version: str
+    compute_ms: float
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SemanticCache:
+    def __init__(self, threshold: float, ttl_seconds: float, per_user: int, max_users: int):
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.per_user = max(1, per_user)
+        self.max_users = max(1, max_users)
+        self._users: "OrderedDict[str, list[_Entry]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+        self.invalidations = 0
+
+    def lookup(self, user_id: str, namespace: str, embedding, version: str = "") -> Optional[Any]:
+        """Return the cached value for the most similar fresh query, if similar enough."""
+        query = np.asarray(embedding, dtype=np.float32)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries:
+                # Drop expired and stale-version entries while we are here
+                entries[:] = [
+                    e for e in entries if now - e.created_at <= self.ttl and e.version == version
+                ]
+            candidates = [e for e in entries or [] if e.namespace == namespace]
+            if candidates:
+                scores = np.stack([e.embedding for e in candidates]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = candidates[best]
+                    entries.remove(entry)
+                    entries.append(entry)  # most recently used at the end
+                    self._users.move_to_end(user_id)
+                    self.hits += 1
+                    self.latency_saved_ms += entry.compute_ms
+                    return entry.value
+            self.misses += 1
+            return None
+
+    def store(
+        self, user_id: str, namespace: str, embedding, value: Any, compute_ms: float, version: str = ""
+    ) -> None:
+        entry = _Entry(
+            namespace=namespace,
+            embedding=np.asarray(embedding, dtype=np.float32),
+            value=value,
+            version=version,
+            compute_ms=compute_ms,
+        )
+        with self._lock:
+            entries = self._users.setdefault(user_id, [])
+            entries.append(entry)
+            del entries[:-self.per_user]
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "threshold": self.threshold,
+            "users": len(self._users),
+            "entries": sum(len(v) for v in self._users.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(self.latency_saved_ms, 1),
+            "invalidations": self.invalidations,
+        }
+
+
+_cache = SemanticCache(
+    settings.SEMANTIC_CACHE_THRESHOLD,
+    settings.SEMANTIC_CACHE_TTL_SECONDS,
+    settings.SEMANTIC_CACHE_PER_USER,
+    settings.SEMANTIC_CACHE_MAX_USERS,
+)
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Return the process-wide cache, or None when SEMANTIC_CACHE_ENABLED is off."""
+    return _cache if settings.SEMANTIC_CACHE_ENABLED else None
+
+
+def invalidate_user(user_id: str) -> None:
+    _cache.invalidate_user(user_id)
+
+
+metrics.register("semantic_cache", lambda: {"enabled": settings.SEMANTIC_CACHE_ENABLED, **_cache.stats()})
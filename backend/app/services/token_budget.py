@@ -0,0 +1,86 @@
+"""
+Token Budgets — observed generation lengths per endpoint.
+
+Every completed generation records how many tokens it actually produced,
+per kind (daily_guidance, replay_summary, …). With LLM_ADAPTIVE_BUDGETS on,
+a kind's `max_new_tokens` shrinks to its recent p95 plus headroom, never
+above the configured budget. Outputs that hit the cap keep pushing the p95
+to the cap, so a budget that turns out too small grows back on its own.
+
+Early aborts (echo, structure) are counted separately and do not feed the
+length statistics.
+"""
+
+import math
+import threading
+from collections import Counter, defaultdict, deque
+from typing import Deque, Dict, Optional
+
+from app.config import settings
+from app.utils import metrics
+
+# Headroom above the observed p95, and rounding so kinds keep batching together
+_HEADROOM = 1.2
+_ROUND_TO = 32
+_MIN_BUDGET = 32
+
+
+class TokenBudgets:
+    def __init__(self, window: int, min_samples: int):
+        self.window = window
+        self.min_samples = min_samples
+        self._lengths: Dict[str, Deque[int]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._aborts: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record_usage(self, kind: Optional[str], tokens: int) -> None:
+        if kind:
+            with self._lock:
+                self._lengths[kind].append(tokens)
+
+    def record_abort(self, kind: Optional[str], reason: str) -> None:
+        if kind:
+            with self._lock:
+                self._aborts[kind][reason] += 1
+
+    def p95(self, kind: str) -> Optional[int]:
+        with self._lock:
+            samples = sorted(self._lengths.get(kind, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(math.ceil(0.95 * len(samples))) - 1)]
+
+    def budget(self, kind: Optional[str], configured: int) -> int:
+        """max_new_tokens to use for `kind`, given its configured ceiling."""
+        if not kind or not settings.LLM_ADAPTIVE_BUDGETS:
+            return configured
+        p95 = self.p95(kind)
+        if p95 is None:
+            return configured
+        adapted = int(math.ceil(p95 * _HEADROOM / _ROUND_TO) * _ROUND_TO)
+        return max(min(_MIN_BUDGET, configured), min(configured, adapted))
+
+    def stats(self) -> dict:
+        out = {}
+        for kind in set(self._lengths) | set(self._aborts):
+            samples = list(self._lengths.get(kind, ()))
+            out[kind] = {
+                "samples": len(samples),
+                "mean_tokens": round(sum(samples) / len(samples), 1) if samples else 0.0,
+                "p95_tokens": self.p95(kind),
+                "aborted": dict(self._aborts.get(kind, {})),
+            }
+        return out
+
+
+_budgets = TokenBudgets(settings.LLM_BUDGET_WINDOW, settings.LLM_BUDGET_MIN_SAMPLES)
+
+
+def get_token_budgets() -> TokenBudgets:
+    return _budgets
+
+
+metrics.register(
+    "llm_token_usage",
+    lambda: {"adaptive": settings.LLM_ADAPTIVE_BUDGETS, "kinds": _budgets.stats()},
+)
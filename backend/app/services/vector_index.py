@@ -0,0 +1,419 @@
+"""
+Vector Index — ANN index strategy and per-query search knobs for decisions.
+
+The index on decisions.embedding is chosen by settings:
+
+    VECTOR_INDEX_TYPE    hnsw (m, ef_construction) | ivfflat (lists) | none
+    VECTOR_INDEX_METRIC  ip (inner product; embeddings are normalized, so it
+                         ranks like cosine without the norm computation) | cosine
+
+Retrieval filters by user_id, which pgvector applies after the ANN scan, so
+a user owning a small share of the table can get fewer than k rows back.
+VECTOR_SCAN_MODE decides how that is handled:
+
+    iterative  pgvector ≥ 0.8 keeps scanning the index until k rows pass the
+               filter (bounded by VECTOR_MAX_SCAN_TUPLES); older servers use
+               overfetch instead
+    overfetch  widens ef_search / probes to k × VECTOR_OVERFETCH_FACTOR
+    exact      skips the ANN index: the user's rows are filtered first and
+               sorted exactly (see rag_service)
+
+In every mode a short result is retried once as an exact scan, so k rows
+are returned whenever the user has k embedded decisions. Knobs are applied
+per transaction with set_config(..., true) — the bindable form of SET LOCAL
+— in the same round trip as the query.
+
+The index itself is created and rebuilt by maintain_vector_index (startup,
+daily scheduler job, or CLI):
+
+    cd backend && python -m app.services.vector_index status
+    cd backend && python -m app.services.vector_index maintain [--force]
+"""
+
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils import metrics
+
+logger = logging.getLogger("jarvis.vector_index")
+
+# (operator, similarity expression over the operator's distance `d`, opclass suffix)
+_METRICS = {
+    "ip": ("<#>", "-{d}", "vector_ip_ops"),          # <#> is the negative inner product
+    "cosine": ("<=>", "1 - {d}", "vector_cosine_ops"),
+}
+
+
+def metric() -> str:
+    if settings.VECTOR_INDEX_METRIC not in _METRICS:
+        raise ValueError(f"Unknown VECTOR_INDEX_METRIC {settings.VECTOR_INDEX_METRIC!r}")
+    return settings.VECTOR_INDEX_METRIC
+
+
+def distance_operator() -> str:
+    return _METRICS[metric()][0]
+
+
+def similarity_expression(distance: str) -> str:
+    """SQL turning `distance` (from distance_operator) into cosine similarity."""
+    return _METRICS[metric()][1].format(d=distance)
+
+
+def index_name(index_type: Optional[str] = None) -> str:
+    return f"decisions_embedding_{index_type or settings.VECTOR_INDEX_TYPE}_{metric()}_idx"
+
+
+def index_ddl(concurrently: bool = False, name: Optional[str] = None, **params) -> Optional[str]:
+    """CREATE INDEX statement for the configured strategy (None for 'none')."""
+    kind = settings.VECTOR_INDEX_TYPE
+    opclass = _METRICS[metric()][2]
+    if kind == "hnsw":
+        options = {
+            "m": params.get("m", settings.VECTOR_HNSW_M),
+            "ef_construction": params.get("ef_construction", settings.VECTOR_HNSW_EF_CONSTRUCTION),
+        }
+    elif kind == "ivfflat":
+        options = {"lists": params.get("lists", settings.VECTOR_IVFFLAT_LISTS)}
+    elif kind == "none":
+        return None
+    else:
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE {kind!r}; expected hnsw, ivfflat or none")
+    with_clause = ", ".join(f"{k} = {int(v)}" for k, v in options.items())
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name or index_name()} "
+        f"ON decisions USING {kind} (embedding {opclass}) WITH ({with_clause})"
+    )
+
+
+# ── Lifecycle maintenance ─────────────────────────────────────────────────────
+# IVFFlat centroids are computed from the rows present at build time, so an
+# index declared on an empty table is useless and one built at 10k rows
+# drifts as the table grows. The job below (scheduler, startup, or CLI)
+# compares the index with the table and rebuilds it when needed:
+#
+#   missing ───────────────────────────▶ create   CREATE INDEX CONCURRENTLY
+#   invalid (interrupted build) ───────▶ reindex  REINDEX INDEX CONCURRENTLY
+#   rows grew VECTOR_REBUILD_GROWTH× ──▶ reindex  (ivfflat: fresh centroids)
+#   lists / m / ef_construction off ───▶ swap     build <name>_new, drop, rename
+#
+# Each rebuild is recorded in vector_index_builds together with the probes
+# setting sized for it. Indexes on embedding that no longer match the
+# configuration are dropped once the configured one is valid.
+
+_MAINTENANCE_LOCK = 0x4A415256  # pg advisory lock key shared by all workers
+_tuning: Dict[str, int] = {}
+_tuning_loaded_at = 0.0
+_last_run: Dict[str, Any] = {}
+
+
+def ivfflat_sizing(rows: int) -> Tuple[int, int]:
+    """(lists, probes) for `rows` vectors: rows/1000 up to 1M rows, √rows beyond; probes ≈ √lists."""
+    lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+    lists = max(1, lists)
+    return lists, max(1, round(math.sqrt(lists)))
+
+
+@dataclass
+class IndexHealth:
+    name: str
+    exists: bool = False
+    valid: bool = False
+    options: Dict[str, int] = field(default_factory=dict)
+    size_bytes: int = 0
+    rows: int = 0
+    last_build: Optional[Dict[str, Any]] = None
+    stale: List[str] = field(default_factory=list)  # other indexes on embedding
+
+
+def _autocommit(engine):
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def inspect_index(conn) -> IndexHealth:
+    from sqlalchemy import text
+
+    health = IndexHealth(name=index_name())
+    rows = conn.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'decisions'::regclass")
+    ).scalar()
+    if rows is None or rows < 0:  # never analyzed
+        rows = conn.execute(text("SELECT count(*) FROM decisions")).scalar()
+    health.rows = int(rows)
+
+    for r in conn.execute(text("""
+        SELECT c.relname AS name, i.indisvalid AS valid, c.reloptions AS options,
+               pg_relation_size(c.oid) AS size
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = c.relam
+        WHERE i.indrelid = 'decisions'::regclass
+          AND am.amname IN ('hnsw', 'ivfflat')
+    """)):
+        if r.name == health.name:
+            health.exists, health.valid, health.size_bytes = True, r.valid, int(r.size)
+            health.options = {
+                k: int(v) for k, v in (o.split("=", 1) for o in (r.options or []))
+            }
+        elif r.name != f"{health.name}_new":
+            health.stale.append(r.name)
+
+    last = conn.execute(text("""
+        SELECT method, params, rows_at_build, finished_at
+        FROM vector_index_builds
+        WHERE index_name = :name AND status = 'done'
+        ORDER BY finished_at DESC
+        LIMIT 1
+    """), {"name": health.name}).first()
+    if last is not None:
+        health.last_build = dict(last._mapping)
+    return health
+
+
+def _target_params(rows: int) -> Dict[str, int]:
+    if settings.VECTOR_INDEX_TYPE == "hnsw":
+        return {"m": settings.VECTOR_HNSW_M, "ef_construction": settings.VECTOR_HNSW_EF_CONSTRUCTION}
+    if settings.VECTOR_IVFFLAT_AUTO_LISTS:
+        lists, probes = ivfflat_sizing(rows)
+    else:
+        lists = settings.VECTOR_IVFFLAT_LISTS
+        probes = max(1, round(math.sqrt(lists)))
+    return {"lists": lists, "probes": probes}
+
+
+def plan_maintenance(health: IndexHealth, force: bool = False) -> Optional[Tuple[str, str, Dict[str, int]]]:
+    """(method, reason, params) for the rebuild `health` calls for, or None."""
+    kind = settings.VECTOR_INDEX_TYPE
+    if kind == "none":
+        return None
+    params = _target_params(health.rows)
+
+    if force:
+        return ("reindex" if health.exists else "create"), "forced", {**health.options, **params}
+    if not health.exists:
+        if kind == "ivfflat" and health.rows < settings.VECTOR_IVFFLAT_MIN_ROWS:
+            return None  # centroids need data; exact scans are fast at this size
+        return "create", "index missing", params
+    if not health.valid:
+        return "reindex", "index invalid (interrupted concurrent build)", {**health.options, **params}
+
+    if kind == "hnsw":
+        changed = {k: v for k, v in params.items() if health.options.get(k) != v}
+        if changed:
+            return "swap", f"parameters changed: {changed}", params
+        return None
+
+    current = health.options.get("lists", 0)
+    if current and not (0.5 <= params["lists"] / current <= 2.0):
+        return "swap", f"lists {current} → {params['lists']} for ~{health.rows} rows", params
+    built_rows = (health.last_build or {}).get("rows_at_build")
+    if built_rows is None or health.rows >= max(built_rows, 1) * settings.VECTOR_REBUILD_GROWTH:
+        return "reindex", f"table grew from {built_rows} to ~{health.rows} rows since the last build", {
+            "lists": current or params["lists"], "probes": params["probes"],
+        }
+    return None
+
+
+def _rebuild(conn, method: str, reason: str, params: Dict[str, int], rows: int) -> None:
+    from sqlalchemy import text
+
+    name = index_name()
+    build_id = conn.execute(text("""
+        INSERT INTO vector_index_builds (index_name, index_type, metric, method, reason, params, rows_at_build)
+        VALUES (:name, :type, :metric, :method, :reason, CAST(:params AS jsonb), :rows)
+        RETURNING id
+    """), {
+        "name": name, "type": settings.VECTOR_INDEX_TYPE, "metric": metric(),
+        "method": method, "reason": reason, "params": json.dumps(params), "rows": rows,
+    }).scalar()
+    logger.info(f"Vector index {method} of {name}: {reason}")
+    ddl_params = {k: v for k, v in params.items() if k != "probes"}
+    try:
+        if method == "create":
+            conn.execute(text(index_ddl(concurrently=True, **ddl_params)))
+        elif method == "reindex":
+            conn.execute(text(f"REINDEX INDEX CONCURRENTLY {name}"))
+        else:
+            # Shadow build; the old index keeps serving until it is dropped
+            shadow = f"{name}_new"
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {shadow}"))
+            conn.execute(text(index_ddl(concurrently=True, name=shadow, **ddl_params)))
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            conn.execute(text(f"ALTER INDEX {shadow} RENAME TO {name}"))
+        status, error = "done", None
+    except Exception as e:
+        status, error = "failed", str(e)
+        logger.error(f"Vector index {method} of {name} failed: {e}")
+    conn.execute(text("""
+        UPDATE vector_index_builds SET status = :status, error = :error, finished_at = NOW()
+        WHERE id = :id
+    """), {"status": status, "error": error, "id": build_id})
+    if error:
+        raise RuntimeError(error)
+
+
+def maintain_vector_index(engine, force: bool = False) -> Dict[str, Any]:
+    """
+    Inspect the index and rebuild it if needed (see above). Safe to call
+    from every worker: only the holder of an advisory lock does any work.
+    `force` rebuilds (or creates) the index even when it looks healthy.
+    """
+    from sqlalchemy import text
+
+    global _last_run
+    started = time.monotonic()
+    with _autocommit(engine) as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _MAINTENANCE_LOCK}).scalar():
+            return {"skipped": "maintenance running in another process"}
+        try:
+            health = inspect_index(conn)
+            action = plan_maintenance(health, force)
+            if action is not None:
+                _rebuild(conn, *action, health.rows)  # raises if the build failed
+                health = inspect_index(conn)
+            # Old-strategy indexes only slow down writes (the planner will not
+            # use them for the configured operator class) — but only once the
+            # configured one is in place, or the table would be left with none
+            dropped = health.stale if health.exists and health.valid else []
+            for stale in dropped:
+                logger.info(f"Dropping stale vector index {stale}")
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {stale}"))
+            _load_tuning(conn)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _MAINTENANCE_LOCK})
+
+    _last_run = {
+        "index": health.name,
+        "rows": health.rows,
+        "size_bytes": health.size_bytes,
+        "action": action[0] if action else None,
+        "reason": action[1] if action else None,
+        "dropped": dropped,
+        "seconds": round(time.monotonic() - started, 1),
+    }
+    return _last_run
+
+
+def _load_tuning(conn) -> None:
+    """Cache the probes / lists recorded for the current index build."""
+    from sqlalchemy import text
+
+    global _tuning, _tuning_loaded_at
+    params = conn.execute(text("""
+        SELECT params FROM vector_index_builds
+        WHERE index_name = :name AND status = 'done'
+        ORDER BY finished_at DESC
+        LIMIT 1
+    """), {"name": index_name()}).scalar()
+    _tuning = {k: int(v) for k, v in (params or {}).items()}
+    _tuning_loaded_at = time.monotonic()
+
+
+def _tuned(key: str) -> Optional[int]:
+    """
+    Tuned value for `key`, refreshed every VECTOR_TUNING_REFRESH_SECONDS on a
+    separate connection (a failure must not abort the caller's transaction).
+    """
+    global _tuning_loaded_at
+    if time.monotonic() - _tuning_loaded_at > settings.VECTOR_TUNING_REFRESH_SECONDS:
+        try:
+            from app.db import engine
+            with _autocommit(engine) as conn:
+                _load_tuning(conn)
+        except Exception as e:
+            logger.debug(f"Vector index tuning not loaded: {e}")
+            _tuning_loaded_at = time.monotonic()  # do not retry on every query
+    return _tuning.get(key)
+
+
+# ── Per-query knobs ───────────────────────────────────────────────────────────
+
+def _pgvector_version(conn) -> Tuple[int, ...]:
+    """Installed pgvector version, cached for the life of the DBAPI connection."""
+    if "pgvector_version" not in conn.info:
+        from sqlalchemy import text
+        version = conn.execute(
+            text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        ).scalar() or "0"
+        conn.info["pgvector_version"] = tuple(int(p) for p in version.split(".") if p.isdigit())
+    return conn.info["pgvector_version"]
+
+
+def scan_mode(conn) -> str:
+    mode = settings.VECTOR_SCAN_MODE
+    if mode == "iterative" and _pgvector_version(conn) < (0, 8):
+        return "overfetch"
+    return mode
+
+
+def search_knobs(
+    conn,
+    top_k: int,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    exact: bool = False,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    ("SELECT set_config(...), ...;" prefix, bind params) for one retrieval.
+    Values are transaction-local and are sent with the query itself. The
+    index reads them when the scan starts, so prepared plans honour them.
+    """
+    knobs: Dict[str, Any] = {}
+    mode = "exact" if exact else scan_mode(conn)
+    kind = settings.VECTOR_INDEX_TYPE
+
+    if mode == "exact" or kind == "none":
+        return "", {}
+    if kind == "hnsw":
+        ef = ef_search or settings.VECTOR_EF_SEARCH
+        if mode == "overfetch":
+            ef = max(ef, top_k * settings.VECTOR_OVERFETCH_FACTOR)
+        knobs["hnsw.ef_search"] = min(max(ef, top_k), 1000)
+        if mode == "iterative":
+            knobs["hnsw.iterative_scan"] = "relaxed_order"
+            knobs["hnsw.max_scan_tuples"] = settings.VECTOR_MAX_SCAN_TUPLES
+    elif kind == "ivfflat":
+        n = probes or settings.VECTOR_PROBES or _tuned("probes") or 10
+        if mode == "overfetch":
+            n *= settings.VECTOR_OVERFETCH_FACTOR
+        knobs["ivfflat.probes"] = n
+        if mode == "iterative":
+            knobs["ivfflat.iterative_scan"] = "relaxed_order"
+            knobs["ivfflat.max_probes"] = max(n, _tuned("lists") or settings.VECTOR_IVFFLAT_LISTS)
+
+    calls = ", ".join(f"set_config('{name}', :knob{i}, true)" for i, name in enumerate(knobs))
+    params = {f"knob{i}": str(value) for i, value in enumerate(knobs.values())}
+    return f"SELECT {calls};", params
+
+
+metrics.register("vector_index", lambda: {
+    "type": settings.VECTOR_INDEX_TYPE,
+    "metric": settings.VECTOR_INDEX_METRIC,
+    "tuning": _tuning,
+    "last_maintenance": _last_run,
+})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.db import engine
+
+    parser = argparse.ArgumentParser(description="Vector index maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="show index health and the planned action")
+    m = sub.add_parser("maintain", help="rebuild the index if needed")
+    m.add_argument("--force", action="store_true", help="rebuild even if healthy")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "status":
+        with _autocommit(engine) as conn:
+            health = inspect_index(conn)
+        print(json.dumps({**health.__dict__, "planned": plan_maintenance(health)}, indent=2, default=str))
+    else:
+        print(json.dumps(maintain_vector_index(engine, force=args.force), indent=2, default=str))
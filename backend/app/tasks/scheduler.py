@@ -1,6 +1,9 @@
 """
 Background task scheduler using APScheduler.
-Runs weekly analysis and stores summary in the database every Monday at 00:00.
+Runs weekly analysis and stores summary in the database every Monday at 00:00,
+and vector index maintenance daily at VECTOR_MAINTENANCE_HOUR. With the
+snapshot retrieval backend, embeddings are exported daily at
+EMBEDDING_SNAPSHOT_HOUR.
 """
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -38,6 +41,7 @@ async def run_weekly_analysis():
                 )
                 decision_dicts = [
                     {"category_tag": d.category_tag} for d in recent
+                    if d.category_tag is not None  # still awaiting enrichment
                 ]
                 summary_pcts = analyze_weekly_activity(decision_dicts)
 
@@ -56,13 +60,63 @@ async def run_weekly_analysis():
         logger.error("Weekly analysis failed: %s", e)
 
 
+async def run_vector_index_maintenance():
+    """
+    Scheduled task: check the ANN index on decisions.embedding against the
+    table and rebuild it if needed (see app/services/vector_index.py).
+    Every worker schedules it; an advisory lock lets only one do the work.
+    """
+    try:
+        import asyncio
+        from app.db import engine
+        from app.services.vector_index import maintain_vector_index
+
+        result = await asyncio.to_thread(maintain_vector_index, engine)
+        logger.info("Vector index maintenance: %s", result)
+    except Exception as e:
+        logger.error("Vector index maintenance failed: %s", e)
+
+
+async def run_embedding_snapshot_export():
+    """
+    Scheduled task: export decision embeddings to a new memory-mapped
+    snapshot (see app/services/embedding_snapshot.py). Every worker schedules
+    it; a file lock lets only one per host do the work.
+    """
+    try:
+        import asyncio
+        from app.db import engine
+        from app.services.embedding_snapshot import export_snapshot
+
+        result = await asyncio.to_thread(export_snapshot, engine)
+        logger.info("Embedding snapshot export: %s", result)
+    except Exception as e:
+        logger.error("Embedding snapshot export failed: %s", e)
+
+
 def start_scheduler():
+    from app.config import settings
+
     scheduler.add_job(
         run_weekly_analysis,
         trigger=CronTrigger(day_of_week="mon", hour=0, minute=0),
         id="weekly_analysis",
         replace_existing=True,
     )
+    if settings.VECTOR_MAINTENANCE_ENABLED:
+        scheduler.add_job(
+            run_vector_index_maintenance,
+            trigger=CronTrigger(hour=settings.VECTOR_MAINTENANCE_HOUR, minute=0),
+            id="vector_index_maintenance",
+            replace_existing=True,
+        )
+    if settings.RETRIEVAL_BACKEND == "snapshot":
+        scheduler.add_job(
+            run_embedding_snapshot_export,
+            trigger=CronTrigger(hour=settings.EMBEDDING_SNAPSHOT_HOUR, minute=0),
+            id="embedding_snapshot_export",
+            replace_existing=True,
+        )
     scheduler.start()
     logger.info("Scheduler started")
 
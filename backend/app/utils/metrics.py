@@ -0,0 +1,54 @@
+"""
+In-process metrics registry.
+
+Services register a zero-argument callable returning a JSON-serialisable dict;
+GET /metrics collects all of them. Values are per worker process.
+"""
+
+from typing import Any, Callable, Dict
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """Register (or replace) a named stats provider."""
+    _providers[name] = provider
+
+
+def collect() -> Dict[str, Any]:
+    """Snapshot every registered provider. A failing provider reports its error."""
+    out: Dict[str, Any] = {}
+    for name, provider in _providers.items():
+        try:
+            out[name] = provider()
+        except Exception as e:
+            out[name] = {"error": str(e)}
+    return out
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts are derived on read)."""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+        }
@@ -13,23 +13,50 @@ def cosine_similarity(vec_a: List[float], vec_b: List[float]) -> float:
     return float(np.dot(a, b) / (norm_a * norm_b))
 
 
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (zero rows stay zero), as float32."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, best first (argpartition, then sort only k)."""
+    n = scores.shape[0]
+    if top_k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if top_k < n:
+        idx = np.argpartition(scores, n - top_k)[n - top_k:]
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(scores[idx])[::-1]]
+
+
 def rank_by_similarity(
     query_embedding: List[float],
     candidates: List[dict],
     embedding_key: str = "embedding",
     top_k: int = 5,
+    normalized: bool = False,
 ) -> List[dict]:
     """
     Rank a list of candidate dicts by cosine similarity to a query embedding.
     Falls back to in-memory ranking when pgvector is unavailable.
+    Scores all candidates with one matrix-vector product; pass
+    normalized=True when the embeddings are already unit length.
     """
-    scored = []
-    for c in candidates:
-        emb = c.get(embedding_key)
-        if emb is None:
-            continue
-        score = cosine_similarity(query_embedding, emb)
-        scored.append({**c, "similarity": round(score, 4)})
-
-    scored.sort(key=lambda x: x["similarity"], reverse=True)
-    return scored[:top_k]
+    with_embedding = [c for c in candidates if c.get(embedding_key) is not None]
+    if not with_embedding:
+        return []
+
+    matrix = np.asarray([c[embedding_key] for c in with_embedding], dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    if not normalized:
+        matrix = normalize_rows(matrix)
+        query = normalize_rows(query)
+    scores = matrix @ query
+
+    return [
+        {**with_embedding[i], "similarity": round(float(scores[i]), 4)}
+        for i in top_k_indices(scores, top_k)
+    ]
@@ -0,0 +1,70 @@
+"""
+Assisted generation benchmark: plain greedy decoding with LLM_MODEL vs. the
+same model verifying tokens proposed by LLM_DRAFT_MODEL.
+
+For every prompt in the fixed parity set it reports generated tokens/sec for
+both modes and whether the outputs are identical (they should be under
+greedy decoding; any difference points at a numerics issue in a backend).
+
+    cd backend && python -m benchmarks.assisted_generation [--repeats 3] [--kinds daily_guidance replay_summary]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import torch
+
+from app.config import settings
+from app.services.llm_backends import get_llm_backend, parity_prompts
+
+
+def _generate(tokenizer, model, prompt: str, max_tokens: int, **extra):
+    inputs = tokenizer([prompt], return_tensors="pt", truncation=True, max_length=512)
+    started = time.perf_counter()
+    with torch.inference_mode():
+        ids = model.generate(**inputs, max_new_tokens=max_tokens, do_sample=False, num_beams=1, **extra)
+    elapsed = time.perf_counter() - started
+    new_tokens = int((ids[0] != tokenizer.pad_token_id).sum())
+    return tokenizer.decode(ids[0], skip_special_tokens=True), new_tokens, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--kinds", nargs="*", help="limit to these prompt kinds")
+    args = parser.parse_args()
+
+    tokenizer, model = get_llm_backend().load()
+    draft = get_llm_backend(settings.LLM_DRAFT_BACKEND, settings.LLM_DRAFT_MODEL).load()[1]
+    prompts = [p for p in parity_prompts() if not args.kinds or p[0] in args.kinds]
+
+    # Warm up both models so the first row does not include load time
+    _generate(tokenizer, model, prompts[0][1], 8)
+    _generate(tokenizer, model, prompts[0][1], 8, assistant_model=draft)
+
+    print(f"{settings.LLM_MODEL} ({settings.LLM_BACKEND}) assisted by "
+          f"{settings.LLM_DRAFT_MODEL} ({settings.LLM_DRAFT_BACKEND}), {args.repeats} repeats\n")
+    print(f"{'kind':<22}{'tokens':>7}{'plain tok/s':>13}{'assisted tok/s':>16}{'speedup':>9}{'same':>6}")
+
+    mismatches = 0
+    for kind, prompt, max_tokens in prompts:
+        plain_rates, assisted_rates = [], []
+        for _ in range(args.repeats):
+            plain, tokens, seconds = _generate(tokenizer, model, prompt, max_tokens)
+            plain_rates.append(tokens / seconds)
+            assisted, a_tokens, a_seconds = _generate(
+                tokenizer, model, prompt, max_tokens, assistant_model=draft
+            )
+            assisted_rates.append(a_tokens / a_seconds)
+        same = plain == assisted
+        mismatches += not same
+        p, a = statistics.median(plain_rates), statistics.median(assisted_rates)
+        print(f"{kind:<22}{tokens:>7}{p:>13.1f}{a:>16.1f}{a / p:>8.2f}x{str(same):>6}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Retrieval round-trip check: counts the SQL statements find_similar_decisions
+issues and times it against the configured DATABASE_URL.
+
+Retrieval must stay at one statement regardless of top_k (decisions, the
+not-yet-embedded ones and their latest reflections in a single query); the
+script exits non-zero if any top_k needs more, so it can run in CI against
+a seeded database.
+
+    cd backend && python -m benchmarks.retrieval_queries --user-id default_user [--top-k 5 20 50]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy import event
+
+from app.db import SessionLocal, engine
+from app.services.rag_service import find_similar_decisions
+
+MAX_STATEMENTS = 1
+
+
+async def _run(user_id: str, query: str, top_k: int, repeats: int):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = SessionLocal()
+    timings = []
+    try:
+        # Embed once so the timings below only cover the database work
+        from app.services.embedding_service import generate_embedding_async
+        query_embedding = await generate_embedding_async(query)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            for _ in range(repeats):
+                statements.clear()
+                started = time.perf_counter()
+                results = await find_similar_decisions(
+                    db, query, user_id, top_k=top_k, query_embedding=query_embedding
+                )
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+    finally:
+        db.close()
+    return len(statements), len(results), timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", default="default_user")
+    parser.add_argument("--query", default="Should we raise prices for the premium plan?")
+    parser.add_argument("--top-k", type=int, nargs="*", default=[5, 20, 50])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'top_k':>6}{'rows':>6}{'statements':>12}{'p50 ms':>9}{'max ms':>9}")
+    failed = False
+    for k in args.top_k:
+        n_statements, n_rows, timings = asyncio.run(_run(args.user_id, args.query, k, args.repeats))
+        print(f"{k:>6}{n_rows:>6}{n_statements:>12}{statistics.median(timings):>9.1f}{max(timings):>9.1f}")
+        failed |= n_statements > MAX_STATEMENTS
+
+    if failed:
+        print(f"\nFAIL: retrieval issued more than {MAX_STATEMENTS} statement(s)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Vector binding microbenchmark for the retrieval query.
+
+Compares three ways of sending the 384-dim query vector to Postgres:
+
+  literal   — the old path: .tolist(), decimal string, interpolated into the
+              SQL text (a unique statement per query)
+  bound     — float32 array bound as a pgvector parameter (stable text)
+  prepared  — bound, and executed through a per-connection PREPARE
+
+For each it reports the client-side cost of turning the vector into query
+text and the end-to-end latency of the retrieval statement against
+DATABASE_URL, using random unit vectors so no plan or result is reused by
+accident.
+
+    cd backend && python -m benchmarks.vector_binding --user-id default_user [--queries 200]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+from psycopg2.extensions import adapt
+from sqlalchemy import text
+
+from app.config import settings
+from app.db import SessionLocal
+from app.services import rag_service
+
+
+def _literal_sql(vector: np.ndarray):
+    embedding_str = "[" + ",".join(str(x) for x in vector.tolist()) + "]"
+    return text(rag_service._render(
+        False, q=f"'{embedding_str}'::vector", uid=":uid", k=":k", pending=":pending"
+    ))
+
+
+def _format_us(fn, vectors) -> float:
+    started = time.perf_counter()
+    for v in vectors:
+        fn(v)
+    return (time.perf_counter() - started) / len(vectors) * 1e6
+
+
+def _timed(run, vectors):
+    timings = []
+    for v in vectors:
+        started = time.perf_counter()
+        run(v)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", default="default_user")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    params = {"uid": args.user_id, "k": args.top_k, "pending": settings.ENRICHMENT_INLINE_LIMIT}
+
+    db = SessionLocal()
+    try:
+        conn = db.connection()  # registers the pgvector adapter
+
+        print(f"{args.queries} queries, dim {args.dim}, top_k {args.top_k}\n")
+        print("client-side vector → query text (µs/query)")
+        print(f"  literal   {_format_us(_literal_sql, vectors):9.1f}")
+        print(f"  bound     {_format_us(lambda v: adapt(v).getquoted(), vectors):9.1f}\n")
+
+        def literal(v):
+            conn.execute(_literal_sql(v), params).fetchall()
+
+        inline_sql = text(rag_service._inline_sql(False))
+        name = rag_service._prepared_name(False)
+        execute_sql = text(f"EXECUTE {name} (:q, :uid, :k, :pending)")
+
+        def bound(v):
+            conn.execute(inline_sql, {**params, "q": v}).fetchall()
+
+        def prepared(v):
+            if not conn.info.get(name):
+                conn.exec_driver_sql(rag_service._prepare_sql(False))
+                conn.info[name] = True
+            conn.execute(execute_sql, {**params, "q": v}).fetchall()
+
+        print("end-to-end retrieval statement (ms)")
+        print(f"  {'mode':<10}{'p50':>8}{'p95':>8}")
+        baseline = None
+        for mode, run in (("literal", literal), ("bound", bound), ("prepared", prepared)):
+            run(vectors[0])  # warm-up (and PREPARE)
+            p50, p95 = _timed(run, vectors)
+            baseline = baseline or p50
+            print(f"  {mode:<10}{p50:>8.2f}{p95:>8.2f}   saves {baseline - p50:+.2f} ms/query")
+        db.rollback()
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,18 +17,26 @@ CREATE TABLE IF NOT EXISTS decisions (
     confidence_score INTEGER CHECK (confidence_score BETWEEN 0 AND 100),
     category_tag  TEXT DEFAULT 'Strategy',
     embedding     VECTOR(384),
+    enrichment_status     TEXT NOT NULL DEFAULT 'done' CHECK (enrichment_status IN ('pending', 'done', 'failed')),
+    enrichment_attempts   INTEGER NOT NULL DEFAULT 0,
+    enrichment_claimed_at TIMESTAMPTZ,
     created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     review_date   TIMESTAMPTZ
 );
 
--- Cosine similarity index
-CREATE INDEX IF NOT EXISTS decisions_embedding_cosine_idx
-    ON decisions USING ivfflat (embedding vector_cosine_ops)
-    WITH (lists = 100);
+-- Vector similarity index: HNSW over inner product (embeddings are normalized).
+-- Matches the VECTOR_INDEX_* defaults; the app creates it on startup if missing.
+CREATE INDEX IF NOT EXISTS decisions_embedding_hnsw_ip_idx
+    ON decisions USING hnsw (embedding vector_ip_ops)
+    WITH (m = 16, ef_construction = 64);
 
 CREATE INDEX IF NOT EXISTS decisions_user_created_idx
     ON decisions (user_id, created_at DESC);
 
+-- Queue of decisions waiting for the enrichment worker
+CREATE INDEX IF NOT EXISTS decisions_enrichment_pending_idx
+    ON decisions (created_at) WHERE enrichment_status = 'pending';
+
 -- ── 2. Reflections ────────────────────────────────────────
 CREATE TABLE IF NOT EXISTS reflections (
     id             UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -39,7 +47,9 @@ CREATE TABLE IF NOT EXISTS reflections (
     created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS reflections_decision_idx ON reflections (decision_id);
+-- Latest reflection per decision (retrieval joins on this)
+CREATE INDEX IF NOT EXISTS reflections_decision_created_idx
+    ON reflections (decision_id, created_at DESC);
 
 -- ── 3. Weekly Summary ─────────────────────────────────────
 CREATE TABLE IF NOT EXISTS weekly_summary (
@@ -67,6 +77,34 @@ CREATE TABLE IF NOT EXISTS insights (
 
 CREATE INDEX IF NOT EXISTS insights_user_created_idx ON insights (user_id, created_at DESC);
 
+-- ── 5. LLM Results (memoized outputs) ─────────────────────
+CREATE TABLE IF NOT EXISTS llm_results (
+    id          TEXT PRIMARY KEY,
+    template_id TEXT NOT NULL,
+    model_id    TEXT NOT NULL,
+    subject_id  UUID REFERENCES decisions(id) ON DELETE CASCADE,
+    output      TEXT NOT NULL,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS llm_results_subject_idx ON llm_results (subject_id);
+
+-- ── 6. Vector index builds (maintenance job history) ──────
+CREATE TABLE IF NOT EXISTS vector_index_builds (
+    id            SERIAL PRIMARY KEY,
+    index_name    TEXT NOT NULL,
+    index_type    TEXT NOT NULL,
+    metric        TEXT NOT NULL,
+    method        TEXT NOT NULL CHECK (method IN ('create', 'reindex', 'swap')),
+    reason        TEXT,
+    params        JSONB,
+    rows_at_build BIGINT,
+    status        TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'done', 'failed')),
+    error         TEXT,
+    started_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at   TIMESTAMPTZ
+);
+
 -- ── Seed Data ─────────────────────────────────────────────
 INSERT INTO weekly_summary (user_id, week_start, maintenance_pct, growth_pct, brand_pct, admin_pct, strategic_pct)
 VALUES ('default_user', CURRENT_DATE - INTERVAL '6 days', 61, 19, 8, 12, 0)
@@ -13,6 +13,9 @@ CREATE TABLE IF NOT EXISTS decisions (
     category_tag TEXT,
     decision_type TEXT DEFAULT 'reversible' CHECK (decision_type IN ('reversible', 'irreversible')),
     embedding VECTOR(384),
+    enrichment_status TEXT NOT NULL DEFAULT 'done' CHECK (enrichment_status IN ('pending', 'done', 'failed')),
+    enrichment_attempts INTEGER NOT NULL DEFAULT 0,
+    enrichment_claimed_at TIMESTAMPTZ,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     review_date TIMESTAMPTZ
 );
@@ -21,11 +24,26 @@ CREATE TABLE IF NOT EXISTS decisions (
 ALTER TABLE decisions ADD COLUMN IF NOT EXISTS decision_type TEXT DEFAULT 'reversible'
     CHECK (decision_type IN ('reversible', 'irreversible'));
 
+-- Migration: deferred capture enrichment (see app/services/enrichment_worker.py)
+ALTER TABLE decisions ADD COLUMN IF NOT EXISTS enrichment_status TEXT NOT NULL DEFAULT 'done'
+    CHECK (enrichment_status IN ('pending', 'done', 'failed'));
+ALTER TABLE decisions ADD COLUMN IF NOT EXISTS enrichment_attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE decisions ADD COLUMN IF NOT EXISTS enrichment_claimed_at TIMESTAMPTZ;
 
--- Create vector similarity index
-CREATE INDEX IF NOT EXISTS decisions_embedding_idx
-    ON decisions USING ivfflat (embedding vector_cosine_ops)
-    WITH (lists = 100);
+-- Queue of decisions waiting for the enrichment worker
+CREATE INDEX IF NOT EXISTS decisions_enrichment_pending_idx
+    ON decisions (created_at) WHERE enrichment_status = 'pending';
+
+
+-- Vector similarity index: HNSW over inner product (embeddings are normalized).
+-- Matches the VECTOR_INDEX_* defaults; the app creates it on startup if missing.
+CREATE INDEX IF NOT EXISTS decisions_embedding_hnsw_ip_idx
+    ON decisions USING hnsw (embedding vector_ip_ops)
+    WITH (m = 16, ef_construction = 64);
+
+-- Per-user scans (exact retrieval fallback, listings)
+CREATE INDEX IF NOT EXISTS decisions_user_created_idx
+    ON decisions (user_id, created_at DESC);
 
 -- Reflections table
 CREATE TABLE IF NOT EXISTS reflections (
@@ -37,6 +55,10 @@ CREATE TABLE IF NOT EXISTS reflections (
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Latest reflection per decision (retrieval joins on this)
+CREATE INDEX IF NOT EXISTS reflections_decision_created_idx
+    ON reflections (decision_id, created_at DESC);
+
 -- Weekly summary table
 CREATE TABLE IF NOT EXISTS weekly_summary (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -59,6 +81,34 @@ CREATE TABLE IF NOT EXISTS insights (
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Memoized LLM outputs (alternative strategies, keyed by template + inputs + model)
+CREATE TABLE IF NOT EXISTS llm_results (
+    id TEXT PRIMARY KEY,
+    template_id TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    subject_id UUID REFERENCES decisions(id) ON DELETE CASCADE,
+    output TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS llm_results_subject_idx ON llm_results (subject_id);
+
+-- Vector index (re)builds, written by the maintenance job (app/services/vector_index.py)
+CREATE TABLE IF NOT EXISTS vector_index_builds (
+    id SERIAL PRIMARY KEY,
+    index_name TEXT NOT NULL,
+    index_type TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    method TEXT NOT NULL CHECK (method IN ('create', 'reindex', 'swap')),
+    reason TEXT,
+    params JSONB,
+    rows_at_build BIGINT,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'done', 'failed')),
+    error TEXT,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
 -- Seed a sample weekly summary
 INSERT INTO weekly_summary (user_id, week_start, maintenance_pct, growth_pct, brand_pct, admin_pct, strategic_pct)
 VALUES ('default_user', CURRENT_DATE - INTERVAL '6 days', 61, 19, 8, 12, 0)
@@ -11,6 +11,19 @@ from typing import Any, Dict
 
 HF_API_URL = "https://api-inference.huggingface.co/models"
 
+# Shared client: keeps connections to the inference API alive between calls
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        )
+    return _client
+
 
 async def call_hf_model(prompt: str, max_tokens: int = 512) -> str:
     """Call HuggingFace Inference API and return generated text."""
@@ -25,10 +38,9 @@ async def call_hf_model(prompt: str, max_tokens: int = 512) -> str:
     }
     url = f"{HF_API_URL}/{settings.HUGGINGFACE_MODEL}"
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+    response = await _get_client().post(url, json=payload, headers=headers)
+    response.raise_for_status()
+    data = response.json()
 
     if isinstance(data, list) and len(data) > 0:
         return data[0].get("generated_text", "").strip()